@@ -0,0 +1,190 @@
+"""
+Write-Behind Access Buffer
+Accumulates access events in memory and writes them to the metadata store in
+batches.
+
+Recording an access only merges it into a dict under a lock; a background
+thread flushes the accumulated counts when enough keys are pending or when
+the flush interval passes, and whatever is left is flushed at shutdown.
+"""
+import atexit
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from metadata_store import MetadataStore
+
+# Pending keys that trigger an early flush
+ACCESS_BUFFER_MAX_PENDING = 10000
+
+# Seconds between background flushes
+ACCESS_BUFFER_FLUSH_INTERVAL = 5.0
+
+
+class AccessBuffer:
+    """
+    In-memory accumulator of access counts in front of a MetadataStore.
+
+    Repeated accesses to the same key merge into one pending entry holding
+    the summed count and the latest timestamp, so a flush writes one row per
+    key no matter how many reads it covers.
+    """
+
+    def __init__(self, store: MetadataStore, max_pending: int = ACCESS_BUFFER_MAX_PENDING,
+                 flush_interval: float = ACCESS_BUFFER_FLUSH_INTERVAL):
+        """
+        Initialize the buffer.
+
+        Args:
+            store: Metadata store the accesses are flushed to
+            max_pending: Pending keys that wake the flusher early
+            flush_interval: Seconds between background flushes
+        """
+        self.store = store
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+
+        self._pending: Dict[str, List] = {}  # key -> [count, latest datetime]
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # One flush at a time, in order
+        self._wake = threading.Event()
+        self._closed = False
+        self._flusher: Optional[threading.Thread] = None
+
+        # Metrics
+        self.recorded_accesses = 0
+        self.flushed_accesses = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self._total_flush_seconds = 0.0
+
+        atexit.register(self.close)
+
+    def record(self, file_key: str, count: int = 1, timestamp: Optional[datetime] = None):
+        """
+        Record accesses to a key without touching the store.
+
+        Args:
+            file_key: File identifier
+            count: Number of accesses
+            timestamp: Access time (default: now)
+        """
+        timestamp = timestamp or datetime.now()
+        with self._lock:
+            pending = self._pending.get(file_key)
+            if pending is None:
+                self._pending[file_key] = [count, timestamp]
+            else:
+                pending[0] += count
+                if timestamp > pending[1]:
+                    pending[1] = timestamp
+            self.recorded_accesses += count
+            pending_keys = len(self._pending)
+
+        if self._closed:
+            self.flush()  # No flusher after shutdown; write through
+        elif self._flusher is None:
+            self._start_flusher()
+        if pending_keys >= self.max_pending:
+            self._wake.set()
+
+    def get_pending(self, file_key: str) -> Optional[Tuple[int, datetime]]:
+        """
+        Get the not-yet-flushed accesses for a key.
+
+        Returns:
+            Tuple of (count, latest timestamp), or None if nothing is pending
+        """
+        with self._lock:
+            pending = self._pending.get(file_key)
+            return (pending[0], pending[1]) if pending is not None else None
+
+    def flush(self) -> int:
+        """
+        Write every pending access to the store in one batch.
+
+        On failure the batch is merged back into the buffer so it is retried
+        by the next flush.
+
+        Returns:
+            Number of keys written
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+
+            start = time.perf_counter()
+            try:
+                self.store.record_access_many({key: (count, timestamp)
+                                               for key, (count, timestamp) in batch.items()})
+            except Exception as e:
+                self.failed_flushes += 1
+                print(f"✗ Error flushing {len(batch)} buffered access records: {e}")
+                with self._lock:
+                    for key, (count, timestamp) in batch.items():
+                        pending = self._pending.setdefault(key, [0, timestamp])
+                        pending[0] += count
+                        if timestamp > pending[1]:
+                            pending[1] = timestamp
+                return 0
+
+            elapsed = time.perf_counter() - start
+            self.flushes += 1
+            self.flushed_accesses += sum(count for count, _ in batch.values())
+            self.last_flush_seconds = elapsed
+            self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+            self._total_flush_seconds += elapsed
+            return len(batch)
+
+    def metrics(self) -> Dict:
+        """
+        Get buffer metrics.
+
+        Returns:
+            Dictionary with pending keys/accesses, flush counts and flush latency
+        """
+        with self._lock:
+            pending_keys = len(self._pending)
+            pending_accesses = sum(count for count, _ in self._pending.values())
+        return {
+            'pending_keys': pending_keys,
+            'pending_accesses': pending_accesses,
+            'recorded_accesses': self.recorded_accesses,
+            'flushed_accesses': self.flushed_accesses,
+            'flushes': self.flushes,
+            'failed_flushes': self.failed_flushes,
+            'last_flush_ms': self.last_flush_seconds * 1000,
+            'avg_flush_ms': self._total_flush_seconds / self.flushes * 1000 if self.flushes else 0.0,
+            'max_flush_ms': self.max_flush_seconds * 1000
+        }
+
+    def close(self):
+        """Stop the background flusher and flush everything still pending."""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+        atexit.unregister(self.close)
+
+    def _start_flusher(self):
+        with self._lock:
+            if self._flusher is not None or self._closed:
+                return
+            # Daemon so a forgotten close() never keeps the process alive; atexit flushes
+            self._flusher = threading.Thread(target=self._run_flusher, name='access-buffer-flusher',
+                                             daemon=True)
+            self._flusher.start()
+
+    def _run_flusher(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if not self._closed:
+                self.flush()
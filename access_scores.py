@@ -0,0 +1,140 @@
+"""
+Decayed Access Scores
+Exponentially-decayed access frequency, used as the hotness signal for
+tiering decisions instead of the lifetime access count.
+
+Each object keeps one score, valid as of its last access. Recording accesses
+decays the stored score by the time since that access and adds the new
+count, so an update is O(1) and needs no access history. Reading the score at
+a later time applies the same decay, which works on whole NumPy arrays at
+once.
+"""
+from datetime import datetime
+from typing import Dict, Optional, Union
+import numpy as np
+
+# Days after which an access counts half as much
+ACCESS_SCORE_HALF_LIFE_DAYS = 30.0
+
+SECONDS_PER_DAY = 86400.0
+MICROSECONDS_PER_DAY = 86_400_000_000
+
+Timestamp = Union[str, datetime, None]
+
+
+def _to_datetime(timestamp: Timestamp) -> Optional[datetime]:
+    if timestamp is None or isinstance(timestamp, datetime):
+        return timestamp
+    return datetime.fromisoformat(timestamp) if timestamp else None
+
+
+def decay_factor(elapsed_seconds: float, half_life_days: float = ACCESS_SCORE_HALF_LIFE_DAYS) -> float:
+    """
+    Get the weight left after elapsed_seconds (1.0 at 0, 0.5 after one half-life).
+
+    Args:
+        elapsed_seconds: Time since the score was valid (negative counts as 0)
+        half_life_days: Half-life of the score in days
+    """
+    return 0.5 ** (max(elapsed_seconds, 0.0) / (half_life_days * SECONDS_PER_DAY))
+
+
+def add_accesses(score: Optional[float], scored_at: Timestamp, count: float, accessed_at: Timestamp,
+                 half_life_days: float = ACCESS_SCORE_HALF_LIFE_DAYS) -> float:
+    """
+    Add accesses to a score.
+
+    The result is valid as of the later of scored_at and accessed_at, which
+    is also what the last-access time becomes. Accesses older than the
+    score are decayed to its time instead.
+
+    Args:
+        score: Score as of scored_at (None counts as 0)
+        scored_at: Time the score is valid at (usually the last access)
+        count: Number of new accesses
+        accessed_at: Time of the new accesses
+        half_life_days: Half-life of the score in days
+
+    Returns:
+        New score
+    """
+    score = score or 0.0
+    scored_at, accessed_at = _to_datetime(scored_at), _to_datetime(accessed_at)
+    if scored_at is None or accessed_at is None:
+        return score + count
+    if accessed_at >= scored_at:
+        return score * decay_factor((accessed_at - scored_at).total_seconds(), half_life_days) + count
+    return score + count * decay_factor((scored_at - accessed_at).total_seconds(), half_life_days)
+
+
+def stored_score(entry: Dict) -> float:
+    """
+    Get an entry's score as of its last access.
+
+    Entries written before scores existed fall back to their lifetime count,
+    treated as if every access happened at the last access.
+    """
+    score = entry.get('access_score')
+    return float(score if score is not None else entry.get('access_count', 0))
+
+
+def current_score(entry: Dict, now: Optional[datetime] = None,
+                  half_life_days: float = ACCESS_SCORE_HALF_LIFE_DAYS) -> float:
+    """
+    Get an entry's score decayed to now.
+
+    Args:
+        entry: Metadata entry
+        now: Reference time (default: current time)
+        half_life_days: Half-life of the score in days
+
+    Returns:
+        Decayed score; undecayed if the entry has no last-access time
+    """
+    last_accessed = _to_datetime(entry.get('last_accessed_timestamp'))
+    score = stored_score(entry)
+    if last_accessed is None:
+        return score
+    return score * decay_factor(((now or datetime.now()) - last_accessed).total_seconds(), half_life_days)
+
+
+def current_scores(scores: np.ndarray, scored_at_us: np.ndarray, now_us: int,
+                   half_life_days: float = ACCESS_SCORE_HALF_LIFE_DAYS) -> np.ndarray:
+    """
+    Decay whole arrays of scores to now.
+
+    Args:
+        scores: Scores as of their last access (float64)
+        scored_at_us: Last access as epoch microseconds (int64, NaT for unknown)
+        now_us: Reference time as epoch microseconds
+        half_life_days: Half-life of the score in days
+
+    Returns:
+        Decayed scores; entries with an unknown last access are not decayed
+    """
+    known = scored_at_us != np.iinfo(np.int64).min
+    elapsed_days = np.where(known, np.maximum(now_us - scored_at_us, 0), 0) / MICROSECONDS_PER_DAY
+    return scores * np.exp2(-elapsed_days / half_life_days)
+
+
+def threshold_crossing_us(scores: np.ndarray, scored_at_us: np.ndarray, threshold: float,
+                          half_life_days: float = ACCESS_SCORE_HALF_LIFE_DAYS) -> np.ndarray:
+    """
+    Get when each score decays below a threshold.
+
+    Args:
+        scores: Scores as of their last access (float64)
+        scored_at_us: Last access as epoch microseconds (int64)
+        threshold: Score threshold (> 0)
+        half_life_days: Half-life of the score in days
+
+    Returns:
+        Epoch microseconds of the first instant the score is below threshold
+        (scored_at_us where it already is)
+    """
+    with np.errstate(divide='ignore'):
+        half_lives = np.log2(np.maximum(scores, 0.0) / threshold)
+    # Round up and step past the crossing, so a re-check at this time sees it crossed
+    offset_us = np.ceil(np.maximum(half_lives, 0.0) * half_life_days * MICROSECONDS_PER_DAY) + 1
+    return scored_at_us + offset_us.astype(np.int64)
+
@@ -0,0 +1,499 @@
+"""
+Approximate Access Tracking
+Fixed-memory access frequency estimates for access streams with too many
+distinct keys to count exactly.
+
+A Count-Min sketch estimates the access score of any key from a small table
+of counters, never underestimating and overestimating by at most
+epsilon * (total score) with probability 1 - delta. A Space-Saving summary
+alongside it tracks the top-K keys by name, which the sketch cannot
+enumerate. Both decay with the same half-life as the per-key access scores
+(see access_scores), using forward decay: each access is added with weight
+2^((t - landmark) / half-life), so recording stays O(depth) and the counters
+are only rescaled, in one vectorized pass, when the landmark moves forward.
+
+Sketches built with the same parameters merge by adding counters, so
+several ingest processes can each keep one and the engine can combine them.
+"""
+import hashlib
+import heapq
+import io
+import json
+import math
+import os
+import tempfile
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from access_scores import ACCESS_SCORE_HALF_LIFE_DAYS, SECONDS_PER_DAY
+
+# Default error bounds: overestimate by at most 0.01% of the total score, with 99.9% probability
+SKETCH_EPSILON = 0.0001
+SKETCH_DELTA = 0.001
+
+# Keys tracked by name in the heavy-hitter summary
+SKETCH_TOP_K = 1000
+
+# Half-lives after the landmark at which the counters are rescaled, to stay
+# far from float64 overflow
+RESCALE_HALF_LIVES = 32.0
+
+SKETCH_FORMAT_VERSION = 1
+
+
+def _key_hashes(keys: Sequence[str], seed: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Hash keys to two 64-bit values each, stable across processes.
+
+    Python's hash() is salted per process, so sketches built by different
+    processes could not be merged with it.
+    """
+    salt = seed.to_bytes(8, 'little')
+    digests = b''.join(hashlib.blake2b(key.encode('utf-8'), digest_size=16, salt=salt).digest()
+                       for key in keys)
+    hashes = np.frombuffer(digests, dtype='<u8').reshape(-1, 2)
+    # Odd second hash, so the rows' indexes never collapse onto one column
+    return hashes[:, 0], hashes[:, 1] | np.uint64(1)
+
+
+class CountMinSketch:
+    """
+    Count-Min sketch over float counters.
+
+    Each key maps to one counter per row (double hashing on a 128-bit
+    digest); adding increments all of them and estimating takes the smallest.
+    """
+
+    def __init__(self, width: int, depth: int, seed: int = 0):
+        """
+        Initialize an empty sketch.
+
+        Args:
+            width: Counters per row (error bound is e / width of the total)
+            depth: Rows (failure probability is e^-depth)
+            seed: Hash seed; only sketches with the same seed can be merged
+        """
+        self.width = width
+        self.depth = depth
+        self.seed = seed
+        self.table = np.zeros((depth, width), dtype=np.float64)
+        self._rows = np.arange(depth, dtype=np.uint64)
+
+    @classmethod
+    def from_error_bounds(cls, epsilon: float = SKETCH_EPSILON, delta: float = SKETCH_DELTA,
+                          seed: int = 0) -> 'CountMinSketch':
+        """
+        Size a sketch for the given error bounds.
+
+        Args:
+            epsilon: Maximum overestimate as a fraction of the total count
+            delta: Probability of exceeding that overestimate
+
+        Returns:
+            New empty sketch
+        """
+        return cls(width=math.ceil(math.e / epsilon), depth=math.ceil(math.log(1 / delta)), seed=seed)
+
+    @property
+    def epsilon(self) -> float:
+        return math.e / self.width
+
+    @property
+    def delta(self) -> float:
+        return math.exp(-self.depth)
+
+    def _columns(self, keys: Sequence[str]) -> np.ndarray:
+        h1, h2 = _key_hashes(keys, self.seed)
+        # (keys, depth) column index of each key in each row
+        return ((h1[:, None] + self._rows[None, :] * h2[:, None]) % np.uint64(self.width)).astype(np.intp)
+
+    def add_many(self, keys: Sequence[str], weights: np.ndarray):
+        """
+        Add a weight to each key's counters.
+
+        Args:
+            keys: Keys (may repeat)
+            weights: Weight per key
+        """
+        if not len(keys):
+            return
+        columns = self._columns(keys)
+        rows = np.broadcast_to(np.arange(self.depth), columns.shape)
+        np.add.at(self.table, (rows, columns), np.asarray(weights, dtype=np.float64)[:, None])
+
+    def estimate_many(self, keys: Sequence[str]) -> np.ndarray:
+        """
+        Estimate each key's total weight (never below the true value).
+
+        Args:
+            keys: Keys to estimate
+
+        Returns:
+            float64 estimates in input order
+        """
+        if not len(keys):
+            return np.zeros(0, dtype=np.float64)
+        columns = self._columns(keys)
+        return self.table[np.arange(self.depth)[None, :], columns].min(axis=1)
+
+    def merge(self, other: 'CountMinSketch', factor: float = 1.0):
+        """
+        Add another sketch's counters into this one.
+
+        Args:
+            other: Sketch to add
+            factor: Weight applied to the other sketch's counters
+
+        Raises:
+            ValueError: If the sketches have different dimensions or seeds
+        """
+        if (self.width, self.depth, self.seed) != (other.width, other.depth, other.seed):
+            raise ValueError("Count-Min sketches must have the same width, depth and seed to merge")
+        self.table += other.table * factor
+
+
+class SpaceSaving:
+    """
+    Space-Saving summary of the heaviest keys.
+
+    Keeps at most capacity keys. A new key evicts the lightest one and
+    inherits its count as an overestimate, so any key whose true weight
+    exceeds total / capacity is guaranteed to be present.
+    """
+
+    def __init__(self, capacity: int = SKETCH_TOP_K):
+        """
+        Initialize an empty summary.
+
+        Args:
+            capacity: Maximum number of keys tracked
+        """
+        self.capacity = capacity
+        self.counts: Dict[str, float] = {}
+        self.errors: Dict[str, float] = {}
+        # (count, key) min-heap with stale entries skipped lazily
+        self._heap: List[Tuple[float, str]] = []
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def _rebuild_heap(self):
+        self._heap = [(count, key) for key, count in self.counts.items()]
+        heapq.heapify(self._heap)
+
+    def _pop_min(self) -> Tuple[str, float]:
+        while True:
+            count, key = heapq.heappop(self._heap)
+            if self.counts.get(key) == count:
+                return key, count
+
+    def add(self, key: str, weight: float):
+        """
+        Add weight to a key, evicting the lightest key if the summary is full.
+
+        Args:
+            key: Key
+            weight: Weight to add
+        """
+        if key in self.counts:
+            self.counts[key] += weight
+        elif len(self.counts) < self.capacity:
+            self.counts[key] = weight
+            self.errors[key] = 0.0
+        else:
+            evicted, floor = self._pop_min()
+            del self.counts[evicted], self.errors[evicted]
+            self.counts[key] = floor + weight
+            self.errors[key] = floor
+        heapq.heappush(self._heap, (self.counts[key], key))
+        if len(self._heap) > 4 * self.capacity:
+            self._rebuild_heap()
+
+    def min_count(self) -> float:
+        """Get the count any untracked key is bounded by (0 until the summary is full)."""
+        if len(self.counts) < self.capacity:
+            return 0.0
+        return min(self.counts.values())
+
+    def scale(self, factor: float):
+        """Multiply every count and error by factor."""
+        for key in self.counts:
+            self.counts[key] *= factor
+            self.errors[key] *= factor
+        self._rebuild_heap()
+
+    def top(self, n: Optional[int] = None) -> List[Tuple[str, float, float]]:
+        """
+        Get the heaviest keys.
+
+        Args:
+            n: Number of keys (default: all tracked)
+
+        Returns:
+            (key, count upper bound, maximum overestimate) tuples, heaviest first
+        """
+        ranked = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:n]
+        return [(key, count, self.errors[key]) for key, count in ranked]
+
+    def merge(self, other: 'SpaceSaving', factor: float = 1.0):
+        """
+        Combine another summary into this one, keeping the capacity heaviest keys.
+
+        A key missing from a full summary may still have weight up to that
+        summary's smallest count, which is added to its count and error.
+
+        Args:
+            other: Summary to add
+            factor: Weight applied to the other summary's counts
+        """
+        own_floor, other_floor = self.min_count(), other.min_count()
+        merged = {}
+        for key in set(self.counts) | set(other.counts):
+            count = self.counts.get(key, own_floor) + other.counts.get(key, other_floor) * factor
+            error = self.errors.get(key, own_floor) + other.errors.get(key, other_floor) * factor
+            merged[key] = (count, error)
+        capacity = max(self.capacity, other.capacity)
+        kept = sorted(merged.items(), key=lambda item: item[1][0], reverse=True)[:capacity]
+        self.capacity = capacity
+        self.counts = {key: count for key, (count, _) in kept}
+        self.errors = {key: error for key, (_, error) in kept}
+        self._rebuild_heap()
+
+
+class AccessSketch:
+    """
+    Decayed, mergeable access tracker: Count-Min estimates for every key
+    plus Space-Saving for the top-K.
+
+    Estimates are upper bounds of the decayed access score a key would have
+    in the metadata store. estimate_many() returns them as of the landmark
+    time, the same "score valid at a time" form the engine decays itself.
+    """
+
+    def __init__(self, epsilon: float = SKETCH_EPSILON, delta: float = SKETCH_DELTA,
+                 top_k: int = SKETCH_TOP_K,
+                 half_life_days: Optional[float] = ACCESS_SCORE_HALF_LIFE_DAYS,
+                 seed: int = 0, landmark: Optional[datetime] = None):
+        """
+        Initialize an empty tracker.
+
+        Args:
+            epsilon: Maximum overestimate as a fraction of the total score
+            delta: Probability of exceeding that overestimate
+            top_k: Keys tracked by name
+            half_life_days: Half-life of the scores (None for plain counts)
+            seed: Hash seed; only trackers with the same seed can be merged
+            landmark: Time the counters are expressed at (default: now)
+        """
+        self.cms = CountMinSketch.from_error_bounds(epsilon, delta, seed)
+        self.heavy_hitters = SpaceSaving(top_k)
+        self.half_life_days = half_life_days
+        self.landmark = landmark or datetime.now()
+        self.total = 0.0
+
+    @property
+    def memory_bytes(self) -> int:
+        """Size of the counter table (the top-K summary adds a few hundred bytes per key)."""
+        return self.cms.table.nbytes
+
+    def error_bound(self) -> float:
+        """Get the maximum overestimate (with probability 1 - delta), as of the landmark."""
+        return self.cms.epsilon * self.total
+
+    def _weight(self, timestamp: datetime) -> float:
+        if self.half_life_days is None:
+            return 1.0
+        elapsed_days = (timestamp - self.landmark).total_seconds() / SECONDS_PER_DAY
+        return 2.0 ** (elapsed_days / self.half_life_days)
+
+    def _rescale(self, landmark: datetime):
+        """Express every counter as of a later landmark."""
+        if self.half_life_days is None or landmark <= self.landmark:
+            return
+        factor = 1.0 / self._weight(landmark)
+        self.cms.table *= factor
+        self.heavy_hitters.scale(factor)
+        self.total *= factor
+        self.landmark = landmark
+
+    def record(self, file_key: str, count: int = 1, timestamp: Optional[datetime] = None):
+        """
+        Record accesses to a key.
+
+        Args:
+            file_key: File identifier
+            count: Number of accesses
+            timestamp: Access time (default: now)
+        """
+        self.record_many({file_key: (count, timestamp or datetime.now())})
+
+    def record_many(self, accesses: Dict[str, Tuple[int, datetime]]):
+        """
+        Record a batch of accesses, e.g. an AccessBuffer flush.
+
+        Args:
+            accesses: {file_key: (access count, access time)}
+        """
+        if not accesses:
+            return
+        latest = max(timestamp for _, timestamp in accesses.values())
+        if self.half_life_days is not None and self._weight(latest) > 2.0 ** RESCALE_HALF_LIVES:
+            self._rescale(latest)
+
+        keys = list(accesses)
+        weights = np.array([count * self._weight(timestamp) for count, timestamp in accesses.values()])
+        self.cms.add_many(keys, weights)
+        for key, weight in zip(keys, weights.tolist()):
+            self.heavy_hitters.add(key, weight)
+        self.total += float(weights.sum())
+
+    def estimate_many(self, file_keys: Sequence[str]) -> np.ndarray:
+        """
+        Estimate access scores as of the landmark time.
+
+        Keys tracked by the top-K summary use the smaller of its count and
+        the sketch's, since both only ever overestimate.
+
+        Args:
+            file_keys: File identifiers
+
+        Returns:
+            float64 scores as of self.landmark, in input order
+        """
+        estimates = self.cms.estimate_many(file_keys)
+        counts = self.heavy_hitters.counts
+        for i, key in enumerate(file_keys):
+            count = counts.get(key)
+            if count is not None and count < estimates[i]:
+                estimates[i] = count
+        return estimates
+
+    def estimate(self, file_key: str, now: Optional[datetime] = None) -> float:
+        """
+        Estimate a key's access score decayed to now.
+
+        Args:
+            file_key: File identifier
+            now: Reference time (default: current time)
+
+        Returns:
+            Estimated score (an upper bound)
+        """
+        return float(self.estimate_many([file_key])[0]) / self._weight(now or datetime.now())
+
+    def top(self, n: int = 10, now: Optional[datetime] = None) -> List[Tuple[str, float]]:
+        """
+        Get the most accessed keys.
+
+        Args:
+            n: Number of keys
+            now: Time to decay the scores to (default: current time)
+
+        Returns:
+            (key, estimated score) tuples, highest first
+        """
+        scale = 1.0 / self._weight(now or datetime.now())
+        return [(key, count * scale) for key, count, _ in self.heavy_hitters.top(n)]
+
+    def merge(self, other: 'AccessSketch'):
+        """
+        Add another tracker's accesses into this one.
+
+        Raises:
+            ValueError: If the trackers were built with different parameters
+        """
+        if self.half_life_days != other.half_life_days:
+            raise ValueError("Access sketches must have the same half-life to merge")
+        self._rescale(other.landmark)
+        # Decay the other tracker's counters from its landmark to this one
+        factor = self._weight(other.landmark)
+        self.cms.merge(other.cms, factor)
+        self.heavy_hitters.merge(other.heavy_hitters, factor)
+        self.total += other.total * factor
+
+    def save(self, path: str):
+        """
+        Write the tracker to a .npz file, atomically.
+
+        Args:
+            path: Destination path
+        """
+        top = self.heavy_hitters.top()
+        meta = {
+            'version': SKETCH_FORMAT_VERSION,
+            'seed': self.cms.seed,
+            'top_k': self.heavy_hitters.capacity,
+            'half_life_days': self.half_life_days,
+            'landmark': self.landmark.isoformat(),
+            'total': self.total
+        }
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer,
+            meta=np.array(json.dumps(meta)),
+            table=self.cms.table,
+            top_keys=np.array([key for key, _, _ in top], dtype=np.str_),
+            top_counts=np.array([count for _, count, _ in top], dtype=np.float64),
+            top_errors=np.array([error for _, _, error in top], dtype=np.float64)
+        )
+
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.sketch-', suffix='.npz')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(buffer.getvalue())
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> 'AccessSketch':
+        """
+        Read a tracker written by save().
+
+        Args:
+            path: Path to the .npz file
+
+        Returns:
+            The loaded tracker
+
+        Raises:
+            ValueError: If the file was written by an unsupported format version
+        """
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            if meta.get('version') != SKETCH_FORMAT_VERSION:
+                raise ValueError(f"Unsupported access sketch version: {meta.get('version')}")
+            sketch = cls.__new__(cls)
+            depth, width = data['table'].shape
+            sketch.cms = CountMinSketch(int(width), int(depth), meta['seed'])
+            sketch.cms.table = data['table'].copy()
+            sketch.heavy_hitters = SpaceSaving(meta['top_k'])
+            sketch.heavy_hitters.counts = dict(zip(data['top_keys'].tolist(), data['top_counts'].tolist()))
+            sketch.heavy_hitters.errors = dict(zip(data['top_keys'].tolist(), data['top_errors'].tolist()))
+            sketch.heavy_hitters._rebuild_heap()
+        sketch.half_life_days = meta['half_life_days']
+        sketch.landmark = datetime.fromisoformat(meta['landmark'])
+        sketch.total = meta['total']
+        return sketch
+
+
+def merge_sketches(paths: Iterable[str]) -> Optional[AccessSketch]:
+    """
+    Load and merge several saved trackers (e.g. one per ingest process).
+
+    Args:
+        paths: Paths of .npz files written by AccessSketch.save()
+
+    Returns:
+        The combined tracker, or None if no paths were given
+    """
+    merged = None
+    for path in paths:
+        sketch = AccessSketch.load(path)
+        if merged is None:
+            merged = sketch
+        else:
+            merged.merge(sketch)
+    return merged
@@ -0,0 +1,606 @@
+"""
+Astra Benchmarks
+Measures storage operation throughput against the moto-simulated clouds.
+
+Each benchmark can inject a fixed per-request latency to approximate the
+round-trip time of a real cloud endpoint, since moto answers in-process.
+
+Usage:
+    python benchmark.py listing --objects 900 --shards 9 --latency-ms 20
+    python benchmark.py upload --size-mb 128 --part-mb 8 --bandwidth-mb-s 50
+    python benchmark.py transitions --objects 400 --workers 1,4,16
+    python benchmark.py migration --objects 64 --size-kb 512 --workers 1,4,16
+    python benchmark.py decisions --objects 200000
+    python benchmark.py heuristics --objects 200000 --rules 10,30,60,100,500
+    python benchmark.py access --accesses 100000 --keys 5000
+    python benchmark.py sketch --accesses 1000000 --keys 200000
+    python benchmark.py metadata --objects 1000000
+"""
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+import boto3
+import click
+from botocore.stub import Stubber
+from moto import mock_aws
+from cloud_utils import CLOUD_CONCURRENCY_LIMITS, DEFAULT_CLOUD_CONCURRENCY, ListingError, S3Manager
+from engine import TieringEngine
+from access_buffer import AccessBuffer
+from access_scores import ACCESS_SCORE_HALF_LIFE_DAYS
+from access_sketch import AccessSketch
+from heuristics import COMPILE_MIN_RULES, DEFAULT_RULES, HeuristicRuleSet, NamingRule
+from metadata_store import JsonMetadataStore, SqliteMetadataStore
+from metadata_table import MetadataTable
+from migration_manager import MigrationManager
+from transfer import MB
+
+# moto needs credentials to be present, even though they are never checked
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+
+class RequestCounter:
+    """Counts S3 API calls made by a client, grouped by operation name."""
+
+    def __init__(self, s3_client):
+        """
+        Attach the counter to a boto3 client.
+
+        Args:
+            s3_client: boto3 S3 client to observe
+        """
+        self.counts = {}
+        s3_client.meta.events.register('after-call.s3', self._on_call)
+
+    def _on_call(self, model, **kwargs):
+        self.counts[model.name] = self.counts.get(model.name, 0) + 1
+
+    def get(self, operation: str) -> int:
+        """Get the number of calls made to an operation."""
+        return self.counts.get(operation, 0)
+
+    def reset(self):
+        """Clear all counts."""
+        self.counts.clear()
+
+
+def simulate_latency(s3_client, latency_ms: float, bandwidth_mb_s: float = 0):
+    """
+    Delay every request made by a client to emulate a network link.
+
+    Args:
+        s3_client: boto3 S3 client to slow down
+        latency_ms: Delay added before each request, in milliseconds
+        bandwidth_mb_s: Per-connection bandwidth used to delay request bodies
+            (0 for unlimited)
+    """
+    if latency_ms <= 0 and bandwidth_mb_s <= 0:
+        return
+
+    def _sleep(request, **kwargs):
+        delay = latency_ms / 1000
+        if bandwidth_mb_s > 0:
+            body = request.body
+            size = len(body) if isinstance(body, (bytes, bytearray)) else 0
+            if hasattr(body, 'seek') and hasattr(body, 'tell'):
+                position = body.tell()
+                size = body.seek(0, os.SEEK_END) - position
+                body.seek(position)
+            delay += size / MB / bandwidth_mb_s
+        time.sleep(delay)
+
+    # Must run before moto intercepts the request and returns a response
+    s3_client.meta.events.register_first('before-send.s3', _sleep)
+
+
+def _print_header(title: str):
+    click.echo("\n" + "="*70)
+    click.echo(f"⏱️  {title}")
+    click.echo("="*70 + "\n")
+
+
+@click.group()
+def cli():
+    """Astra performance benchmarks (moto-simulated S3)."""
+    pass
+
+
+def check_pagination(manager: S3Manager):
+    """
+    Check continuation-token handling against stubbed list_objects_v2 responses.
+
+    The listing must request the second page with the first page's token and
+    return both pages' keys; a failure on the second page must raise
+    ListingError rather than end the listing early.
+
+    Args:
+        manager: S3Manager whose listing is checked; its client is swapped
+            for a stubbed one during the check
+    """
+    real_client = manager.s3_client
+    manager.s3_client = boto3.client('s3', region_name=manager.region)
+    first_page = {
+        'Contents': [{'Key': 'page-1/a'}, {'Key': 'page-1/b'}],
+        'IsTruncated': True,
+        'NextContinuationToken': 'token-2'
+    }
+    second_request = {'Bucket': manager.bucket_name, 'MaxKeys': 2, 'ContinuationToken': 'token-2'}
+    try:
+        with Stubber(manager.s3_client) as stubber:
+            stubber.add_response('list_objects_v2', first_page,
+                                 {'Bucket': manager.bucket_name, 'MaxKeys': 2})
+            stubber.add_response('list_objects_v2', {'Contents': [{'Key': 'page-2/c'}], 'IsTruncated': False},
+                                 second_request)
+            keys = [record.key for record in manager.iter_objects(page_size=2)]
+            stubber.assert_no_pending_responses()
+        assert keys == ['page-1/a', 'page-1/b', 'page-2/c'], keys
+        click.echo(f"✓ Continuation token followed: {len(keys)} keys from 2 stubbed pages")
+
+        with Stubber(manager.s3_client) as stubber:
+            stubber.add_response('list_objects_v2', first_page,
+                                 {'Bucket': manager.bucket_name, 'MaxKeys': 2})
+            stubber.add_client_error('list_objects_v2', 'InternalError', expected_params=second_request)
+            keys = []
+            try:
+                keys.extend(record.key for record in manager.iter_objects(page_size=2))
+            except ListingError:
+                pass
+            else:
+                raise AssertionError("a failed second page ended the listing without an error")
+        click.echo(f"✓ Failure on page 2 raised ListingError after {len(keys)} keys\n")
+    finally:
+        manager.s3_client = real_client
+
+
+@cli.command()
+@mock_aws
+@click.option('--objects', default=900, help='Number of objects to create')
+@click.option('--shards', default=9, help='Number of top-level prefixes the keys are spread over')
+@click.option('--page-size', default=25, help='Keys per list_objects_v2 page')
+@click.option('--workers', default=8, help='Concurrent shard listings')
+@click.option('--latency-ms', default=20.0, help='Simulated round-trip time per request')
+def listing(objects, shards, page_size, workers, latency_ms):
+    """Compare serial and prefix-sharded parallel bucket listing."""
+    _print_header("LISTING BENCHMARK")
+
+    manager = S3Manager(bucket_name='astra-benchmark-listing')
+    check_pagination(manager)
+    for i in range(objects):
+        manager.s3_client.put_object(
+            Bucket=manager.bucket_name,
+            Key=f"shard-{i % shards:03d}/object-{i:08d}",
+            Body=b''
+        )
+
+    counter = RequestCounter(manager.s3_client)
+    simulate_latency(manager.s3_client, latency_ms)
+
+    results = {}
+    for mode in ('serial', 'parallel'):
+        counter.reset()
+        start = time.perf_counter()
+        if mode == 'serial':
+            keys = [record.key for record in manager.iter_objects(page_size=page_size)]
+        else:
+            keys = [record.key for record in manager.iter_objects_parallel(
+                max_workers=workers, page_size=page_size)]
+        elapsed = time.perf_counter() - start
+
+        pages = counter.get('ListObjectsV2')
+        results[mode] = {'keys': keys, 'pages': pages, 'seconds': elapsed}
+        click.echo(f"{mode.upper():<10} {len(keys):>8} keys  {pages:>6} pages  "
+                   f"{elapsed:>7.2f} s  {pages / elapsed:>8.1f} pages/s")
+
+    same = results['serial']['keys'] == results['parallel']['keys']
+    speedup = results['serial']['seconds'] / results['parallel']['seconds']
+    click.echo(f"\n✓ Identical, sorted output: {same}")
+    click.echo(f"✓ Speedup: {speedup:.1f}x with {workers} workers "
+               f"({latency_ms:.0f} ms simulated latency)\n")
+
+
+@cli.command()
+@mock_aws
+@click.option('--size-mb', default=128, help='Size of the uploaded object')
+@click.option('--part-mb', default=8, help='Multipart part size')
+@click.option('--workers', default='1,2,4,8', help='Comma-separated worker counts to compare')
+@click.option('--latency-ms', default=20.0, help='Simulated round-trip time per request')
+@click.option('--bandwidth-mb-s', default=50.0, help='Simulated bandwidth per connection')
+def upload(size_mb, part_mb, workers, latency_ms, bandwidth_mb_s):
+    """Measure multipart upload throughput for different worker counts."""
+    _print_header("UPLOAD BENCHMARK")
+
+    manager = S3Manager(bucket_name='astra-benchmark-upload')
+    simulate_latency(manager.s3_client, latency_ms, bandwidth_mb_s)
+    payload = os.urandom(size_mb * MB)
+
+    single = manager.upload_object('single-put.bin', payload, multipart_threshold=len(payload) + 1)
+    click.echo(f"{'SINGLE PUT':<14} {single.parts:>4} parts  {single.seconds:>7.2f} s  "
+               f"{single.throughput_mb_s:>8.1f} MB/s")
+
+    for worker_count in (int(w) for w in workers.split(',')):
+        result = manager.upload_object(
+            f"multipart-{worker_count}.bin", payload,
+            multipart_threshold=part_mb * MB,
+            part_size=part_mb * MB,
+            max_workers=worker_count
+        )
+        click.echo(f"{f'{worker_count} WORKERS':<14} {result.parts:>4} parts  {result.seconds:>7.2f} s  "
+                   f"{result.throughput_mb_s:>8.1f} MB/s")
+
+    downloaded = manager.download_file_content(f"multipart-{worker_count}.bin")
+    click.echo(f"\n✓ Byte-identical round trip: {downloaded == payload}")
+    click.echo(f"✓ Peak part buffers: {part_mb} MB x workers ({latency_ms:.0f} ms latency, "
+               f"{bandwidth_mb_s:.0f} MB/s per connection simulated)\n")
+
+
+@cli.command()
+@mock_aws
+@click.option('--objects', default=400, help='Number of objects to transition')
+@click.option('--workers', default='1,4,16', help='Comma-separated worker counts to compare')
+@click.option('--latency-ms', default=20.0, help='Simulated round-trip time per request')
+def transitions(objects, workers, latency_ms):
+    """Measure tier change throughput for different worker counts."""
+    _print_header("TIER TRANSITION BENCHMARK")
+
+    manager = S3Manager(bucket_name='astra-benchmark-transitions')
+    keys = [f"object-{i:08d}" for i in range(objects)]
+    for key in keys:
+        manager.s3_client.put_object(Bucket=manager.bucket_name, Key=key, Body=b'')
+
+    counter = RequestCounter(manager.s3_client)
+    simulate_latency(manager.s3_client, latency_ms)
+
+    # Alternate between two active tiers so every run has real work to do
+    target_tiers = ('STANDARD_IA', 'STANDARD')
+    baseline = None
+    for run, worker_count in enumerate(int(w) for w in workers.split(',')):
+        counter.reset()
+        target_tier = target_tiers[run % 2]
+        start = time.perf_counter()
+        errors = manager.change_tiers(((key, target_tier, 0) for key in keys), max_workers=worker_count)
+        elapsed = time.perf_counter() - start
+        failed = sum(error is not None for error in errors.values())
+
+        baseline = baseline or elapsed
+        click.echo(f"{f'{worker_count} WORKERS':<12} {counter.get('CopyObject'):>6} copies  "
+                   f"{failed:>4} failed  {elapsed:>7.2f} s  {objects / elapsed:>8.1f} objects/s  "
+                   f"{baseline / elapsed:>5.1f}x")
+
+    cloud_limit = CLOUD_CONCURRENCY_LIMITS.get(manager.cloud_name, DEFAULT_CLOUD_CONCURRENCY)
+    click.echo(f"\n✓ Per-cloud limit: {cloud_limit} requests in flight"
+               f" ({latency_ms:.0f} ms simulated latency)\n")
+
+
+@cli.command()
+@mock_aws
+@click.option('--objects', default=64, help='Number of objects to migrate')
+@click.option('--size-kb', default=512, help='Size of each object')
+@click.option('--workers', default='1,4,16', help='Comma-separated worker counts to compare')
+@click.option('--latency-ms', default=20.0, help='Simulated round-trip time per request')
+def migration(objects, size_kb, workers, latency_ms):
+    """Measure streamed cross-cloud batch migration throughput for different worker counts."""
+    _print_header("BATCH MIGRATION BENCHMARK")
+
+    source = S3Manager(cloud_name='aws', bucket_name='astra-benchmark-migration-source')
+    destination = S3Manager(cloud_name='gcp', bucket_name='astra-benchmark-migration-destination')
+    keys = [f"object-{i:08d}.bin" for i in range(objects)]
+    payload = os.urandom(size_kb * 1024)
+    for key in keys:
+        source.s3_client.put_object(Bucket=source.bucket_name, Key=key, Body=payload)
+    simulate_latency(source.s3_client, latency_ms)
+    simulate_latency(destination.s3_client, latency_ms)
+
+    total_mb = objects * size_kb / 1024
+    baseline = None
+    for worker_count in (int(w) for w in workers.split(',')):
+        migrator = MigrationManager(source, destination, server_side_copy=False)
+        start = time.perf_counter()
+        # Per-file progress output would dominate the timing
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = migrator.migrate_batch(keys, delete_source=False, max_workers=worker_count)
+        elapsed = time.perf_counter() - start
+
+        baseline = baseline or elapsed
+        click.echo(f"{f'{worker_count} WORKERS':<12} {results['succeeded']:>4} ok  {results['failed']:>3} failed  "
+                   f"{elapsed:>7.2f} s  {objects / elapsed:>7.1f} files/s  {total_mb / elapsed:>7.1f} MB/s  "
+                   f"{baseline / elapsed:>5.1f}x")
+
+    # Where the last run spent its time
+    click.echo()
+    MigrationManager.print_stage_statistics(results['stages'], results['seconds'])
+
+    click.echo(f"\n✓ {objects} x {size_kb} KB streamed AWS → GCP with verification"
+               f" ({latency_ms:.0f} ms simulated latency)\n")
+
+
+@cli.command()
+@click.option('--objects', default=200000, help='Number of synthetic metadata entries')
+@click.option('--seed', default=42, help='Random seed for the synthetic metadata')
+def decisions(objects, seed):
+    """Compare per-key and vectorized tier decisions over synthetic metadata."""
+    _print_header("TIER DECISION BENCHMARK")
+
+    rng = random.Random(seed)
+    now = datetime.now()
+    stems = ('report', 'backup_db', 'temp_cache', 'archived_logs', 'invoice', 'image')
+    metadata = {}
+    for i in range(objects):
+        key = f"{rng.choice(stems)}_{i:08d}.dat"
+        if rng.random() < 0.05:
+            continue  # No metadata: never accessed
+        last_accessed = now - timedelta(seconds=rng.randint(0, 400 * 86400))
+        metadata[key] = {
+            'access_count': rng.choice((0, 0, 1, 3, 9, 10, 42)),
+            'last_accessed_timestamp': last_accessed.isoformat()
+        }
+    keys = [f"{rng.choice(stems)}_{i:08d}.dat" for i in range(objects)]
+    keys = list(metadata) + keys[:objects - len(metadata)]
+
+    engine = TieringEngine.__new__(TieringEngine)
+    engine.metadata = MetadataTable.from_entries(metadata)
+    engine.heuristics = HeuristicRuleSet(DEFAULT_RULES)
+    engine.half_life_days = ACCESS_SCORE_HALF_LIFE_DAYS
+    engine.access_sketch = None
+
+    start = time.perf_counter()
+    scalar = [engine._determine_target_tier(key, 'hot', now) for key in keys]
+    scalar_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    arrays = engine._load_decision_arrays(keys)
+    load_seconds = time.perf_counter() - start
+    codes = engine._decide_tier_codes(*arrays, now)
+    vectorized = [TieringEngine.TIER_NAMES[code] for code in codes.tolist()]
+    vectorized_seconds = time.perf_counter() - start
+    rules_seconds = vectorized_seconds - load_seconds
+
+    click.echo(f"{'PER-KEY':<12} {len(keys):>8} keys  {scalar_seconds:>7.3f} s  "
+               f"{len(keys) / scalar_seconds:>12,.0f} keys/s")
+    click.echo(f"{'VECTORIZED':<12} {len(keys):>8} keys  {vectorized_seconds:>7.3f} s  "
+               f"{len(keys) / vectorized_seconds:>12,.0f} keys/s")
+    click.echo(f"{'  load':<12} {'':>8}       {load_seconds:>7.3f} s")
+    click.echo(f"{'  rules':<12} {'':>8}       {rules_seconds:>7.3f} s")
+    click.echo(f"\n✓ Identical decisions: {scalar == vectorized}")
+    click.echo(f"✓ Speedup: {scalar_seconds / vectorized_seconds:.1f}x\n")
+
+
+def _classify_sequentially(rules, file_key):
+    """Reference matcher: try every rule in order, as the hard-coded checks did."""
+    file_lower = file_key.lower()
+    for rule in rules:
+        pattern = rule.pattern.lower()
+        if rule.match == 'contains' and pattern in file_lower:
+            return rule.tier
+        if rule.match == 'startswith' and file_lower.startswith(pattern):
+            return rule.tier
+        if rule.match == 'endswith' and file_lower.endswith(pattern):
+            return rule.tier
+    return None
+
+
+@cli.command()
+@click.option('--objects', default=200000, help='Number of synthetic keys')
+@click.option('--rules', default='10,30,60,100,500', help='Comma-separated rule counts to compare')
+@click.option('--seed', default=42, help='Random seed for the synthetic keys and rules')
+def heuristics(objects, rules, seed):
+    """Compare rule-by-rule and compiled naming-rule matching as rules grow."""
+    _print_header("NAMING HEURISTICS BENCHMARK")
+
+    rng = random.Random(seed)
+    departments = [f"dept-{i:02d}" for i in range(20)]
+    stems = ('report', 'backup_db', 'temp_cache', 'archived_logs', 'invoice', 'image', 'monthly_report')
+    keys = [f"{rng.choice(departments)}/{rng.randint(2019, 2025)}/{rng.choice(stems)}_{i:08d}"
+            f"{rng.choice(('.csv', '.log', '.pdf', '.bak', '.parquet'))}" for i in range(objects)]
+
+    for rule_count in (int(r) for r in rules.split(',')):
+        # Built-in rules first, then synthetic project-code rules that rarely match
+        rule_list = list(DEFAULT_RULES)
+        while len(rule_list) < rule_count:
+            code = ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(6))
+            rule_list.append(NamingRule(code, rng.choice(TieringEngine.TIER_NAMES),
+                                        match=rng.choice(('contains', 'startswith', 'endswith'))))
+        rule_list = rule_list[:rule_count]
+
+        reference = [_classify_sequentially(rule_list, key) for key in keys]
+
+        start = time.perf_counter()
+        in_order = HeuristicRuleSet(rule_list, compile_min_rules=len(rule_list) + 1).classify_bulk(keys)
+        in_order_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        compiled = HeuristicRuleSet(rule_list, compile_min_rules=0).classify_bulk(keys)
+        compiled_seconds = time.perf_counter() - start
+
+        default = 'compiled' if HeuristicRuleSet(rule_list).uses_automaton else 'in order'
+        click.echo(f"{rule_count:>5} RULES  in order {in_order_seconds:>7.3f} s  "
+                   f"compiled {compiled_seconds:>7.3f} s  "
+                   f"({in_order_seconds / compiled_seconds:>5.1f}x)  default: {default:<8}  "
+                   f"identical: {reference == in_order == compiled}")
+    click.echo(f"\nThe default matcher compiles sets of {COMPILE_MIN_RULES} rules or more\n")
+
+
+@cli.command()
+@click.option('--accesses', default=100000, help='Number of access events to record')
+@click.option('--keys', default=5000, help='Number of distinct keys accessed')
+@click.option('--direct-limit', default=200, help='Accesses timed for the per-access write paths')
+@click.option('--seed', default=42, help='Random seed for the access stream')
+def access(accesses, keys, direct_limit, seed):
+    """Compare per-access metadata writes with the write-behind buffer."""
+    _print_header("ACCESS RECORDING BENCHMARK")
+
+    rng = random.Random(seed)
+    key_names = [f"dataset/part-{i:06d}.parquet" for i in range(keys)]
+    stream = [rng.choice(key_names) for _ in range(accesses)]
+    seed_entries = {key: {'access_count': 0, 'created_timestamp': '2025-01-01T00:00:00',
+                          'last_accessed_timestamp': '2025-01-01T00:00:00'} for key in key_names}
+
+    with tempfile.TemporaryDirectory() as workdir:
+        direct_stores = (
+            ('JSON REWRITE', JsonMetadataStore(os.path.join(workdir, 'metadata.json'))),
+            ('SQLITE ROW', SqliteMetadataStore(os.path.join(workdir, 'direct.db')))
+        )
+        for label, store in direct_stores:
+            store.replace_all(seed_entries)
+            sample = stream[:direct_limit]
+            start = time.perf_counter()
+            for key in sample:
+                store.record_access(key)
+            elapsed = time.perf_counter() - start
+            click.echo(f"{label:<14} {len(sample):>8} accesses  {elapsed:>7.2f} s  "
+                       f"{len(sample) / elapsed:>12,.0f} accesses/s")
+            store.close()
+
+        store = SqliteMetadataStore(os.path.join(workdir, 'buffered.db'))
+        store.replace_all(seed_entries)
+        buffer = AccessBuffer(store)
+        start = time.perf_counter()
+        for key in stream:
+            buffer.record(key)
+        record_seconds = time.perf_counter() - start
+        buffer.close()
+        total_seconds = time.perf_counter() - start
+
+        metrics = buffer.metrics()
+        stored = sum(entry['access_count'] for entry in store.load_all().values())
+        click.echo(f"{'BUFFERED':<14} {accesses:>8} accesses  {record_seconds:>7.2f} s  "
+                   f"{accesses / record_seconds:>12,.0f} accesses/s  "
+                   f"({total_seconds:.2f} s including final flush)")
+        click.echo(f"\n✓ All accesses persisted: {stored == accesses}")
+        click.echo(f"✓ Flushes: {metrics['flushes']}, avg {metrics['avg_flush_ms']:.1f} ms, "
+                   f"max {metrics['max_flush_ms']:.1f} ms\n")
+        store.close()
+
+
+@cli.command()
+@click.option('--accesses', default=1000000, help='Number of access events to record')
+@click.option('--keys', default=200000, help='Number of distinct keys accessed')
+@click.option('--epsilon', default=0.0001, help='Sketch error bound as a fraction of all accesses')
+@click.option('--batch', default=10000, help='Accesses per record_many batch')
+@click.option('--seed', default=42, help='Random seed for the access stream')
+def sketch(accesses, keys, epsilon, batch, seed):
+    """Compare exact per-key counters with the fixed-memory access sketch."""
+    _print_header("ACCESS SKETCH BENCHMARK")
+
+    rng = random.Random(seed)
+    # Skewed stream: a few keys take most of the accesses
+    stream = [f"dataset/part-{min(int(rng.paretovariate(1.2)) - 1, keys - 1):08d}"
+              if rng.random() < 0.5 else f"dataset/part-{rng.randrange(keys):08d}"
+              for _ in range(accesses)]
+    now = datetime.now()
+
+    start = time.perf_counter()
+    exact = {}
+    for key in stream:
+        exact[key] = exact.get(key, 0) + 1
+    exact_seconds = time.perf_counter() - start
+    # Table, key strings and counters: grows with every distinct key
+    exact_bytes = (sys.getsizeof(exact) + sum(sys.getsizeof(key) for key in exact)
+                   + sum(sys.getsizeof(count) for count in exact.values()))
+
+    start = time.perf_counter()
+    tracker = AccessSketch(epsilon=epsilon, half_life_days=None, landmark=now)
+    for offset in range(0, accesses, batch):
+        counts = {}
+        for key in stream[offset:offset + batch]:
+            counts[key] = counts.get(key, 0) + 1
+        tracker.record_many({key: (count, now) for key, count in counts.items()})
+    sketch_seconds = time.perf_counter() - start
+    # Counter table plus the bounded top-K summary
+    top_keys = tracker.heavy_hitters.counts
+    sketch_bytes = (tracker.memory_bytes + 2 * sys.getsizeof(top_keys)
+                    + sum(sys.getsizeof(key) for key in top_keys))
+
+    click.echo(f"{'EXACT DICT':<12} {len(exact):>8} keys  {exact_seconds:>7.2f} s  "
+               f"{exact_bytes / MB:>8.1f} MB")
+    click.echo(f"{'SKETCH':<12} {len(exact):>8} keys  {sketch_seconds:>7.2f} s  "
+               f"{sketch_bytes / MB:>8.1f} MB (bounded, independent of key count)")
+
+    sample = list(exact)
+    estimates = tracker.estimate_many(sample)
+    errors = estimates - [exact[key] for key in sample]
+    top = tracker.top(10, now)
+    exact_top = sorted(exact, key=exact.get, reverse=True)[:10]
+    click.echo(f"\n✓ Never underestimates: {bool((errors >= 0).all())}")
+    click.echo(f"✓ Error: mean {errors.mean():.2f}, max {errors.max():.0f} accesses "
+               f"(bound {tracker.error_bound():.0f} with {1 - tracker.cms.delta:.1%} confidence)")
+    click.echo(f"✓ Top-10 heavy hitters found: {len(set(key for key, _ in top) & set(exact_top))}/10\n")
+
+
+def _dict_metadata_bytes(metadata):
+    """Approximate memory of a metadata.json-style dict of dicts."""
+    total = sys.getsizeof(metadata)
+    for key, entry in metadata.items():
+        # Field names are shared between entries, values are not
+        total += sys.getsizeof(key) + sys.getsizeof(entry)
+        total += sum(sys.getsizeof(value) for value in entry.values())
+    return total
+
+
+@cli.command()
+@click.option('--objects', default=1000000, help='Number of synthetic metadata entries')
+@click.option('--lookups', default=200000, help='Random key lookups to time')
+@click.option('--seed', default=42, help='Random seed for the synthetic metadata')
+def metadata(objects, lookups, seed):
+    """Compare the dict-of-dicts metadata snapshot with the columnar table."""
+    _print_header("METADATA MEMORY BENCHMARK")
+
+    rng = random.Random(seed)
+    now = datetime.now()
+    entries = {}
+    for i in range(objects):
+        created = now - timedelta(seconds=rng.randint(0, 800 * 86400))
+        last_accessed = created + timedelta(seconds=rng.randint(0, 400 * 86400))
+        count = rng.choice((1, 3, 9, 10, 42, 75))
+        entries[f"dept-{i % 20:02d}/{2019 + i % 7}/object_{i:010d}.parquet"] = {
+            'access_count': count,
+            'access_score': count * rng.random(),
+            'created_timestamp': created.isoformat(),
+            'last_accessed_timestamp': last_accessed.isoformat()
+        }
+    # Round-trip through JSON so the dict looks like one loaded from disk
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'metadata.json')
+        with open(path, 'w') as f:
+            json.dump(entries, f)
+        del entries
+
+        start = time.perf_counter()
+        with open(path) as f:
+            as_dict = json.load(f)
+        dict_seconds = time.perf_counter() - start
+        dict_bytes = _dict_metadata_bytes(as_dict)
+
+        start = time.perf_counter()
+        table = MetadataTable.from_json(path)
+        table_seconds = time.perf_counter() - start
+        table_bytes = table.memory_bytes
+
+    click.echo(f"{'DICT':<12} {objects:>10,} keys  load {dict_seconds:>6.2f} s  "
+               f"{dict_bytes / MB:>8.1f} MB  {dict_bytes / objects:>6.0f} B/object")
+    click.echo(f"{'TABLE':<12} {objects:>10,} keys  load {table_seconds:>6.2f} s  "
+               f"{table_bytes / MB:>8.1f} MB  {table_bytes / objects:>6.0f} B/object")
+
+    sample = rng.sample(list(as_dict), min(lookups, objects))
+    start = time.perf_counter()
+    for key in sample:
+        as_dict[key]['access_count']
+    dict_lookup_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    counts, _, _ = table.decision_columns(sample)
+    table_lookup_seconds = time.perf_counter() - start
+
+    click.echo(f"\n✓ Memory reduction: {dict_bytes / table_bytes:.1f}x")
+    click.echo(f"✓ Lookups: dict {len(sample) / dict_lookup_seconds:,.0f}/s, "
+               f"table {len(sample) / table_lookup_seconds:,.0f}/s")
+    click.echo(f"✓ Identical counts: {counts.tolist() == [as_dict[key]['access_count'] for key in sample]}\n")
+
+
+if __name__ == '__main__':
+    cli()
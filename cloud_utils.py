@@ -2,9 +2,246 @@
 Cloud utilities for interacting with mocked AWS S3.
 Provides a high-level interface for storage operations with multi-cloud support.
 """
+import heapq
+import mmap
+import queue
+import random
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
 import boto3
-from botocore.exceptions import ClientError
-from typing import List, Dict, Optional
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from urllib.parse import urlparse
+from transfer import (
+    CHECKSUM_FIELDS, COPY_OBJECT_MAX_SIZE, COPY_PART_SIZE, MAX_TRANSFER_WORKERS,
+    MULTIPART_CHUNKSIZE, MULTIPART_COPY_THRESHOLD, MULTIPART_THRESHOLD, READ_CHUNK_SIZE,
+    STREAM_CHECKSUM_ALGORITHM, STREAM_MAX_WORKERS, STREAM_PART_SIZE, BufferedObject, TransferResult,
+    UploadCheckpoint, UploadSource, check_checksum_algorithm, iter_download, multipart_copy, open_source,
+    ranged_download, run_bounded, stream_copy, upload_stream
+)
+
+
+# Maximum number of keys S3 returns per list_objects_v2 call
+LIST_PAGE_SIZE = 1000
+
+# Default number of prefix shards listed concurrently
+LIST_MAX_WORKERS = 8
+
+# Maximum number of keys S3 accepts per delete_objects call
+DELETE_BATCH_SIZE = 1000
+
+# Default number of delete_objects batches sent at the same time
+DELETE_MAX_WORKERS = 4
+
+# Default number of storage-class changes running at the same time
+TIER_CHANGE_MAX_WORKERS = 16
+
+# Requests of throttled kinds (tier changes) allowed in flight per cloud,
+# across every S3Manager and run in the process
+CLOUD_CONCURRENCY_LIMITS = {'aws': 64, 'gcp': 32, 'azure': 32}
+DEFAULT_CLOUD_CONCURRENCY = 32
+
+# Error codes meaning "slow down", retried with exponential backoff
+THROTTLE_ERROR_CODES = frozenset({
+    'SlowDown', 'Throttling', 'ThrottlingException', 'RequestLimitExceeded',
+    'TooManyRequests', 'TooManyRequestsException', 'RequestThrottled', '503'
+})
+THROTTLE_MAX_RETRIES = 5
+THROTTLE_BASE_DELAY = 0.2
+THROTTLE_MAX_DELAY = 10.0
+
+# Part of the message of the InvalidRequest error copy_object returns for a
+# source over its 5 GB limit; S3 uses the same code for unrelated faults
+COPY_SOURCE_TOO_LARGE_MESSAGE = 'larger than the maximum allowable size'
+
+# Object attributes a multipart or streamed copy has to carry over explicitly
+# (copy_object with MetadataDirective='COPY' keeps them automatically)
+COPIED_OBJECT_ATTRIBUTES = (
+    'CacheControl', 'ContentDisposition', 'ContentEncoding',
+    'ContentLanguage', 'ContentType', 'Metadata'
+)
+
+
+class ListingError(Exception):
+    """
+    Raised when a bucket listing fails part-way.
+    
+    A listing that stops early must never be taken for a complete one:
+    callers that act on the whole bucket would treat every key after the
+    failure point as gone.
+    """
+
+
+class ClientRegistry:
+    """
+    Process-wide registry of boto3 S3 clients, shared by every S3Manager.
+    
+    Clients are created once per (cloud, region) from a single session, with a
+    connection pool sized for concurrent transfers and TCP keep-alive enabled,
+    so constructing an S3Manager reuses warm connections instead of opening new
+    ones. The registry also remembers which buckets are already known to exist.
+    """
+    
+    # Connections each client keeps open; should be at least the number of
+    # threads that share one client
+    MAX_POOL_CONNECTIONS = 50
+    TCP_KEEPALIVE = True
+    
+    _lock = threading.Lock()
+    _session = None
+    _clients = {}
+    _known_buckets = set()
+    _cloud_slots = {}
+    
+    @classmethod
+    def configure(cls, max_pool_connections: Optional[int] = None,
+                  tcp_keepalive: Optional[bool] = None):
+        """
+        Change connection pool settings. Existing clients are dropped so the
+        next S3Manager picks up the new settings.
+        
+        Args:
+            max_pool_connections: Maximum open connections per client
+            tcp_keepalive: Whether to enable TCP keep-alive on connections
+        """
+        with cls._lock:
+            if max_pool_connections is not None:
+                cls.MAX_POOL_CONNECTIONS = max_pool_connections
+            if tcp_keepalive is not None:
+                cls.TCP_KEEPALIVE = tcp_keepalive
+            cls._clients.clear()
+    
+    @classmethod
+    def get_client(cls, cloud_name: str, region: str):
+        """
+        Get the shared S3 client for a cloud and region, creating it on first use.
+        
+        Args:
+            cloud_name: Name of the cloud provider
+            region: Region the client talks to
+        
+        Returns:
+            boto3 S3 client (thread-safe, shared)
+        """
+        client_key = (cloud_name, region)
+        client = cls._clients.get(client_key)
+        if client is not None:
+            return client
+        
+        # boto3 sessions are not thread-safe, so create clients under the lock
+        with cls._lock:
+            client = cls._clients.get(client_key)
+            if client is None:
+                if cls._session is None:
+                    cls._session = boto3.session.Session()
+                client = cls._session.client(
+                    's3',
+                    region_name=region,
+                    config=Config(
+                        max_pool_connections=cls.MAX_POOL_CONNECTIONS,
+                        tcp_keepalive=cls.TCP_KEEPALIVE
+                    )
+                )
+                cls._clients[client_key] = client
+            return client
+    
+    @classmethod
+    def get_cloud_slots(cls, cloud_name: str) -> threading.BoundedSemaphore:
+        """
+        Get the semaphore that caps concurrent throttled requests to a cloud.
+        
+        Args:
+            cloud_name: Name of the cloud provider
+        
+        Returns:
+            Semaphore shared by every S3Manager for that cloud
+        """
+        slots = cls._cloud_slots.get(cloud_name)
+        if slots is None:
+            with cls._lock:
+                slots = cls._cloud_slots.get(cloud_name)
+                if slots is None:
+                    limit = CLOUD_CONCURRENCY_LIMITS.get(cloud_name, DEFAULT_CLOUD_CONCURRENCY)
+                    slots = cls._cloud_slots[cloud_name] = threading.BoundedSemaphore(limit)
+        return slots
+    
+    @classmethod
+    def set_cloud_concurrency(cls, cloud_name: str, limit: int):
+        """
+        Change the concurrent request limit for a cloud (applies to new requests).
+        
+        Args:
+            cloud_name: Name of the cloud provider
+            limit: Maximum throttled requests in flight
+        """
+        with cls._lock:
+            CLOUD_CONCURRENCY_LIMITS[cloud_name] = limit
+            cls._cloud_slots[cloud_name] = threading.BoundedSemaphore(limit)
+    
+    @classmethod
+    def is_bucket_known(cls, cloud_name: str, bucket_name: str) -> bool:
+        """Check whether a bucket was already confirmed to exist."""
+        return (cloud_name, bucket_name) in cls._known_buckets
+    
+    @classmethod
+    def mark_bucket_known(cls, cloud_name: str, bucket_name: str):
+        """Remember that a bucket exists so later managers skip head_bucket."""
+        with cls._lock:
+            cls._known_buckets.add((cloud_name, bucket_name))
+    
+    @classmethod
+    def reset(cls):
+        """Drop every cached client and known bucket (e.g. after a mock backend reset)."""
+        with cls._lock:
+            cls._session = None
+            cls._clients.clear()
+            cls._known_buckets.clear()
+            cls._cloud_slots.clear()
+
+
+@dataclass
+class ObjectRecord:
+    """
+    A single object as reported by a bucket listing.
+    
+    Fields the listing did not include are None; S3Manager.complete_record()
+    fills them in with a HEAD request.
+    """
+    key: str
+    size: Optional[int] = None
+    storage_class: Optional[str] = None
+    last_modified: Optional[datetime] = None
+    etag: Optional[str] = None
+    
+    @classmethod
+    def from_listing(cls, entry: Dict) -> 'ObjectRecord':
+        """
+        Build a record from a raw list_objects_v2 'Contents' entry.
+        
+        Args:
+            entry: One element of the response's Contents list
+        
+        Returns:
+            ObjectRecord for the entry
+        """
+        etag = entry.get('ETag')
+        return cls(
+            key=entry['Key'],
+            size=entry.get('Size'),
+            storage_class=entry.get('StorageClass'),
+            last_modified=entry.get('LastModified'),
+            etag=etag.strip('"') if etag is not None else None
+        )
+    
+    def is_complete(self) -> bool:
+        """Check whether every field is known."""
+        return None not in (self.size, self.storage_class, self.last_modified, self.etag)
 
 
 class S3Manager:
@@ -21,6 +258,9 @@ class S3Manager:
         """
         Initialize S3 manager and create bucket if it doesn't exist.
         
+        Clients and bucket checks are shared through ClientRegistry, so
+        constructing a manager for a known bucket sends no requests.
+        
         Args:
             cloud_name: Name of the cloud provider ('aws', 'gcp', or 'azure')
             bucket_name: Name of the S3 bucket to manage
@@ -28,11 +268,14 @@ class S3Manager:
         self.cloud_name = cloud_name
         self.bucket_name = bucket_name
         self.region = self.CLOUD_REGIONS.get(cloud_name, 'us-east-1')
-        self.s3_client = boto3.client('s3', region_name=self.region)
+        self.s3_client = ClientRegistry.get_client(cloud_name, self.region)
         self._ensure_bucket_exists()
     
     def _ensure_bucket_exists(self):
         """Create the S3 bucket if it doesn't already exist."""
+        if ClientRegistry.is_bucket_known(self.cloud_name, self.bucket_name):
+            return
+        
         try:
             self.s3_client.head_bucket(Bucket=self.bucket_name)
         except ClientError:
@@ -47,30 +290,68 @@ class S3Manager:
                     CreateBucketConfiguration={'LocationConstraint': self.region}
                 )
             print(f"✓ Created S3 bucket: {self.bucket_name} ({self.cloud_name.upper()} - {self.region})")
+        
+        ClientRegistry.mark_bucket_known(self.cloud_name, self.bucket_name)
     
-    def upload_file(self, file_key: str, content: str = "mock-data", tier: str = 'STANDARD') -> bool:
+    def upload_file(self, file_key: str, content: Union[str, bytes] = "mock-data", tier: str = 'STANDARD') -> bool:
         """
         Upload a file to S3 with specified storage class.
         
         Args:
             file_key: The key/path for the file in S3
-            content: File content (using mock data for demo)
+            content: File content; text is UTF-8 encoded, bytes are sent unchanged
             tier: Storage class (STANDARD, STANDARD_IA, GLACIER, etc.)
         
         Returns:
             True if upload successful, False otherwise
         """
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        return self.upload_object(file_key, content, tier=tier) is not None
+    
+    def upload_object(self, file_key: str, source: UploadSource, tier: str = 'STANDARD',
+                      multipart_threshold: int = MULTIPART_THRESHOLD,
+                      part_size: int = MULTIPART_CHUNKSIZE,
+                      max_workers: int = MAX_TRANSFER_WORKERS) -> Optional[TransferResult]:
+        """
+        Upload binary data, a local file, or a stream to S3.
+        
+        Objects at or above multipart_threshold are sent as a multipart upload
+        with parts uploaded in parallel; memory use stays within about
+        part_size * max_workers however large the object is.
+        
+        Args:
+            file_key: The key/path for the file in S3
+            source: bytes-like object, path to a local file, or binary file-like object
+            tier: Storage class (STANDARD, STANDARD_IA, GLACIER, etc.)
+            multipart_threshold: Size in bytes at which multipart upload is used
+            part_size: Size of each multipart part in bytes
+            max_workers: Maximum number of parts uploaded at the same time
+        
+        Returns:
+            TransferResult with size, part count and throughput, or None on failure
+        """
         try:
-            self.s3_client.put_object(
-                Bucket=self.bucket_name,
-                Key=file_key,
-                Body=content.encode('utf-8'),
-                StorageClass=tier
+            stream, size, owned = open_source(source)
+        except OSError as e:
+            print(f"✗ Error uploading {file_key}: {e}")
+            return None
+        
+        try:
+            return upload_stream(
+                self.s3_client, self.bucket_name, file_key, stream,
+                size=size,
+                multipart_threshold=multipart_threshold,
+                part_size=part_size,
+                max_workers=max_workers,
+                extra_args={'StorageClass': tier}
             )
-            return True
-        except ClientError as e:
+        except (ClientError, OSError) as e:
             print(f"✗ Error uploading {file_key}: {e}")
-            return False
+            return None
+        finally:
+            if owned:
+                stream.close()
     
     def get_file_tier(self, file_key: str) -> Optional[str]:
         """
@@ -91,51 +372,387 @@ class S3Manager:
         except ClientError:
             return None
     
-    def change_file_tier(self, file_key: str, new_tier: str) -> bool:
+    def change_file_tier(self, file_key: str, new_tier: str, size: Optional[int] = None) -> bool:
         """
         Change the storage class of an existing file using copy-and-delete pattern.
         
+        Objects too large for copy_object (over 5 GB) are rewritten in place with
+        a parallel multipart copy that keeps their metadata and checksum algorithm.
+        
         Args:
             file_key: The key/path for the file in S3
             new_tier: Target storage class
+            size: Object size in bytes, if already known (e.g. from a listing)
         
         Returns:
             True if tier change successful, False otherwise
         """
         try:
-            # Copy object to itself with new storage class
-            copy_source = {
-                'Bucket': self.bucket_name,
-                'Key': file_key
-            }
-            self.s3_client.copy_object(
-                CopySource=copy_source,
-                Bucket=self.bucket_name,
-                Key=file_key,
-                StorageClass=new_tier,
-                MetadataDirective='COPY'
-            )
+            self._change_tier(file_key, new_tier, size)
             return True
         except ClientError as e:
             print(f"✗ Error changing tier for {file_key}: {e}")
             return False
     
+    def change_tiers(self, transitions: Iterable[Tuple[str, str, Optional[int]]],
+                     max_workers: int = TIER_CHANGE_MAX_WORKERS) -> Dict[str, Optional[str]]:
+        """
+        Change the storage class of many files at once on a bounded worker pool.
+        
+        Args:
+            transitions: (file_key, new_tier, size or None) tuples
+            max_workers: Maximum number of tier changes running at the same time
+        
+        Returns:
+            Dictionary mapping each key to None on success or its error message
+        """
+        return dict(self.iter_tier_changes(transitions, max_workers))
+    
+    def iter_tier_changes(self, transitions: Iterable[Tuple[str, str, Optional[int]]],
+                          max_workers: int = TIER_CHANGE_MAX_WORKERS) -> Iterator[Tuple[str, Optional[str]]]:
+        """
+        Change the storage class of many files, yielding each result as it completes.
+        
+        Runs on a bounded worker pool; requests also share the cloud's
+        process-wide concurrency limit, and throttled requests are retried
+        with exponential backoff.
+        
+        Args:
+            transitions: (file_key, new_tier, size or None) tuples
+            max_workers: Maximum number of tier changes running at the same time
+        
+        Yields:
+            (file_key, None on success or error message), in completion order
+        """
+        def _apply(transition: Tuple[str, str, Optional[int]]) -> Optional[str]:
+            file_key, new_tier, size = transition
+            try:
+                self._with_throttle_retry(self._change_tier, file_key, new_tier, size)
+                return None
+            except ClientError as e:
+                return str(e)
+        
+        for transition, error in run_bounded(_apply, transitions, max_workers):
+            yield transition[0], error
+    
+    def _with_throttle_retry(self, fn, *args, **kwargs):
+        """
+        Call fn inside the cloud's concurrency limit, retrying throttling errors.
+        
+        Backs off exponentially with full jitter between attempts, without
+        holding a concurrency slot while waiting.
+        
+        Raises:
+            ClientError: If fn fails with a non-throttling error, or is still
+                throttled after THROTTLE_MAX_RETRIES retries
+        """
+        slots = ClientRegistry.get_cloud_slots(self.cloud_name)
+        for attempt in range(THROTTLE_MAX_RETRIES + 1):
+            with slots:
+                try:
+                    return fn(*args, **kwargs)
+                except ClientError as e:
+                    error = e.response.get('Error', {})
+                    status = e.response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+                    throttled = error.get('Code') in THROTTLE_ERROR_CODES or status in (429, 503)
+                    if not throttled or attempt == THROTTLE_MAX_RETRIES:
+                        raise
+            time.sleep(random.uniform(0, min(THROTTLE_MAX_DELAY, THROTTLE_BASE_DELAY * 2 ** attempt)))
+    
+    def _change_tier(self, file_key: str, new_tier: str, size: Optional[int] = None,
+                     multipart_threshold: int = COPY_OBJECT_MAX_SIZE):
+        """
+        Copy an object onto itself with a new storage class.
+        
+        Args:
+            file_key: The key/path for the file in S3
+            new_tier: Target storage class
+            size: Object size in bytes, if already known
+            multipart_threshold: Size in bytes at which multipart copy is used
+        
+        Raises:
+            ClientError: If the copy fails
+        """
+        if size is None or size < multipart_threshold:
+            # Common case: no HEAD needed, copy_object keeps metadata and ETag
+            try:
+                self.s3_client.copy_object(
+                    CopySource={'Bucket': self.bucket_name, 'Key': file_key},
+                    Bucket=self.bucket_name,
+                    Key=file_key,
+                    StorageClass=new_tier,
+                    MetadataDirective='COPY'
+                )
+                return
+            except ClientError as e:
+                error = e.response.get('Error', {})
+                if (error.get('Code') != 'InvalidRequest'
+                        or COPY_SOURCE_TOO_LARGE_MESSAGE not in error.get('Message', '')):
+                    raise
+                # The object grew past copy_object's limit; fall through to multipart
+        
+        self._server_side_copy(self.bucket_name, file_key, new_tier,
+                               multipart_threshold=multipart_threshold)
+    
     def list_all_files(self) -> List[str]:
         """
         List all files in the bucket.
         
+        Follows continuation tokens, so buckets with more than 1,000 keys are
+        listed completely. Prefer iter_objects() for large buckets.
+        
         Returns:
-            List of file keys
+            List of file keys, or an empty list if the listing failed
         """
         try:
-            response = self.s3_client.list_objects_v2(Bucket=self.bucket_name)
-            if 'Contents' in response:
-                return [obj['Key'] for obj in response['Contents']]
-            return []
-        except ClientError as e:
+            return [record.key for record in self.iter_objects()]
+        except ListingError as e:
             print(f"✗ Error listing files: {e}")
             return []
     
+    def iter_object_pages(self, prefix: str = '', page_size: int = LIST_PAGE_SIZE) -> Iterator[List['ObjectRecord']]:
+        """
+        Yield the bucket listing one page at a time, following continuation tokens.
+        
+        Only one page is held in memory at a time, so this scales to buckets
+        with tens of millions of objects.
+        
+        Args:
+            prefix: Only list keys starting with this prefix
+            page_size: Maximum number of keys per page (S3 caps this at 1,000)
+        
+        Yields:
+            Lists of ObjectRecords built from the listing
+        
+        Raises:
+            ListingError: If a request fails, including after some pages were
+                yielded, so a truncated listing cannot pass for a complete one
+        """
+        request = {'Bucket': self.bucket_name, 'MaxKeys': page_size}
+        if prefix:
+            request['Prefix'] = prefix
+        
+        pages_listed = 0
+        try:
+            while True:
+                response = self.s3_client.list_objects_v2(**request)
+                pages_listed += 1
+                page = [ObjectRecord.from_listing(obj) for obj in response.get('Contents', [])]
+                if page:
+                    yield page
+                
+                if not response.get('IsTruncated'):
+                    return
+                request['ContinuationToken'] = response['NextContinuationToken']
+        except ClientError as e:
+            raise ListingError(f"Listing '{self.bucket_name}/{prefix}' failed after "
+                               f"{pages_listed} page(s): {e}") from e
+    
+    def iter_objects(self, prefix: str = '', page_size: int = LIST_PAGE_SIZE) -> Iterator['ObjectRecord']:
+        """
+        Iterate over every object in the bucket in key order, in constant memory.
+        
+        Args:
+            prefix: Only list keys starting with this prefix
+            page_size: Maximum number of keys fetched per request
+        
+        Yields:
+            ObjectRecords built from the listing
+        
+        Raises:
+            ListingError: If the listing fails part-way
+        """
+        for page in self.iter_object_pages(prefix, page_size):
+            yield from page
+    
+    def iter_objects_parallel(self, prefixes: Optional[List[str]] = None, delimiter: str = '/',
+                              max_workers: int = LIST_MAX_WORKERS,
+                              page_size: int = LIST_PAGE_SIZE,
+                              shard_buffer_pages: int = 4) -> Iterator['ObjectRecord']:
+        """
+        Iterate over the bucket by listing prefix shards concurrently.
+        
+        The keyspace is split into shards, either the given prefixes or the
+        common prefixes found with a delimiter listing. Shards are listed at the
+        same time on a bounded thread pool and stitched back together into one
+        stream in key order. Each shard buffers at most shard_buffer_pages pages,
+        so memory stays bounded no matter how large the bucket is.
+        
+        Args:
+            prefixes: Disjoint prefixes that together cover the keys to list.
+                When omitted, shards are discovered with a delimiter listing.
+            delimiter: Delimiter used to discover shards
+            max_workers: Maximum number of shards listed at the same time
+            page_size: Maximum number of keys fetched per request
+            shard_buffer_pages: Pages each shard may list ahead of the consumer
+        
+        Yields:
+            ObjectRecords built from the listing, in key order
+        
+        Raises:
+            ListingError: If listing the top level or any shard fails
+        """
+        if prefixes is not None:
+            entries = (('prefix', prefix) for prefix in sorted(prefixes))
+        else:
+            entries = self._iter_delimited_entries(delimiter, page_size)
+        
+        # Keep enough shards in flight to saturate the pool, but never read
+        # more than a few delimiter pages ahead of the consumer
+        max_pending_shards = max_workers * 2
+        max_pending_entries = page_size * shard_buffer_pages
+        
+        cancelled = threading.Event()
+        pending = deque()
+        pending_shards = 0
+        
+        with ThreadPoolExecutor(max_workers=max_workers,
+                                thread_name_prefix=f"list-{self.cloud_name}") as pool:
+            try:
+                while True:
+                    # Refill the look-ahead window, starting shard listings as we go
+                    while pending_shards < max_pending_shards and len(pending) < max_pending_entries:
+                        entry = next(entries, None)
+                        if entry is None:
+                            break
+                        kind, value = entry
+                        if kind == 'prefix':
+                            pages = queue.Queue(maxsize=shard_buffer_pages)
+                            pool.submit(self._list_shard, value, page_size, pages, cancelled)
+                            pending.append(('shard', pages))
+                            pending_shards += 1
+                        else:
+                            pending.append((kind, value))
+                    
+                    if not pending:
+                        return
+                    
+                    kind, value = pending.popleft()
+                    if kind == 'key':
+                        yield value
+                        continue
+                    
+                    # Shards are disjoint key ranges, so draining them in
+                    # order keeps the merged stream sorted
+                    pending_shards -= 1
+                    while True:
+                        page = value.get()
+                        if page is None:
+                            break
+                        if isinstance(page, ListingError):
+                            raise page
+                        yield from page
+            finally:
+                cancelled.set()
+                pool.shutdown(wait=True, cancel_futures=True)
+    
+    def _iter_delimited_entries(self, delimiter: str, page_size: int) -> Iterator[tuple]:
+        """
+        Yield the top level of the bucket in key order.
+        
+        Args:
+            delimiter: Delimiter that separates the top level from shard contents
+            page_size: Maximum number of entries fetched per request
+        
+        Yields:
+            ('key', record) for top-level objects and ('prefix', prefix) for shards
+        
+        Raises:
+            ListingError: If a request fails
+        """
+        request = {'Bucket': self.bucket_name, 'Delimiter': delimiter, 'MaxKeys': page_size}
+        try:
+            while True:
+                response = self.s3_client.list_objects_v2(**request)
+                keys = (('key', ObjectRecord.from_listing(obj))
+                        for obj in response.get('Contents', []))
+                shards = (('prefix', common['Prefix'])
+                          for common in response.get('CommonPrefixes', []))
+                yield from heapq.merge(keys, shards, key=self._entry_sort_key)
+                
+                if not response.get('IsTruncated'):
+                    return
+                request['ContinuationToken'] = response['NextContinuationToken']
+        except ClientError as e:
+            raise ListingError(f"Listing the top level of '{self.bucket_name}' failed: {e}") from e
+    
+    @staticmethod
+    def _entry_sort_key(entry: tuple) -> str:
+        """Sort key for entries produced by _iter_delimited_entries."""
+        kind, value = entry
+        return value.key if kind == 'key' else value
+    
+    def _list_shard(self, prefix: str, page_size: int, pages: queue.Queue,
+                    cancelled: threading.Event):
+        """
+        List one prefix shard into a bounded queue, ending with a None sentinel.
+        
+        A failed listing is queued as its ListingError, ahead of the sentinel,
+        so the consumer raises it instead of ending the shard early.
+        
+        Args:
+            prefix: Prefix of the shard to list
+            page_size: Maximum number of keys fetched per request
+            pages: Queue receiving pages of ObjectRecords
+            cancelled: Set when the consumer stops reading
+        """
+        if cancelled.is_set():
+            return
+        
+        try:
+            for page in self.iter_object_pages(prefix, page_size):
+                if not self._put_unless_cancelled(pages, page, cancelled):
+                    return
+        except ListingError as e:
+            self._put_unless_cancelled(pages, e, cancelled)
+        finally:
+            self._put_unless_cancelled(pages, None, cancelled)
+    
+    @staticmethod
+    def _put_unless_cancelled(pages: queue.Queue, item, cancelled: threading.Event) -> bool:
+        """Block until item fits in the queue; give up if listing was cancelled."""
+        while not cancelled.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def complete_record(self, record: 'ObjectRecord') -> 'ObjectRecord':
+        """
+        Fill in fields the listing did not provide with a HEAD request.
+        
+        Listings normally include everything an ObjectRecord needs, so this is
+        free for almost every object; HEAD is only sent when a field is missing.
+        
+        Args:
+            record: ObjectRecord to complete in place
+        
+        Returns:
+            The same record, completed where possible
+        """
+        if record.is_complete():
+            return record
+        
+        try:
+            response = self.s3_client.head_object(
+                Bucket=self.bucket_name,
+                Key=record.key
+            )
+        except ClientError:
+            return record
+        
+        if record.size is None:
+            record.size = response.get('ContentLength', 0)
+        if record.storage_class is None:
+            record.storage_class = response.get('StorageClass', 'STANDARD')
+        if record.last_modified is None:
+            record.last_modified = response.get('LastModified')
+        if record.etag is None:
+            record.etag = response.get('ETag', '').strip('"')
+        return record
+    
     def get_file_metadata(self, file_key: str) -> Optional[Dict]:
         """
         Get comprehensive metadata for a file.
@@ -154,7 +771,8 @@ class S3Manager:
             return {
                 'size': response.get('ContentLength', 0),
                 'last_modified': response.get('LastModified'),
-                'storage_class': response.get('StorageClass', 'STANDARD')
+                'storage_class': response.get('StorageClass', 'STANDARD'),
+                'etag': response.get('ETag', '').strip('"')
             }
         except ClientError:
             return None
@@ -179,6 +797,61 @@ class S3Manager:
             print(f"✗ Error deleting {file_key}: {e}")
             return False
     
+    def delete_files(self, file_keys: Iterable[str], batch_size: int = DELETE_BATCH_SIZE,
+                     max_workers: int = DELETE_MAX_WORKERS) -> Dict[str, str]:
+        """
+        Delete many files with batched delete_objects calls.
+        
+        Keys are grouped into batches of up to 1,000 (the S3 limit) and several
+        batches are sent at the same time.
+        
+        Args:
+            file_keys: Keys/paths of the files to delete
+            batch_size: Keys per delete_objects call (at most 1,000)
+            max_workers: Maximum number of batches sent at the same time
+        
+        Returns:
+            Dictionary mapping each key that could not be deleted to its error;
+            empty if every deletion succeeded
+        """
+        batch_size = min(batch_size, DELETE_BATCH_SIZE)
+        keys = iter(file_keys)
+        batches = iter(lambda: list(islice(keys, batch_size)), [])
+        errors = {}
+        
+        with ThreadPoolExecutor(max_workers=max_workers,
+                                thread_name_prefix=f"delete-{self.cloud_name}") as pool:
+            for batch_errors in pool.map(self._delete_batch, batches):
+                errors.update(batch_errors)
+        
+        if errors:
+            print(f"✗ Error deleting {len(errors)} file(s) from {self.bucket_name}")
+        return errors
+    
+    def _delete_batch(self, batch: List[str]) -> Dict[str, str]:
+        """
+        Delete up to 1,000 keys with one delete_objects call.
+        
+        Args:
+            batch: Keys to delete
+        
+        Returns:
+            Dictionary mapping each key that could not be deleted to its error
+        """
+        try:
+            response = self.s3_client.delete_objects(
+                Bucket=self.bucket_name,
+                Delete={
+                    'Objects': [{'Key': key} for key in batch],
+                    'Quiet': True
+                }
+            )
+        except ClientError as e:
+            return {key: str(e) for key in batch}
+        
+        return {error['Key']: f"{error.get('Code')}: {error.get('Message')}"
+                for error in response.get('Errors', [])}
+    
     def download_file_content(self, file_key: str) -> Optional[bytes]:
         """
         Download the content of a file from S3.
@@ -199,6 +872,425 @@ class S3Manager:
             print(f"✗ Error downloading {file_key}: {e}")
             return None
     
+    def download_into_buffer(self, file_key: str, size: Optional[int] = None,
+                             etag: Optional[str] = None,
+                             part_size: int = MULTIPART_CHUNKSIZE,
+                             max_workers: int = MAX_TRANSFER_WORKERS) -> Optional[bytearray]:
+        """
+        Download a file with concurrent ranged GETs into one preallocated bytearray.
+        
+        Args:
+            file_key: The key/path for the file in S3
+            size: Object size in bytes, if already known (skips the HEAD request)
+            etag: Object ETag, if already known; ranges are pinned to it
+            part_size: Size of each ranged GET in bytes
+            max_workers: Maximum number of ranges fetched at the same time
+        
+        Returns:
+            File content as a bytearray, or None if the download failed
+        """
+        try:
+            size, etag = self._size_and_etag(file_key, size, etag)
+            buffer = bytearray(size)
+            ranged_download(self.s3_client, self.bucket_name, file_key, buffer, size,
+                            part_size=part_size, max_workers=max_workers, etag=etag)
+            return buffer
+        except (ClientError, IOError) as e:
+            print(f"✗ Error downloading {file_key}: {e}")
+            return None
+    
+    def download_to_file(self, file_key: str, path: str, size: Optional[int] = None,
+                         etag: Optional[str] = None,
+                         part_size: int = MULTIPART_CHUNKSIZE,
+                         max_workers: int = MAX_TRANSFER_WORKERS) -> Optional[TransferResult]:
+        """
+        Download a file with concurrent ranged GETs into a memory-mapped local file.
+        
+        The local file is preallocated to the object size and every range is
+        written directly into the mapping, so the object is never held in
+        process memory as a whole.
+        
+        Args:
+            file_key: The key/path for the file in S3
+            path: Local file to create or overwrite
+            size: Object size in bytes, if already known (skips the HEAD request)
+            etag: Object ETag, if already known; ranges are pinned to it
+            part_size: Size of each ranged GET in bytes
+            max_workers: Maximum number of ranges fetched at the same time
+        
+        Returns:
+            TransferResult with size, range count and throughput, or None on failure
+        """
+        start = time.perf_counter()
+        try:
+            size, etag = self._size_and_etag(file_key, size, etag)
+            with open(path, 'w+b') as f:
+                f.truncate(size)
+                parts = 0
+                if size > 0:
+                    with mmap.mmap(f.fileno(), size) as mapped:
+                        parts = ranged_download(self.s3_client, self.bucket_name, file_key,
+                                                mapped, size, part_size=part_size,
+                                                max_workers=max_workers, etag=etag)
+                        mapped.flush()
+            return TransferResult(
+                key=file_key,
+                bytes_transferred=size,
+                seconds=time.perf_counter() - start,
+                parts=parts,
+                etag=etag
+            )
+        except (ClientError, IOError) as e:
+            print(f"✗ Error downloading {file_key}: {e}")
+            return None
+    
+    def iter_file_content(self, file_key: str, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[bytes]:
+        """
+        Stream the content of a file one chunk at a time, for consumers that
+        read the data only once.
+        
+        Args:
+            file_key: The key/path for the file in S3
+            chunk_size: Size of each chunk in bytes
+        
+        Yields:
+            Consecutive chunks of the file
+        
+        Raises:
+            ClientError: If the read fails, including part-way through, so a
+                partial read is never mistaken for the whole file
+        """
+        yield from iter_download(self.s3_client, self.bucket_name, file_key, chunk_size)
+    
+    def can_copy_from(self, source_manager: 'S3Manager') -> bool:
+        """
+        Check whether this manager can copy objects from another one server-side.
+        
+        That is possible when both buckets are reached through the same S3 API:
+        the same partition and endpoint domain, with credentials from the same
+        ClientRegistry session.
+        
+        Args:
+            source_manager: S3Manager holding the objects to copy
+        
+        Returns:
+            True if copy_object/upload_part_copy can read the source directly
+        """
+        mine, theirs = self.s3_client.meta, source_manager.s3_client.meta
+        return (mine.partition == theirs.partition
+                and self._endpoint_domain(mine.endpoint_url) == self._endpoint_domain(theirs.endpoint_url))
+    
+    @staticmethod
+    def _endpoint_domain(endpoint_url: str) -> str:
+        """Registered domain of an endpoint, e.g. 'amazonaws.com'."""
+        host = urlparse(endpoint_url).hostname or ''
+        return '.'.join(host.split('.')[-2:])
+    
+    def copy_from(self, source_manager: 'S3Manager', file_key: str, tier: Optional[str] = None,
+                  size: Optional[int] = None, etag: Optional[str] = None,
+                  multipart_threshold: int = MULTIPART_COPY_THRESHOLD,
+                  part_size: int = COPY_PART_SIZE,
+                  max_workers: int = MAX_TRANSFER_WORKERS,
+                  checkpoint: Optional[UploadCheckpoint] = None) -> Optional[TransferResult]:
+        """
+        Copy a file from another bucket server-side, without downloading it.
+        
+        Small objects use a single copy_object; objects at or above
+        multipart_threshold are copied with parallel upload_part_copy requests.
+        Only works when can_copy_from(source_manager) is True.
+        
+        Args:
+            source_manager: S3Manager holding the object
+            file_key: The key/path of the file (same key in both buckets)
+            tier: Destination storage class (default: keep the source's)
+            size: Source size in bytes, if already known
+            etag: Source ETag, if already known; the copy fails if it changes
+            multipart_threshold: Size in bytes at which multipart copy is used
+            part_size: Size of each copied part in bytes
+            max_workers: Maximum number of parts copied at the same time
+            checkpoint: Multipart progress record; a resumed copy skips finished
+                parts, and a failed one is left open if the checkpoint is persistent
+        
+        Returns:
+            TransferResult for the copy, or None on failure
+        """
+        try:
+            return self._server_side_copy(
+                source_manager.bucket_name, file_key, tier,
+                size=size,
+                etag=etag,
+                multipart_threshold=multipart_threshold,
+                part_size=part_size,
+                max_workers=max_workers,
+                source_client=source_manager.s3_client,
+                checkpoint=checkpoint
+            )
+        except ClientError as e:
+            print(f"✗ Error copying {file_key}: {e}")
+            return None
+    
+    def stream_from(self, source_manager: 'S3Manager', file_key: str, tier: Optional[str] = None,
+                    part_size: int = STREAM_PART_SIZE,
+                    max_workers: int = STREAM_MAX_WORKERS,
+                    checksum_algorithm: Optional[str] = STREAM_CHECKSUM_ALGORITHM,
+                    checkpoint: Optional[UploadCheckpoint] = None) -> Optional[TransferResult]:
+        """
+        Copy a file from another cloud by streaming it through this host.
+        
+        For clouds that cannot copy server-side. The source body is piped
+        into a multipart upload part by part, so memory stays within about
+        part_size * max_workers and the bytes arrive unchanged. The GET is
+        pinned to the source's ETag, and a copy whose byte count differs
+        from the source size is reported as a failure.
+        
+        With a checksum_algorithm the provider checks every request body
+        against a checksum computed while sending, and rejects corrupted parts.
+        
+        Args:
+            source_manager: S3Manager holding the object
+            file_key: The key/path of the file (same key in both buckets)
+            tier: Destination storage class (default: keep the source's)
+            part_size: Size of each uploaded part in bytes
+            max_workers: Maximum number of parts buffered and uploaded at the same time
+            checksum_algorithm: Checksum the provider verifies on upload (None for none)
+            checkpoint: Multipart progress record; a resumed upload only streams
+                the parts it has not finished, and a failed one is left open if
+                the checkpoint is persistent
+        
+        Returns:
+            TransferResult for the copy, with the streamed bytes' MD5 (unless
+            resumed) and expected ETag, or None on failure
+        
+        Raises:
+            ValueError: If the checksum algorithm is not supported
+        """
+        check_checksum_algorithm(checksum_algorithm)
+        try:
+            head = source_manager.s3_client.head_object(Bucket=source_manager.bucket_name, Key=file_key)
+            extra_args = {name: head[name] for name in COPIED_OBJECT_ATTRIBUTES if head.get(name)}
+            extra_args['StorageClass'] = tier or head.get('StorageClass', 'STANDARD')
+            if checksum_algorithm:
+                extra_args['ChecksumAlgorithm'] = checksum_algorithm
+            result = stream_copy(
+                source_manager.s3_client, source_manager.bucket_name, file_key,
+                self.s3_client, self.bucket_name, file_key,
+                size=head['ContentLength'],
+                source_etag=head.get('ETag', '').strip('"') or None,
+                part_size=part_size,
+                max_workers=max_workers,
+                extra_args=extra_args,
+                checkpoint=checkpoint
+            )
+        except (ClientError, BotoCoreError, IOError) as e:
+            print(f"✗ Error streaming {file_key}: {e}")
+            return None
+        return result
+    
+    def buffer_object(self, file_key: str, etag: Optional[str] = None) -> Optional[BufferedObject]:
+        """
+        Read a whole object into memory, with the attributes a copy of it keeps.
+        
+        For objects small enough to upload with a single PUT, so reading,
+        hashing and uploading them can be done by separate pipeline stages.
+        
+        Args:
+            file_key: The key/path for the file in S3
+            etag: If given, the read fails unless the object still has this ETag
+        
+        Returns:
+            BufferedObject (not yet hashed), or None on failure
+        """
+        request = {'Bucket': self.bucket_name, 'Key': file_key}
+        if etag:
+            request['IfMatch'] = etag
+        try:
+            response = self.s3_client.get_object(**request)
+            with response['Body'] as body:
+                data = body.read()
+            if len(data) != response.get('ContentLength', len(data)):
+                raise IOError(f"Short read for {file_key}: got {len(data)} of {response['ContentLength']} bytes")
+        except (ClientError, BotoCoreError, IOError) as e:
+            print(f"✗ Error reading {file_key}: {e}")
+            return None
+        return BufferedObject(
+            key=file_key,
+            data=data,
+            etag=response.get('ETag', '').strip('"') or None,
+            attributes={name: response[name] for name in COPIED_OBJECT_ATTRIBUTES if response.get(name)},
+            storage_class=response.get('StorageClass', 'STANDARD')
+        )
+    
+    def upload_buffered(self, buffered: BufferedObject, tier: Optional[str] = None,
+                        checksum_algorithm: Optional[str] = STREAM_CHECKSUM_ALGORITHM) -> Optional[TransferResult]:
+        """
+        Upload an object read with buffer_object() to this bucket, under the same key.
+        
+        Args:
+            buffered: The object to upload (hashed first, unless it already is)
+            tier: Destination storage class (default: keep the source's)
+            checksum_algorithm: Checksum the provider verifies on upload, if
+                the object is not hashed yet
+        
+        Returns:
+            TransferResult with the content's MD5 as the expected ETag, or None on failure
+        """
+        if buffered.md5 is None:
+            buffered.hash(checksum_algorithm)
+        request = dict(buffered.attributes)
+        request['StorageClass'] = tier or buffered.storage_class
+        checksum_field = CHECKSUM_FIELDS.get(buffered.checksum_algorithm)
+        if checksum_field and buffered.checksum:
+            request[checksum_field] = buffered.checksum
+        
+        start = time.perf_counter()
+        try:
+            response = self.s3_client.put_object(
+                Bucket=self.bucket_name, Key=buffered.key, Body=buffered.data, **request
+            )
+        except (ClientError, BotoCoreError) as e:
+            print(f"✗ Error uploading {buffered.key}: {e}")
+            return None
+        return TransferResult(
+            key=buffered.key,
+            bytes_transferred=len(buffered.data),
+            seconds=time.perf_counter() - start,
+            etag=response.get('ETag', '').strip('"'),
+            checksum=response.get(checksum_field) if checksum_field else None,
+            md5=buffered.md5,
+            expected_etag=buffered.md5
+        )
+    
+    def abort_upload(self, file_key: str, upload_id: str) -> bool:
+        """
+        Abort an unfinished multipart upload, discarding its parts.
+        
+        Args:
+            file_key: The key/path the upload was writing
+            upload_id: Upload to abort
+        
+        Returns:
+            True if aborted (or already gone), False otherwise
+        """
+        try:
+            self.s3_client.abort_multipart_upload(Bucket=self.bucket_name, Key=file_key, UploadId=upload_id)
+            return True
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') == 'NoSuchUpload':
+                return True
+            print(f"✗ Error aborting upload of {file_key}: {e}")
+            return False
+    
+    def _server_side_copy(self, source_bucket: str, file_key: str, tier: Optional[str],
+                          size: Optional[int] = None, etag: Optional[str] = None,
+                          multipart_threshold: int = MULTIPART_COPY_THRESHOLD,
+                          part_size: int = COPY_PART_SIZE,
+                          max_workers: int = MAX_TRANSFER_WORKERS,
+                          source_client=None,
+                          checkpoint: Optional[UploadCheckpoint] = None) -> TransferResult:
+        """
+        Copy an object into this bucket server-side (possibly onto itself).
+        
+        Multipart copies recreate the object, so its content headers, user
+        metadata and checksum algorithm are read from the source and applied
+        explicitly; copy_object keeps them with MetadataDirective='COPY'.
+        
+        Args:
+            source_bucket: Bucket holding the source object
+            file_key: The key/path of the file (same key in both buckets)
+            tier: Destination storage class (None keeps the source's)
+            size: Source size in bytes, if already known
+            etag: Source ETag, if already known; the copy fails if it changes
+            multipart_threshold: Size in bytes at which multipart copy is used
+            part_size: Size of each copied part in bytes
+            max_workers: Maximum number of parts copied at the same time
+            source_client: Client used to inspect the source (default: this manager's)
+            checkpoint: Progress record for a multipart copy (see multipart_copy())
+        
+        Returns:
+            TransferResult for the copy
+        
+        Raises:
+            ClientError: If the copy fails
+        """
+        start = time.perf_counter()
+        copy_source = {'Bucket': source_bucket, 'Key': file_key}
+        
+        head = None
+        if size is None or tier is None or size >= multipart_threshold:
+            head = (source_client or self.s3_client).head_object(
+                Bucket=source_bucket,
+                Key=file_key,
+                ChecksumMode='ENABLED'
+            )
+            size = head['ContentLength']
+            etag = etag or head.get('ETag', '').strip('"')
+        storage_class = tier or head.get('StorageClass', 'STANDARD')
+        checksum_algorithm = self._checksum_algorithm(head) if head else None
+        
+        if size < multipart_threshold:
+            request = {
+                'CopySource': copy_source,
+                'Bucket': self.bucket_name,
+                'Key': file_key,
+                'StorageClass': storage_class,
+                'MetadataDirective': 'COPY'
+            }
+            if etag:
+                request['CopySourceIfMatch'] = etag
+            if checksum_algorithm:
+                request['ChecksumAlgorithm'] = checksum_algorithm
+            response = self.s3_client.copy_object(**request)
+            parts = 1
+            new_etag = response['CopyObjectResult']['ETag'].strip('"')
+        else:
+            extra_args = {name: head[name] for name in COPIED_OBJECT_ATTRIBUTES if head.get(name)}
+            extra_args['StorageClass'] = storage_class
+            if checksum_algorithm:
+                extra_args['ChecksumAlgorithm'] = checksum_algorithm
+            parts, new_etag = multipart_copy(
+                self.s3_client, source_bucket, file_key,
+                self.bucket_name, file_key, size,
+                part_size=part_size,
+                max_workers=max_workers,
+                source_etag=etag,
+                extra_args=extra_args,
+                checkpoint=checkpoint
+            )
+        
+        return TransferResult(
+            key=file_key,
+            bytes_transferred=size,
+            seconds=time.perf_counter() - start,
+            parts=parts,
+            etag=new_etag
+        )
+    
+    @staticmethod
+    def _checksum_algorithm(head: Dict) -> Optional[str]:
+        """Checksum algorithm an object was stored with, from a HEAD response."""
+        for algorithm, field in CHECKSUM_FIELDS.items():
+            if head.get(field):
+                return algorithm
+        return None
+    
+    def _size_and_etag(self, file_key: str, size: Optional[int] = None,
+                       etag: Optional[str] = None) -> tuple:
+        """
+        Get an object's size and ETag, sending a HEAD request only if the size is unknown.
+        
+        Args:
+            file_key: The key/path for the file in S3
+            size: Known size in bytes, if any
+            etag: Known ETag, if any
+        
+        Returns:
+            Tuple of (size in bytes, ETag or None)
+        """
+        if size is not None:
+            return size, etag
+        response = self.s3_client.head_object(Bucket=self.bucket_name, Key=file_key)
+        return response['ContentLength'], response.get('ETag', '').strip('"') or None
+    
     def get_cloud_name(self) -> str:
         """Get the cloud provider name."""
         return self.cloud_name
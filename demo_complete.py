@@ -10,7 +10,7 @@ except ImportError:
     from moto import mock_s3 as mock_aws
 from cloud_utils import S3Manager
 from engine import TieringEngine
-import json
+from metadata_store import open_metadata_store
 from datetime import datetime, timedelta
 
 
@@ -62,8 +62,8 @@ def run_complete_demo():
         time.sleep(0.5)
     
     # Save metadata
-    with open('metadata.json', 'w') as f:
-        json.dump(metadata, f, indent=2, default=str)
+    with open_metadata_store(legacy_path=None) as metadata_store:
+        metadata_store.replace_all(metadata)
     
     print(f"✓ Successfully ingested {len(files_to_ingest)} files\n")
     time.sleep(1)
@@ -102,8 +102,8 @@ def run_complete_demo():
     print("   • customer_data.csv accessed 50 times (keeps it HOT!)\n")
     
     # Save updated metadata
-    with open('metadata.json', 'w') as f:
-        json.dump(metadata, f, indent=2, default=str)
+    with open_metadata_store(legacy_path=None) as metadata_store:
+        metadata_store.replace_all(metadata)
     
     time.sleep(1)
     
@@ -112,6 +112,8 @@ def run_complete_demo():
     print("-" * 70)
     engine = TieringEngine(s3_manager)
     engine.run_tiering_logic()
+    # Flushes buffered accesses, so the reload below sees them
+    engine.close()
     time.sleep(2)
     
     # Step 6: Show Final Optimized State
@@ -119,8 +121,8 @@ def run_complete_demo():
     print("-" * 70)
     
     # Reload metadata after engine run
-    with open('metadata.json', 'r') as f:
-        metadata = json.load(f)
+    with open_metadata_store() as metadata_store:
+        metadata = metadata_store.load_all()
     
     show_dashboard(s3_manager, metadata)
     
@@ -10,8 +10,8 @@ except ImportError:
     from moto import mock_s3 as mock_aws
 from cloud_utils import S3Manager
 from engine import TieringEngine
+from metadata_store import open_metadata_store
 from migration_manager import MigrationManager
-import json
 from datetime import datetime, timedelta
 
 
@@ -55,8 +55,8 @@ def run_multi_cloud_demo():
         }
         time.sleep(0.3)
     
-    with open('metadata.json', 'w') as f:
-        json.dump(metadata, f, indent=2, default=str)
+    with open_metadata_store(legacy_path=None) as metadata_store:
+        metadata_store.replace_all(metadata)
     
     print(f"\n✓ Successfully ingested {len(files_to_ingest)} files to AWS\n")
     time.sleep(1)
@@ -89,8 +89,8 @@ def run_multi_cloud_demo():
     metadata["customer_transactions.csv"]["access_count"] = 42
     print("🔍 Accessed: customer_transactions.csv (42 times)\n")
     
-    with open('metadata.json', 'w') as f:
-        json.dump(metadata, f, indent=2, default=str)
+    with open_metadata_store(legacy_path=None) as metadata_store:
+        metadata_store.replace_all(metadata)
     
     time.sleep(1)
     
@@ -159,6 +159,7 @@ def run_multi_cloud_demo():
     else:
         print("No files to migrate\n")
         results = {'total': 0, 'succeeded': 0, 'failed': 0}
+    engine.close()
     
     time.sleep(2)
     
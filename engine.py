@@ -2,11 +2,27 @@
 Intelligent tiering engine with predictive analytics and cost optimization.
 Implements data lifecycle management across multiple storage tiers and clouds.
 """
-import json
+import threading
+import time
 from datetime import datetime, timedelta
-from typing import Dict, List
-from cloud_utils import S3Manager
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from access_buffer import AccessBuffer
+from access_sketch import AccessSketch
+from access_scores import (
+    ACCESS_SCORE_HALF_LIFE_DAYS, current_score, current_scores, threshold_crossing_us
+)
+from cloud_utils import TIER_CHANGE_MAX_WORKERS, ListingError, S3Manager
+from heuristics import HeuristicRuleSet
+from metadata_store import DEFAULT_METADATA_PATH, open_metadata_store
+from metadata_table import MetadataTable
+from inventory import InventorySnapshot
+from migration_journal import DEFAULT_MIGRATION_JOURNAL_PATH, MigrationJournal
 from migration_manager import MigrationManager
+from tiering_plan import (
+    PlannedTransition, PlanProgress, TieringPlan, estimate_monthly_savings, progress_path_for
+)
+from transition_schedule import DEFAULT_SCHEDULE_PATH, TransitionSchedule
 
 
 class TieringEngine:
@@ -27,38 +43,79 @@ class TieringEngine:
     HOT_TO_WARM_DAYS = 30
     WARM_TO_COLD_DAYS = 90
     COLD_TO_ARCHIVE_DAYS = 180
+    # Decayed access score (see access_scores) at or above which a file stays hot
+    FREQUENT_ACCESS_THRESHOLD = 10
     
-    def __init__(self, s3_manager: S3Manager, metadata_path: str = "metadata.json"):
+    # Integer codes for tier names, used by the vectorized decision path
+    TIER_NAMES = ('hot', 'warm', 'cold', 'archive')
+    TIER_CODES = {name: code for code, name in enumerate(TIER_NAMES)}
+    NO_HEURISTIC = 255
+    
+    # Seconds between progress lines while migrations run
+    PROGRESS_INTERVAL = 2.0
+    
+    # Incremental runs never list the bucket, so objects uploaded without a
+    # metadata entry are only found by a full run; an incremental run falls
+    # back to one once the last full run is this old
+    FULL_RUN_INTERVAL_DAYS = 1
+    
+    def __init__(self, s3_manager: S3Manager, metadata_path: str = DEFAULT_METADATA_PATH,
+                 heuristics_path: str = "heuristics.json",
+                 schedule_path: str = DEFAULT_SCHEDULE_PATH,
+                 journal_path: str = DEFAULT_MIGRATION_JOURNAL_PATH,
+                 half_life_days: float = ACCESS_SCORE_HALF_LIFE_DAYS,
+                 access_sketch: Optional[AccessSketch] = None):
         """
         Initialize the tiering engine.
         
         Args:
             s3_manager: S3Manager instance for cloud operations
-            metadata_path: Path to metadata JSON file
+            metadata_path: Path to the metadata store ('.db' for SQLite, '.json' for JSON)
+            heuristics_path: Path to the naming-rule config (built-in rules if missing)
+            schedule_path: Path to the transition schedule used by incremental runs
+            journal_path: Path to the journal that lets interrupted cross-cloud
+                migrations resume
+            half_life_days: Half-life of the access scores that decide hotness
+            access_sketch: Approximate access tracker to take hotness from
+                instead of the per-key scores (same half-life, or None for
+                plain counts)
+        
+        Raises:
+            ValueError: If the sketch decays with a different half-life
         """
+        if access_sketch is not None and access_sketch.half_life_days not in (None, half_life_days):
+            raise ValueError(f"Access sketch half-life ({access_sketch.half_life_days} days) does not "
+                             f"match the engine's ({half_life_days} days)")
         self.s3_manager = s3_manager
         self.metadata_path = metadata_path
+        self.half_life_days = half_life_days
+        self.metadata_store = open_metadata_store(metadata_path, half_life_days=half_life_days)
         self.metadata = self._load_metadata()
+        
+        # Accesses are counted in memory and written to the store in batches
+        self.access_buffer = AccessBuffer(self.metadata_store)
+        self._metadata_lock = threading.Lock()
+        self.heuristics = HeuristicRuleSet.from_config(heuristics_path, valid_tiers=self.TIERS)
+        self.access_sketch = access_sketch
+        
+        # Inventory of the current run, shared by every stage of the run
+        self.inventory = None
+        
+        # Next-transition times for incremental runs, rebuilt by every full run
+        self.schedule = TransitionSchedule(schedule_path)
+        self.journal_path = journal_path
     
-    def _load_metadata(self) -> Dict:
-        """Load metadata from JSON file."""
-        try:
-            with open(self.metadata_path, 'r') as f:
-                return json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            return {}
-    
-    def _save_metadata(self):
-        """Save metadata to JSON file."""
-        with open(self.metadata_path, 'w') as f:
-            json.dump(self.metadata, f, indent=2, default=str)
+    def _load_metadata(self) -> MetadataTable:
+        """Load a snapshot of all access metadata from the store into a columnar table."""
+        return MetadataTable.from_store(self.metadata_store)
     
-    def _get_days_since_access(self, file_key: str) -> int:
+    def _get_days_since_access(self, file_key: str, now: Optional[datetime] = None) -> int:
         """
         Calculate days since last access.
         
         Args:
             file_key: File identifier
+            now: Reference time (default: current time)
         
         Returns:
             Number of days since last access
@@ -71,22 +128,27 @@ class TieringEngine:
             return 0
         
         last_access_date = datetime.fromisoformat(last_accessed)
-        return (datetime.now() - last_access_date).days
+        return ((now or datetime.now()) - last_access_date).days
     
-    def _is_frequently_accessed(self, file_key: str, threshold: int = 10) -> bool:
+    def _is_frequently_accessed(self, file_key: str, threshold: int = FREQUENT_ACCESS_THRESHOLD,
+                                now: Optional[datetime] = None) -> bool:
         """
-        Check if file is frequently accessed.
+        Check if file is frequently accessed, by its decayed access score
+        (estimated by the access sketch, if the engine has one).
         
         Args:
             file_key: File identifier
-            threshold: Access count threshold
+            threshold: Access score threshold
+            now: Reference time (default: current time)
         
         Returns:
             True if frequently accessed
         """
+        if self.access_sketch is not None:
+            return self.access_sketch.estimate(file_key, now) >= threshold
         if file_key not in self.metadata:
             return False
-        return self.metadata[file_key].get('access_count', 0) >= threshold
+        return current_score(self.metadata[file_key], now, self.half_life_days) >= threshold
     
     def _apply_predictive_heuristics(self, file_key: str) -> str:
         """
@@ -96,45 +158,25 @@ class TieringEngine:
             file_key: File identifier
         
         Returns:
-            Recommended tier
+            Recommended tier, or None if no naming rule matches
         """
-        file_lower = file_key.lower()
-        
-        # Monthly reports - keep warm for quick access
-        if 'monthly_report' in file_lower or 'monthly-report' in file_lower:
-            return 'warm'
-        
-        # Yearly archives - move to cold storage
-        if 'yearly' in file_lower or 'annual' in file_lower:
-            return 'cold'
-        
-        # Log files - archive aggressively
-        if file_lower.endswith('.log') or 'logs' in file_lower:
-            return 'archive'
-        
-        # Backup files - cold storage
-        if 'backup' in file_lower or 'bak' in file_lower:
-            return 'cold'
-        
-        # Temp files - can be archived
-        if file_lower.startswith('temp') or file_lower.startswith('tmp'):
-            return 'cold'
-        
-        return None  # No heuristic applies
+        return self.heuristics.classify(file_key)
     
-    def _determine_target_tier(self, file_key: str, current_tier: str) -> str:
+    def _determine_target_tier(self, file_key: str, current_tier: str,
+                               now: Optional[datetime] = None) -> str:
         """
         Determine the optimal tier for a file based on all factors.
         
         Args:
             file_key: File identifier
             current_tier: Current storage tier
+            now: Reference time (default: current time)
         
         Returns:
             Target tier name
         """
-        days_since_access = self._get_days_since_access(file_key)
-        is_frequent = self._is_frequently_accessed(file_key)
+        days_since_access = self._get_days_since_access(file_key, now)
+        is_frequent = self._is_frequently_accessed(file_key, now=now)
         
         # Frequently accessed files stay hot
         if is_frequent:
@@ -155,77 +197,587 @@ class TieringEngine:
         
         return 'hot'
     
-    def run_tiering_logic(self):
+    def determine_target_tiers(self, file_keys: Sequence[str],
+                               now: Optional[datetime] = None) -> List[str]:
+        """
+        Determine the optimal tier for many files in one vectorized pass.
+        
+        Gives exactly the same answers as calling _determine_target_tier()
+        per key, but loads the inputs into NumPy arrays once and evaluates
+        the decision rules over the whole batch.
+        
+        Args:
+            file_keys: File identifiers
+            now: Reference time (default: current time)
+        
+        Returns:
+            Target tier name for each key, in input order
+        """
+        codes = self._decide_tier_codes(*self._load_decision_arrays(file_keys), now)
+        return [self.TIER_NAMES[code] for code in codes.tolist()]
+    
+    def plan_transitions(self, file_keys: Sequence[str],
+                         now: Optional[datetime] = None) -> Tuple[List[str], List[Optional[datetime]]]:
+        """
+        Determine each file's target tier and when that decision can next change.
+        
+        Args:
+            file_keys: File identifiers
+            now: Reference time (default: current time)
+        
+        Returns:
+            Tuple of (target tier names, next transition times with None for
+            "only if its metadata changes"), both in input order
+        """
+        now = now or datetime.now()
+        arrays = self._load_decision_arrays(file_keys)
+        codes = self._decide_tier_codes(*arrays, now)
+        due_us = self._next_transition_us(*arrays, now)
+        
+        tiers = [self.TIER_NAMES[code] for code in codes.tolist()]
+        never = np.iinfo(np.int64).min
+        due_times = [None if us == never else datetime(1970, 1, 1) + timedelta(microseconds=us)
+                     for us in due_us.tolist()]
+        return tiers, due_times
+    
+    def _load_decision_arrays(self, file_keys: Sequence[str]) -> tuple:
+        """
+        Gather the decision inputs for a batch of keys into NumPy arrays.
+        
+        Args:
+            file_keys: File identifiers
+        
+        Returns:
+            Tuple of (access scores float64, epoch microseconds each score is
+            valid at int64, last-access epoch microseconds int64, heuristic
+            tier codes uint8); unknown times are NaT
+        """
+        n = len(file_keys)
+        # Timestamps are already epoch microseconds in the table; nothing to parse
+        _, stored_scores, last_access_us = self.metadata.decision_columns(file_keys)
+        
+        heuristic_lookup = {**self.TIER_CODES, None: self.NO_HEURISTIC}
+        heuristic_codes = np.fromiter(
+            (heuristic_lookup[tier] for tier in self.heuristics.classify_bulk(file_keys)),
+            dtype=np.uint8, count=n
+        )
+        
+        if self.access_sketch is not None:
+            # Approximate scores, all valid at the sketch's landmark (undecayed if it has none)
+            access_scores = self.access_sketch.estimate_many(file_keys)
+            landmark = (self.access_sketch.landmark if self.access_sketch.half_life_days is not None
+                        else 'NaT')
+            scored_at_us = np.full(n, np.datetime64(landmark, 'us').astype(np.int64), dtype=np.int64)
+        else:
+            # Stored scores are valid as of each key's last access
+            access_scores = stored_scores
+            scored_at_us = last_access_us
+        return access_scores, scored_at_us, last_access_us, heuristic_codes
+    
+    def _decide_tier_codes(self, access_scores: np.ndarray, scored_at_us: np.ndarray,
+                           last_access_us: np.ndarray, heuristic_codes: np.ndarray,
+                           now: Optional[datetime] = None) -> np.ndarray:
+        """
+        Apply the tiering rules to whole arrays at once.
+        
+        Mirrors _determine_target_tier(): frequent access wins, then naming
+        heuristics, then age since last access.
+        
+        Args:
+            access_scores: Access score per object
+            scored_at_us: Time each score is valid at, as epoch microseconds (NaT: never decays)
+            last_access_us: Last access as epoch microseconds (NaT when unknown)
+            heuristic_codes: Tier code suggested by naming heuristics, or NO_HEURISTIC
+            now: Reference time (default: current time)
+        
+        Returns:
+            Array of tier codes (uint8)
+        """
+        now_us = np.datetime64(now or datetime.now(), 'us').astype(np.int64)
+        
+        # Same floor semantics as timedelta.days; unknown access time counts as 0 days
+        known = last_access_us != np.iinfo(np.int64).min
+        days = np.where(known, (now_us - last_access_us) // 86_400_000_000, 0)
+        
+        age_codes = np.select(
+            [days >= self.COLD_TO_ARCHIVE_DAYS,
+             days >= self.WARM_TO_COLD_DAYS,
+             days >= self.HOT_TO_WARM_DAYS],
+            [self.TIER_CODES['archive'], self.TIER_CODES['cold'], self.TIER_CODES['warm']],
+            default=self.TIER_CODES['hot']
+        )
+        codes = np.where(heuristic_codes != self.NO_HEURISTIC, heuristic_codes, age_codes)
+        frequent = (current_scores(access_scores, scored_at_us, now_us, self.half_life_days)
+                    >= self.FREQUENT_ACCESS_THRESHOLD)
+        codes = np.where(frequent, self.TIER_CODES['hot'], codes)
+        return codes.astype(np.uint8)
+    
+    def _next_transition_us(self, access_scores: np.ndarray, scored_at_us: np.ndarray,
+                            last_access_us: np.ndarray, heuristic_codes: np.ndarray,
+                            now: datetime) -> np.ndarray:
+        """
+        Compute when each decision next changes if its metadata stays the same.
+        
+        Frequently accessed files change when their score decays below the
+        threshold; age-based decisions change at the first age threshold the
+        file has not crossed yet. Heuristic matches, files with no recorded
+        access and files already past the archive threshold never change on
+        their own.
+        
+        Args:
+            access_scores: Access score per object
+            scored_at_us: Time each score is valid at, as epoch microseconds (NaT: never decays)
+            last_access_us: Last access as epoch microseconds (NaT when unknown)
+            heuristic_codes: Tier code suggested by naming heuristics, or NO_HEURISTIC
+            now: Reference time
+        
+        Returns:
+            Next transition as epoch microseconds, NaT (int64 min) for never
+        """
+        never = np.iinfo(np.int64).min
+        now_us = np.datetime64(now, 'us').astype(np.int64)
+        day_us = 86_400_000_000
+        
+        due = np.full(last_access_us.shape, never, dtype=np.int64)
+        # Largest threshold first, so the smallest not-yet-reached one wins
+        for threshold_days in (self.COLD_TO_ARCHIVE_DAYS, self.WARM_TO_COLD_DAYS, self.HOT_TO_WARM_DAYS):
+            crossing = last_access_us + threshold_days * day_us
+            due = np.where(crossing > now_us, crossing, due)
+        
+        due = np.where((last_access_us == never) | (heuristic_codes != self.NO_HEURISTIC), never, due)
+        
+        # Hot by score until the score decays below the threshold
+        frequent = (current_scores(access_scores, scored_at_us, now_us, self.half_life_days)
+                    >= self.FREQUENT_ACCESS_THRESHOLD)
+        cooled_at = threshold_crossing_us(access_scores, scored_at_us,
+                                          self.FREQUENT_ACCESS_THRESHOLD, self.half_life_days)
+        return np.where(frequent, np.where(scored_at_us == never, never, cooled_at), due)
+    
+    def refresh_inventory(self) -> InventorySnapshot:
+        """
+        Take a new inventory snapshot of the bucket (one listing pass).
+        
+        Returns:
+            The new snapshot, also kept as self.inventory
+        
+        Raises:
+            ListingError: If the listing fails part-way; self.inventory is left as it was
+        """
+        self.inventory = InventorySnapshot.build(self.s3_manager)
+        return self.inventory
+    
+    def _plan_full_run(self) -> Tuple[TieringPlan, np.ndarray, datetime, int]:
+        """
+        Decide the target tier of every object in the bucket.
+        
+        Lists the bucket into self.inventory and reads the metadata store;
+        sends no tier change requests.
+        
+        Returns:
+            Tuple of (plan, next transition time of each inventory record in
+            order, time the metadata was read, metadata change watermark)
+        
+        Raises:
+            ListingError: If the bucket listing fails part-way
+        """
+        # Decide on current metadata, including accesses still in the buffer
+        self.flush_access_metadata()
+        metadata_read_at = datetime.now()
+        change_watermark = self.metadata_store.change_watermark()
+        self.metadata = self._load_metadata()
+        
+        # One listing pass per run; every later stage reuses this snapshot
+        inventory = self.refresh_inventory()
+        plan = TieringPlan(cloud=self.s3_manager.get_cloud_name(), bucket=self.s3_manager.bucket_name,
+                           files_analyzed=len(inventory))
+        
+        # Decide every target tier (and when it can next change) in one vectorized pass
+        records = list(inventory)
+        target_tiers, due_times = self.plan_transitions([record.key for record in records],
+                                                        metadata_read_at)
+        
+        current_tiers = {}
+        for record, target_tier_name in zip(records, target_tiers):
+            # Current tier comes from the listing; HEAD only if it was missing
+            current_s3_tier = current_tiers[record.key] = inventory.get_storage_class(record.key)
+            target_s3_tier = self.TIERS[target_tier_name]
+            if current_s3_tier != target_s3_tier:
+                plan.transitions.append(PlannedTransition(
+                    record.key, current_s3_tier, target_s3_tier, record.size,
+                    estimate_monthly_savings(record.size, current_s3_tier, target_s3_tier)
+                ))
+        self.metadata.set_storage_classes(current_tiers)
+        
+        return plan, due_times, metadata_read_at, change_watermark
+    
+    def build_plan(self) -> TieringPlan:
+        """
+        Plan a full tiering run without changing anything in the bucket.
+        
+        Costs one listing pass and the vectorized decisions; the plan can be
+        printed, saved for review and applied later with apply_plan().
+        
+        Returns:
+            The plan
+        
+        Raises:
+            ListingError: If the bucket listing fails part-way
+        """
+        return self._plan_full_run()[0]
+    
+    def run_tiering_logic(self, max_workers: int = TIER_CHANGE_MAX_WORKERS,
+                          dry_run: bool = False) -> TieringPlan:
         """
         Execute the main tiering logic across all files.
-        Analyzes current state and performs necessary migrations.
+        Plans every tier change, then performs the migrations.
+        
+        Args:
+            max_workers: Tier changes running at the same time
+            dry_run: Only plan and print the plan; send no tier changes
+        
+        Returns:
+            The plan the run executed (or would have executed, for a dry run)
+        
+        Raises:
+            ListingError: If the bucket listing fails part-way. Nothing is
+                changed: a partial listing would drop the missing keys from
+                the transition schedule.
+        """
+        return self._run_full_pass(max_workers, dry_run)[0]
+    
+    def _run_full_pass(self, max_workers: int, dry_run: bool) -> Tuple[TieringPlan, Dict]:
+        """
+        Run a full tiering pass (see run_tiering_logic()).
+        
+        Returns:
+            Tuple of (plan, dictionary with visited, migrated, failed and
+            removed counts in the format of run_incremental_tiering())
         """
         print("\n" + "="*70)
         print("🔄 STARTING INTELLIGENT TIERING ENGINE")
         print("="*70 + "\n")
         
-        # Get all files from S3
-        all_files = self.s3_manager.list_all_files()
+        plan, due_times, metadata_read_at, change_watermark = self._plan_full_run()
+        inventory = self.inventory
+        results = {'visited': len(inventory), 'migrated': 0, 'failed': 0, 'removed': 0}
         
-        if not all_files:
+        if not inventory:
             print("ℹ️  No files found in storage. Nothing to process.")
-            return
+            return plan, results
+        
+        print(f"📊 Analyzed {len(inventory)} files\n")
         
-        print(f"📊 Analyzing {len(all_files)} files...\n")
+        if dry_run:
+            self.print_plan(plan)
+            print("ℹ️  Dry run - no tier changes were made\n")
+            return plan, results
+        
+        errors = self.execute_plan(plan, max_workers)
+        failed_keys = {file_key for file_key, error in errors.items() if error is not None}
         
         migrations_performed = 0
         cost_optimizations = 0
-        
-        for file_key in all_files:
-            # Get current tier
-            current_s3_tier = self.s3_manager.get_file_tier(file_key)
-            current_tier_name = self._get_tier_name(current_s3_tier)
-            
-            # Determine optimal tier
-            target_tier_name = self._determine_target_tier(file_key, current_tier_name)
-            target_s3_tier = self.TIERS[target_tier_name]
-            
-            # Log analysis
-            days_since = self._get_days_since_access(file_key)
-            access_count = self.metadata.get(file_key, {}).get('access_count', 0)
-            
-            print(f"📄 {file_key}")
-            print(f"   Current Tier: {current_tier_name.upper()} ({current_s3_tier})")
-            print(f"   Access Stats: {access_count} accesses, {days_since} days since last access")
-            
-            # Check if migration is needed
-            if current_s3_tier != target_s3_tier:
-                print(f"   🎯 Decision: Migrate to {target_tier_name.upper()} tier")
-                
-                # Perform migration
-                if self.s3_manager.change_file_tier(file_key, target_s3_tier):
-                    print(f"   ✓ Successfully migrated to {target_s3_tier}")
-                    migrations_performed += 1
-                    
-                    # Check if this is a cost optimization move
-                    if target_tier_name in ['cold', 'archive']:
-                        cost_optimizations += 1
-                else:
-                    print(f"   ✗ Migration failed")
-            else:
-                print(f"   ✓ Already in optimal tier ({target_tier_name.upper()})")
-            
-            print()
+        for transition in plan:
+            if transition.key in failed_keys:
+                continue
+            migrations_performed += 1
+            # Moves to cold or archive tiers are the cost optimizations
+            if self._get_tier_name(transition.target_tier) in ['cold', 'archive']:
+                cost_optimizations += 1
+        performed_keys = {transition.key for transition in plan} - failed_keys
+        
+        # Seed the schedule so later incremental runs only visit what changes;
+        # failed migrations are due immediately so the next run retries them
+        results['removed'] = self.schedule.replace_all(
+            ((record.key, metadata_read_at if record.key in failed_keys else due_at,
+              inventory.get_storage_class(record.key))
+             for record, due_at in zip(inventory, due_times)),
+            watermark=change_watermark,
+            full_run_at=inventory.created_at
+        )
+        results['migrated'] = migrations_performed
+        results['failed'] = len(failed_keys)
         
         # Cost optimization simulation (AWS to GCP)
-        self._simulate_cross_cloud_optimization()
+        self._simulate_cross_cloud_optimization(inventory)
         
         # Summary
         print("\n" + "="*70)
         print("📈 TIERING ENGINE SUMMARY")
         print("="*70)
-        print(f"✓ Files Analyzed: {len(all_files)}")
+        print(f"✓ Files Analyzed: {len(inventory)}")
         print(f"✓ Migrations Performed: {migrations_performed}")
+        if failed_keys:
+            print(f"✗ Migrations Failed: {len(failed_keys)}")
         print(f"✓ Cost Optimizations: {cost_optimizations}")
-        print(f"✓ Estimated Monthly Savings: ${self._calculate_savings(cost_optimizations):.2f}")
+        print(f"✓ Estimated Monthly Savings: ${plan.savings_of(performed_keys):.2f} "
+              f"(of ${plan.estimated_monthly_savings:.2f} planned)")
+        print("="*70 + "\n")
+        return plan, results
+    
+    def print_plan(self, plan: TieringPlan, limit: int = 10):
+        """
+        Print a reviewable summary of a plan.
+        
+        Args:
+            plan: Plan to summarize
+            limit: Number of individual transitions to list, largest savings first
+        """
+        print("📋 TIERING PLAN")
+        print("-" * 70)
+        print(f"   Plan ID: {plan.plan_id} ({plan.cloud.upper()} / {plan.bucket})")
+        print(f"   Created: {plan.created_at.strftime('%Y-%m-%d %H:%M:%S')}")
+        print(f"   Files analyzed: {plan.files_analyzed}, already optimal: "
+              f"{plan.files_analyzed - len(plan)}")
+        print(f"   Transitions: {len(plan)} ({plan.total_bytes / (1024 * 1024):.2f} MB)")
+        for (source, target), count in sorted(plan.routes().items()):
+            print(f"      {self._get_tier_name(source).upper()} → "
+                  f"{self._get_tier_name(target).upper()}: {count} files")
+        print(f"   Estimated storage savings: ${plan.estimated_monthly_savings:.2f}/month")
+        
+        if plan.transitions and limit > 0:
+            top = sorted(plan, key=lambda t: t.estimated_monthly_savings, reverse=True)[:limit]
+            print(f"\n   Top {len(top)} by savings:")
+            for transition in top:
+                print(f"      {transition.key}: {transition.source_tier} → {transition.target_tier} "
+                      f"(${transition.estimated_monthly_savings:.4f}/month)")
+        print()
+    
+    def execute_plan(self, plan: TieringPlan, max_workers: int = TIER_CHANGE_MAX_WORKERS,
+                     progress: Optional[PlanProgress] = None) -> Optional[Dict[str, Optional[str]]]:
+        """
+        Apply a plan's tier changes concurrently.
+        
+        Transitions are applied as planned, without re-checking the current
+        tier; repeating one that already happened is a harmless self-copy.
+        
+        Args:
+            plan: Plan to apply
+            max_workers: Tier changes running at the same time
+            progress: Journal to skip completed transitions and record new results in
+        
+        Returns:
+            Dictionary mapping each attempted key to None on success or its
+            error message, or None if the plan is for a different bucket
+        """
+        if (plan.cloud, plan.bucket) != (self.s3_manager.get_cloud_name(), self.s3_manager.bucket_name):
+            print(f"✗ Error: plan is for {plan.cloud}/{plan.bucket}, not "
+                  f"{self.s3_manager.get_cloud_name()}/{self.s3_manager.bucket_name}")
+            return None
+        
+        transitions = progress.remaining(plan) if progress is not None else list(plan)
+        errors = self._execute_transitions(transitions, max_workers, progress)
+        
+        succeeded = {transition.key: transition.target_tier for transition in transitions
+                     if transition.key in errors and errors[transition.key] is None}
+        if self.inventory is not None:
+            for file_key, target_s3_tier in succeeded.items():
+                if file_key in self.inventory:
+                    self.inventory.update_tier(file_key, target_s3_tier)
+        # Keep incremental runs from acting on the tier a file just left
+        self.schedule.set_storage_classes(succeeded)
+        self.metadata.set_storage_classes(succeeded)
+        return errors
+    
+    def apply_plan(self, plan_path: str, max_workers: int = TIER_CHANGE_MAX_WORKERS,
+                   progress_path: Optional[str] = None) -> Optional[Dict]:
+        """
+        Apply a saved plan, resuming after whatever an earlier attempt finished.
+        
+        Args:
+            plan_path: Path to a plan written by TieringPlan.save()
+            max_workers: Tier changes running at the same time
+            progress_path: Progress journal (default: the plan path plus '.progress')
+        
+        Returns:
+            Dictionary with planned, completed and failed counts and the
+            estimated monthly savings of the completed transitions, or None on error
+        """
+        print("\n" + "="*70)
+        print("▶️  APPLYING TIERING PLAN")
+        print("="*70 + "\n")
+        
+        try:
+            plan = TieringPlan.load(plan_path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"✗ Error loading plan '{plan_path}': {e}")
+            return None
+        
+        progress = PlanProgress(plan, progress_path or progress_path_for(plan_path))
+        try:
+            if progress.completed:
+                print(f"ℹ️  Resuming: {len(progress.completed)} of {len(plan)} transitions already done\n")
+            errors = self.execute_plan(plan, max_workers, progress)
+        finally:
+            progress.close()
+        if errors is None:
+            return None
+        
+        results = {'planned': len(plan), 'completed': len(progress.completed),
+                   'failed': len(progress.failed),
+                   'estimated_monthly_savings': plan.savings_of(progress.completed)}
+        print("="*70)
+        print("📈 PLAN SUMMARY")
+        print("="*70)
+        print(f"✓ Transitions Completed: {results['completed']} of {results['planned']}")
+        if results['failed']:
+            print(f"✗ Transitions Failed: {results['failed']} (apply the plan again to retry)")
+        print(f"✓ Estimated Monthly Savings: ${results['estimated_monthly_savings']:.2f} "
+              f"(of ${plan.estimated_monthly_savings:.2f} planned)")
+        print("="*70 + "\n")
+        return results
+    
+    def run_incremental_tiering(self, max_workers: int = TIER_CHANGE_MAX_WORKERS) -> Dict:
+        """
+        Re-evaluate only the files whose tier decision may have changed.
+        
+        Visits files whose next age threshold is due in the transition
+        schedule, plus files whose metadata was written since the last run,
+        so the cost follows the number of changes rather than the bucket
+        size. Skips the bucket listing, so objects uploaded without a
+        metadata entry are not seen until the next full run: the run falls
+        back to a full run if none has built the schedule yet or the last
+        one is more than FULL_RUN_INTERVAL_DAYS old. Run a full pass after
+        changing the thresholds or naming rules, since those affect every file.
+        
+        Args:
+            max_workers: Tier changes running at the same time
+        
+        Returns:
+            Dictionary with visited, migrated, failed and removed counts
+        """
+        print("\n" + "="*70)
+        print("⚡ STARTING INCREMENTAL TIERING RUN")
+        print("="*70 + "\n")
+        
+        now = datetime.now()
+        full_run_at = self.schedule.get_full_run_at()
+        if not self.schedule.is_initialized:
+            print("ℹ️  No transition schedule yet - running a full pass to build it\n")
+            return self._run_full_pass(max_workers, dry_run=False)[1]
+        if full_run_at is None or now - full_run_at > timedelta(days=self.FULL_RUN_INTERVAL_DAYS):
+            print(f"ℹ️  Last full run is over {self.FULL_RUN_INTERVAL_DAYS} day(s) old - running a "
+                  f"full pass to find new objects\n")
+            return self._run_full_pass(max_workers, dry_run=False)[1]
+        
+        self.flush_access_metadata()
+        # Read before the changes, so anything written during the run is seen next time
+        change_watermark = self.metadata_store.change_watermark()
+        due_keys = self.schedule.due(now)
+        changed_keys = self.metadata_store.keys_changed_since(self.schedule.get_watermark())
+        file_keys = list(dict.fromkeys(due_keys + changed_keys))
+        
+        print(f"📊 {len(due_keys)} files due for a threshold check, "
+              f"{len(changed_keys)} with changed metadata\n")
+        
+        # Only the visited entries are re-read from the store
+        self.metadata.update(self.metadata_store.get_many(file_keys))
+        target_tiers, due_times = self.plan_transitions(file_keys, now)
+        known_tiers = self.schedule.get_storage_classes(file_keys)
+        
+        results = {'visited': len(file_keys), 'migrated': 0, 'failed': 0, 'removed': 0}
+        planned = []
+        updated_entries = []
+        missing_keys = []
+        
+        for file_key, target_tier_name, due_at in zip(file_keys, target_tiers, due_times):
+            # Last tier the engine left the file in; HEAD for files it has not seen
+            current_s3_tier = known_tiers.get(file_key) or self.s3_manager.get_file_tier(file_key)
+            if current_s3_tier is None:
+                missing_keys.append(file_key)
+                continue
+            
+            target_s3_tier = self.TIERS[target_tier_name]
+            if current_s3_tier != target_s3_tier:
+                planned.append(PlannedTransition(file_key, current_s3_tier, target_s3_tier))
+            updated_entries.append((file_key, due_at, current_s3_tier))
+        
+        errors = self._execute_transitions(planned, max_workers)
+        planned_tiers = {transition.key: transition.target_tier for transition in planned}
+        
+        for i, (file_key, due_at, current_s3_tier) in enumerate(updated_entries):
+            if file_key not in errors:
+                continue
+            if errors[file_key] is None:
+                updated_entries[i] = (file_key, due_at, planned_tiers[file_key])
+                results['migrated'] += 1
+            else:
+                # Due immediately, so the next run retries it
+                updated_entries[i] = (file_key, now, current_s3_tier)
+                results['failed'] += 1
+        
+        self.schedule.schedule_many(updated_entries)
+        self.schedule.remove_many(missing_keys)
+        self.schedule.set_watermark(change_watermark)
+        results['removed'] = len(missing_keys)
+        
+        next_due = self.schedule.next_due()
+        print("\n" + "="*70)
+        print("📈 INCREMENTAL TIERING SUMMARY")
+        print("="*70)
+        print(f"✓ Files Visited: {results['visited']} of {len(self.schedule)} scheduled")
+        print(f"✓ Migrations Performed: {results['migrated']}")
+        if results['failed']:
+            print(f"✗ Migrations Failed: {results['failed']}")
+        if missing_keys:
+            print(f"✓ Removed From Schedule (no longer in bucket): {len(missing_keys)}")
+        print(f"✓ Next Scheduled Transition: {next_due.isoformat() if next_due else 'none'}")
+        print(f"✓ Next Full Run (finds objects uploaded without metadata): after "
+              f"{(full_run_at + timedelta(days=self.FULL_RUN_INTERVAL_DAYS)).isoformat()}")
         print("="*70 + "\n")
+        return results
+    
+    def _execute_transitions(self, planned: List[PlannedTransition],
+                             max_workers: int = TIER_CHANGE_MAX_WORKERS,
+                             progress: Optional[PlanProgress] = None) -> Dict[str, Optional[str]]:
+        """
+        Run planned tier changes concurrently, reporting aggregated progress.
+        
+        Args:
+            planned: Transitions to apply
+            max_workers: Tier changes running at the same time
+            progress: Journal to record each result in as it completes
+        
+        Returns:
+            Dictionary mapping each planned key to None on success or its error message
+        """
+        if not planned:
+            print("✓ No tier changes to make\n")
+            return {}
         
-        self._save_metadata()
+        routes: Dict[Tuple[str, str], int] = {}
+        for transition in planned:
+            route = (self._get_tier_name(transition.source_tier),
+                     self._get_tier_name(transition.target_tier))
+            routes[route] = routes.get(route, 0) + 1
+        print(f"🎯 {len(planned)} migrations planned ({max_workers} workers):")
+        for (source, target), count in sorted(routes.items()):
+            print(f"   {source.upper()} → {target.upper()}: {count} files")
+        print()
+        
+        errors: Dict[str, Optional[str]] = {}
+        failed = 0
+        start = last_report = time.perf_counter()
+        transitions = ((transition.key, transition.target_tier, transition.size) for transition in planned)
+        for file_key, error in self.s3_manager.iter_tier_changes(transitions, max_workers):
+            errors[file_key] = error
+            if progress is not None:
+                progress.record(file_key, error)
+            if error is not None:
+                failed += 1
+            now = time.perf_counter()
+            if now - last_report >= self.PROGRESS_INTERVAL or len(errors) == len(planned):
+                last_report = now
+                rate = len(errors) / (now - start) if now > start else 0.0
+                print(f"   ⏳ {len(errors)}/{len(planned)} done "
+                      f"({len(errors) - failed} ok, {failed} failed, {rate:.1f}/s)")
+        
+        if failed:
+            print(f"\n✗ {failed} migrations failed, e.g.:")
+            for file_key, error in [item for item in errors.items() if item[1] is not None][:5]:
+                print(f"   {file_key}: {error}")
+        print()
+        return errors
     
     def _get_tier_name(self, s3_tier: str) -> str:
         """Convert S3 storage class to tier name."""
@@ -234,22 +786,20 @@ class TieringEngine:
                 return name
         return 'hot'
     
-    def _simulate_cross_cloud_optimization(self):
+    def _simulate_cross_cloud_optimization(self, inventory: InventorySnapshot):
         """
         Simulate cross-cloud cost optimization with actual migration capability.
         In production, this would migrate data to GCP/Azure for cost savings.
+        
+        Args:
+            inventory: Snapshot of the current run, already reflecting tier changes
         """
         print("☁️  CROSS-CLOUD OPTIMIZATION ANALYSIS")
         print("-" * 70)
         
         # Find candidates for cross-cloud migration
-        all_files = self.s3_manager.list_all_files()
-        archive_candidates = []
-        
-        for file_key in all_files:
-            tier = self.s3_manager.get_file_tier(file_key)
-            if tier in ['GLACIER', 'DEEP_ARCHIVE']:
-                archive_candidates.append(file_key)
+        archive_candidates = [record.key for record in
+                              inventory.by_storage_class(['GLACIER', 'DEEP_ARCHIVE'])]
         
         if archive_candidates:
             print(f"📦 Found {len(archive_candidates)} files in archive tiers")
@@ -263,7 +813,8 @@ class TieringEngine:
         print()
     
     def run_cross_cloud_migration(self, target_cloud: str = 'gcp', 
-                                  tier_threshold: str = 'GLACIER') -> dict:
+                                  tier_threshold: str = 'GLACIER',
+                                  inventory: Optional[InventorySnapshot] = None) -> dict:
         """
         Execute actual cross-cloud migration for cost optimization.
         Migrates files in cold/archive tiers to a cheaper cloud provider.
@@ -271,6 +822,9 @@ class TieringEngine:
         Args:
             target_cloud: Target cloud provider ('gcp' or 'azure')
             tier_threshold: Only migrate files in this tier or colder
+            inventory: Snapshot to plan from, taken by the caller's current
+                run (default: list the bucket again, so a snapshot left over
+                from an earlier run is never planned from)
         
         Returns:
             Dictionary with migration results
@@ -285,8 +839,9 @@ class TieringEngine:
             bucket_name=f"astra-{target_cloud}-archive"
         )
         
-        # Initialize migration manager
-        migrator = MigrationManager(self.s3_manager, target_manager)
+        # Initialize migration manager; the journal lets a rerun pick up where this one stops
+        journal = MigrationJournal(self.journal_path)
+        migrator = MigrationManager(self.s3_manager, target_manager, journal=journal)
         
         # Define cost rule
         aws_cold_cost_per_gb = 0.004  # AWS Glacier
@@ -298,18 +853,20 @@ class TieringEngine:
         print(f"   Potential Savings: {((aws_cold_cost_per_gb - gcp_cold_cost_per_gb) / aws_cold_cost_per_gb * 100):.1f}%\n")
         
         # Find files to migrate
-        all_files = self.s3_manager.list_all_files()
-        files_to_migrate = []
+        if inventory is None:
+            try:
+                inventory = self.refresh_inventory()
+            except ListingError as e:
+                print(f"✗ Error listing files, not migrating: {e}\n")
+                journal.close()
+                return {'migrated': 0, 'success': False}
         
         cold_tiers = ['GLACIER', 'DEEP_ARCHIVE'] if tier_threshold == 'GLACIER' else ['DEEP_ARCHIVE']
-        
-        for file_key in all_files:
-            tier = self.s3_manager.get_file_tier(file_key)
-            if tier in cold_tiers:
-                files_to_migrate.append(file_key)
+        files_to_migrate = [record.key for record in inventory.by_storage_class(cold_tiers)]
         
         if not files_to_migrate:
             print(f"ℹ️  No files found in {', '.join(cold_tiers)} tiers for migration\n")
+            journal.close()
             return {'migrated': 0, 'success': True}
         
         print(f"📋 Migration Plan:")
@@ -319,44 +876,57 @@ class TieringEngine:
         print(f"   Tier threshold: {tier_threshold}\n")
         
         # Execute migration
-        results = migrator.migrate_batch(
-            files_to_migrate,
-            verify_integrity=True,
-            delete_source=True
-        )
+        try:
+            results = migrator.migrate_batch(
+                files_to_migrate,
+                verify_integrity=True,
+                delete_source=True
+            )
+        finally:
+            journal.close()
+        
+        # Keep the snapshot in step with the source bucket
+        failed_files = {error['file'] for error in results['errors'] + results['delete_errors']}
+        for file_key in files_to_migrate:
+            if file_key not in failed_files:
+                inventory.remove(file_key)
         
         # Print statistics
         migrator.print_statistics()
         
         return results
     
-    def _calculate_savings(self, optimizations: int) -> float:
+    def update_access_metadata(self, file_key: str, count: int = 1):
         """
-        Calculate estimated monthly savings from optimizations.
+        Update access metadata for a file.
         
-        Args:
-            optimizations: Number of cost optimizations performed
+        Runs at memory speed: the access is merged into the write-behind
+        buffer and the engine's snapshot, and reaches the store on the next
+        batched flush.
         
-        Returns:
-            Estimated monthly savings in dollars
+        Args:
+            file_key: File identifier
+            count: Number of accesses to record
         """
-        # Rough estimate: ~$15 saved per file moved to cheaper tier
-        return optimizations * 15.0
+        now = datetime.now()
+        self.access_buffer.record(file_key, count, now)
+        
+        with self._metadata_lock:
+            self.metadata.record_access(file_key, count, now, self.half_life_days)
+            if self.access_sketch is not None:
+                self.access_sketch.record(file_key, count, now)
     
-    def update_access_metadata(self, file_key: str):
+    def flush_access_metadata(self) -> int:
         """
-        Update access metadata for a file.
+        Write all buffered accesses to the metadata store now.
         
-        Args:
-            file_key: File identifier
+        Returns:
+            Number of keys written
         """
-        if file_key not in self.metadata:
-            self.metadata[file_key] = {
-                'access_count': 0,
-                'created_timestamp': datetime.now().isoformat(),
-                'last_accessed_timestamp': datetime.now().isoformat()
-            }
-        
-        self.metadata[file_key]['access_count'] += 1
-        self.metadata[file_key]['last_accessed_timestamp'] = datetime.now().isoformat()
-        self._save_metadata()
+        return self.access_buffer.flush()
+    
+    def close(self):
+        """Flush buffered accesses and close the metadata store."""
+        self.access_buffer.close()
+        self.metadata_store.close()
+        self.schedule.close()
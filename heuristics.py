@@ -0,0 +1,293 @@
+"""
+Naming-Heuristic Rule Engine
+Predicts a storage tier from an object's key using configurable naming rules.
+
+Large rule sets are compiled into a single Aho-Corasick automaton, so a key
+is classified in one pass over its characters no matter how many rules are
+configured. Small ones, such as the built-in rules, are tried one by one,
+which is faster below about 60 rules. Rules keep their configured order:
+when several match, the one listed first wins.
+"""
+import json
+import os
+from dataclasses import dataclass, asdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+MATCH_KINDS = ('contains', 'startswith', 'endswith')
+
+# Directory prefixes whose automaton state is remembered between keys
+PREFIX_CACHE_SIZE = 65536
+
+# Rule count from which the automaton is used. Below it, trying each rule
+# in turn is faster: `python benchmark.py heuristics` measures the automaton
+# at 0.3x the speed of the rule-by-rule scan with the 10 built-in rules,
+# break-even at 50-60 rules, 1.3-1.7x faster at 70-100 rules and 6.8x at 500.
+COMPILE_MIN_RULES = 64
+
+_NO_MATCH = float('inf')
+
+
+@dataclass
+class NamingRule:
+    """
+    A single naming rule: if the lower-cased key matches, suggest a tier.
+
+    Attributes:
+        pattern: Substring to look for (matched case-insensitively)
+        tier: Tier name to suggest ('hot', 'warm', 'cold', 'archive')
+        match: Where the pattern must occur: 'contains', 'startswith' or 'endswith'
+        description: Human-readable reason for the rule
+    """
+    pattern: str
+    tier: str
+    match: str = 'contains'
+    description: str = ''
+
+
+# The built-in rules, used when no config file is present
+DEFAULT_RULES = [
+    NamingRule('monthly_report', 'warm', description='Monthly reports - keep warm for quick access'),
+    NamingRule('monthly-report', 'warm', description='Monthly reports - keep warm for quick access'),
+    NamingRule('yearly', 'cold', description='Yearly archives - move to cold storage'),
+    NamingRule('annual', 'cold', description='Yearly archives - move to cold storage'),
+    NamingRule('.log', 'archive', match='endswith', description='Log files - archive aggressively'),
+    NamingRule('logs', 'archive', description='Log files - archive aggressively'),
+    NamingRule('backup', 'cold', description='Backup files - cold storage'),
+    NamingRule('bak', 'cold', description='Backup files - cold storage'),
+    NamingRule('temp', 'cold', match='startswith', description='Temp files - can be archived'),
+    NamingRule('tmp', 'cold', match='startswith', description='Temp files - can be archived'),
+]
+
+
+class HeuristicRuleSet:
+    """
+    Compiled set of naming rules.
+
+    Sets of at least COMPILE_MIN_RULES rules use an automaton; smaller ones
+    are matched rule by rule. The automaton is a fully expanded DFA: every
+    state maps each character that occurs in some pattern straight to its
+    next state, so scanning a key is one dict lookup per character. Each
+    state carries the best (lowest) rule index among the patterns that end
+    there, split by match kind.
+    """
+
+    def __init__(self, rules: Sequence[NamingRule], valid_tiers: Optional[Iterable[str]] = None,
+                 compile_min_rules: int = COMPILE_MIN_RULES):
+        """
+        Compile rules into a matcher.
+
+        Args:
+            rules: Rules in priority order (first match wins)
+            valid_tiers: Allowed tier names (default: any)
+            compile_min_rules: Rule count from which the automaton is used
+
+        Raises:
+            ValueError: If a rule has an empty pattern, an unknown match kind
+                or a tier outside valid_tiers
+        """
+        allowed = set(valid_tiers) if valid_tiers is not None else None
+        for rule in rules:
+            if not rule.pattern:
+                raise ValueError("Naming rule has an empty pattern")
+            if rule.match not in MATCH_KINDS:
+                raise ValueError(f"Naming rule '{rule.pattern}' has unknown match kind '{rule.match}'")
+            if allowed is not None and rule.tier not in allowed:
+                raise ValueError(f"Naming rule '{rule.pattern}' has unknown tier '{rule.tier}'")
+
+        self.rules = list(rules)
+        self._tiers = [rule.tier for rule in self.rules]
+        self._prefix_cache: Dict[str, Tuple[int, float, bool]] = {}
+        self.uses_automaton = len(self.rules) >= compile_min_rules
+        if self.uses_automaton:
+            self._compile()
+        else:
+            self._ordered = [(rule.pattern.lower(), rule.match, rule.tier) for rule in self.rules]
+
+    @classmethod
+    def from_config(cls, path: str, valid_tiers: Optional[Iterable[str]] = None) -> 'HeuristicRuleSet':
+        """
+        Load rules from a JSON config file, falling back to DEFAULT_RULES.
+
+        The file holds {"rules": [{"pattern": ..., "tier": ..., "match": ...}, ...]}
+        with rules in priority order.
+
+        Args:
+            path: Path to the JSON config file
+            valid_tiers: Allowed tier names (default: any)
+
+        Returns:
+            Compiled HeuristicRuleSet
+        """
+        if not os.path.exists(path):
+            return cls(DEFAULT_RULES, valid_tiers)
+
+        with open(path, 'r') as f:
+            config = json.load(f)
+        rules = [NamingRule(**entry) for entry in config.get('rules', [])]
+        return cls(rules, valid_tiers)
+
+    def save(self, path: str):
+        """
+        Write the rules to a JSON config file.
+
+        Args:
+            path: Destination path
+        """
+        with open(path, 'w') as f:
+            json.dump({'rules': [asdict(rule) for rule in self.rules]}, f, indent=2)
+
+    def _compile(self):
+        """Build the Aho-Corasick DFA and per-state rule tables."""
+        children: List[Dict[str, int]] = [{}]
+        depth = [0]
+        own: List[List[int]] = [[]]  # Rule indexes whose pattern ends exactly at a state
+
+        for index, rule in enumerate(self.rules):
+            state = 0
+            for ch in rule.pattern.lower():
+                next_state = children[state].get(ch)
+                if next_state is None:
+                    next_state = len(children)
+                    children[state][ch] = next_state
+                    children.append({})
+                    depth.append(depth[state] + 1)
+                    own.append([])
+                state = next_state
+            own[state].append(index)
+
+        state_count = len(children)
+        contains_best = [_NO_MATCH] * state_count
+        suffix_best = [_NO_MATCH] * state_count
+        prefix_best = [_NO_MATCH] * state_count
+        delta: List[Dict[str, int]] = [None] * state_count
+
+        def best_of(indexes: List[int], kind: str) -> float:
+            return min((i for i in indexes if self.rules[i].match == kind), default=_NO_MATCH)
+
+        # Breadth-first, so a state's failure state is always finished first
+        delta[0] = dict(children[0])
+        fail = [0] * state_count
+        queue = list(children[0].values())
+
+        for state in queue:
+            f = fail[state]
+            contains_best[state] = min(best_of(own[state], 'contains'), contains_best[f])
+            suffix_best[state] = min(best_of(own[state], 'endswith'), suffix_best[f])
+            # A startswith pattern can only match when it is the whole text so far
+            prefix_best[state] = best_of(own[state], 'startswith')
+
+            delta[state] = dict(delta[f])
+            for ch, child in children[state].items():
+                delta[state][ch] = child
+                fail[child] = delta[f].get(ch, 0)
+                queue.append(child)
+
+        self._step = [transitions.get for transitions in delta]
+        self._depth = depth
+        self._contains_best = contains_best
+        self._suffix_best = suffix_best
+        self._prefix_best = prefix_best
+
+    def _scan(self, text: str, state: int, best: float, anchored: bool) -> Tuple[int, float, bool]:
+        """
+        Advance the automaton over text.
+
+        Args:
+            text: Lower-cased characters to consume
+            state: Starting automaton state
+            best: Best rule index matched so far
+            anchored: Whether everything consumed so far is still a pattern prefix
+
+        Returns:
+            Tuple of (state, best, anchored) after consuming text
+        """
+        step = self._step
+        contains_best = self._contains_best
+        rest = text
+
+        if anchored:
+            # Only the first few characters can still complete a startswith rule
+            depth = self._depth
+            prefix_best = self._prefix_best
+            position = depth[state]
+            for consumed, ch in enumerate(text, 1):
+                state = step[state](ch, 0)
+                candidate = contains_best[state]
+                if candidate < best:
+                    best = candidate
+                if depth[state] != position + consumed:
+                    anchored = False
+                    rest = text[consumed:]
+                    break
+                candidate = prefix_best[state]
+                if candidate < best:
+                    best = candidate
+            else:
+                return state, best, anchored
+
+        for ch in rest:
+            state = step[state](ch, 0)
+            candidate = contains_best[state]
+            if candidate < best:
+                best = candidate
+        return state, best, anchored
+
+    def classify(self, file_key: str) -> Optional[str]:
+        """
+        Suggest a tier for a single key.
+
+        Args:
+            file_key: Object key
+
+        Returns:
+            Tier name from the highest-priority matching rule, or None
+        """
+        file_lower = file_key.lower()
+        if not self.uses_automaton:
+            return self._classify_in_order(file_lower)
+        split = file_lower.rfind('/') + 1
+
+        if split:
+            # Keys in the same directory share the scan of their prefix
+            prefix = file_lower[:split]
+            cached = self._prefix_cache.get(prefix)
+            if cached is None:
+                cached = self._scan(prefix, 0, _NO_MATCH, True)
+                if len(self._prefix_cache) >= PREFIX_CACHE_SIZE:
+                    self._prefix_cache.clear()
+                self._prefix_cache[prefix] = cached
+            state, best, anchored = cached
+            state, best, anchored = self._scan(file_lower[split:], state, best, anchored)
+        else:
+            state, best, anchored = self._scan(file_lower, 0, _NO_MATCH, True)
+
+        candidate = self._suffix_best[state]
+        if candidate < best:
+            best = candidate
+        return self._tiers[best] if best != _NO_MATCH else None
+
+    def _classify_in_order(self, file_lower: str) -> Optional[str]:
+        """Try each rule in priority order on a lower-cased key; for small rule sets."""
+        for pattern, match, tier in self._ordered:
+            if match == 'contains':
+                if pattern in file_lower:
+                    return tier
+            elif match == 'startswith':
+                if file_lower.startswith(pattern):
+                    return tier
+            elif file_lower.endswith(pattern):
+                return tier
+        return None
+
+    def classify_bulk(self, file_keys: Iterable[str]) -> List[Optional[str]]:
+        """
+        Suggest tiers for many keys.
+
+        Args:
+            file_keys: Object keys
+
+        Returns:
+            Tier name or None for each key, in input order
+        """
+        classify = self.classify
+        return [classify(file_key) for file_key in file_keys]
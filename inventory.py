@@ -0,0 +1,112 @@
+"""
+Bucket inventory snapshots.
+Captures a bucket's objects in a single listing pass so every stage of an
+engine run can share them instead of listing the bucket again.
+"""
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+from cloud_utils import S3Manager, ObjectRecord
+
+
+class InventorySnapshot:
+    """
+    Point-in-time view of every object in a bucket.
+
+    Built from one listing pass and kept current in place as the engine
+    changes tiers or migrates objects away, so later stages see the effects
+    of earlier ones without re-listing.
+    """
+
+    def __init__(self, s3_manager: S3Manager, records: Iterable[ObjectRecord]):
+        """
+        Initialize a snapshot from already-listed records.
+
+        Args:
+            s3_manager: S3Manager the records were listed from
+            records: ObjectRecords in key order
+        """
+        self.s3_manager = s3_manager
+        self.records: Dict[str, ObjectRecord] = {record.key: record for record in records}
+        self.created_at = datetime.now()
+
+    @classmethod
+    def build(cls, s3_manager: S3Manager, parallel: bool = False) -> 'InventorySnapshot':
+        """
+        List the bucket once and capture it as a snapshot.
+
+        Args:
+            s3_manager: S3Manager for the bucket to capture
+            parallel: Use prefix-sharded parallel listing
+
+        Returns:
+            New InventorySnapshot
+
+        Raises:
+            ListingError: If the listing fails part-way; no partial snapshot is built
+        """
+        records = s3_manager.iter_objects_parallel() if parallel else s3_manager.iter_objects()
+        return cls(s3_manager, records)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self) -> Iterator[ObjectRecord]:
+        return iter(self.records.values())
+
+    def __contains__(self, file_key: str) -> bool:
+        return file_key in self.records
+
+    def get(self, file_key: str) -> Optional[ObjectRecord]:
+        """Get the record for a key, or None if it is not in the snapshot."""
+        return self.records.get(file_key)
+
+    def get_storage_class(self, file_key: str) -> Optional[str]:
+        """
+        Get the storage class of an object, sending a HEAD only if the
+        listing did not include it.
+
+        Args:
+            file_key: The key/path for the file in S3
+
+        Returns:
+            Storage class string or None if the object is not in the snapshot
+        """
+        record = self.records.get(file_key)
+        if record is None:
+            return None
+        return self.s3_manager.complete_record(record).storage_class
+
+    def update_tier(self, file_key: str, storage_class: str):
+        """
+        Record that an object moved to a new storage class.
+
+        Args:
+            file_key: The key/path for the file in S3
+            storage_class: The object's new storage class
+        """
+        record = self.records.get(file_key)
+        if record is not None:
+            record.storage_class = storage_class
+
+    def remove(self, file_key: str):
+        """
+        Record that an object no longer exists in the bucket.
+
+        Args:
+            file_key: The key/path for the file in S3
+        """
+        self.records.pop(file_key, None)
+
+    def by_storage_class(self, storage_classes: Iterable[str]) -> List[ObjectRecord]:
+        """
+        Get every object currently in one of the given storage classes.
+
+        Args:
+            storage_classes: Storage classes to select
+
+        Returns:
+            Matching ObjectRecords in key order
+        """
+        wanted = set(storage_classes)
+        return [record for record in self.records.values()
+                if self.get_storage_class(record.key) in wanted]
@@ -3,12 +3,16 @@ Intelligent Cloud Storage Manager - CLI Interface
 A professional-grade data lifecycle management system with real-time streaming
 and multi-cloud migration capabilities.
 """
+import os
 import click
-import json
 from datetime import datetime, timedelta
+from itertools import chain
 from moto import mock_aws
-from cloud_utils import S3Manager
+from access_scores import current_score
+from access_sketch import AccessSketch, merge_sketches
+from cloud_utils import TIER_CHANGE_MAX_WORKERS, ListingError, S3Manager
 from engine import TieringEngine
+from metadata_store import LEGACY_METADATA_PATH, open_metadata_store
 from migration_manager import MigrationManager
 from streaming import produce_new_file_event, start_event_consumer, check_kafka_connection
 
@@ -75,63 +79,73 @@ def show_dashboard():
     
     s3_manager = S3Manager()
     
-    # Load metadata
-    try:
-        with open('metadata.json', 'r') as f:
-            metadata = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        metadata = {}
+    metadata_store = open_metadata_store()
     
-    # Get all files
-    all_files = s3_manager.list_all_files()
+    # Stream all files (the listing is already in key order)
+    objects = s3_manager.iter_objects()
+    try:
+        first_object = next(objects, None)
+    except ListingError as e:
+        click.echo(f"✗ Error listing files: {e}\n")
+        return
     
-    if not all_files:
+    if first_object is None:
         click.echo("ℹ️  No files in storage yet.")
         click.echo("   Use 'generate-event' to add files via Kafka stream.\n")
         return
     
     # Display header
-    click.echo(f"{'FILE NAME':<40} {'TIER':<15} {'ACCESSES':<12} {'LAST ACCESS':<20}")
+    click.echo(f"{'FILE NAME':<40} {'TIER':<15} {'ACCESSES':<10} {'SCORE':<8} {'LAST ACCESS':<20}")
     click.echo("-" * 70)
     
     # Statistics
     tier_distribution = {'hot': 0, 'warm': 0, 'cold': 0, 'archive': 0}
     total_accesses = 0
+    total_files = 0
     
     # Display each file
-    for file_key in sorted(all_files):
-        tier = s3_manager.get_file_tier(file_key)
-        tier_name = _get_tier_display_name(tier)
-        
-        # Get metadata
-        file_meta = metadata.get(file_key, {})
-        access_count = file_meta.get('access_count', 0)
-        last_accessed = file_meta.get('last_accessed_timestamp', 'Never')
-        
-        if last_accessed != 'Never':
-            try:
-                last_access_dt = datetime.fromisoformat(last_accessed)
-                last_accessed = last_access_dt.strftime('%Y-%m-%d %H:%M')
-            except:
-                pass
-        
-        # Update statistics
-        tier_key = _get_tier_name(tier)
-        tier_distribution[tier_key] += 1
-        total_accesses += access_count
-        
-        # Color-coded tier display
-        tier_colored = _colorize_tier(tier_name)
-        
-        # Display row
-        file_display = file_key[:37] + "..." if len(file_key) > 40 else file_key
-        click.echo(f"{file_display:<40} {tier_colored:<24} {access_count:<12} {last_accessed:<20}")
+    try:
+        for record in chain([first_object], objects):
+            file_key = record.key
+            total_files += 1
+            tier = s3_manager.complete_record(record).storage_class
+            tier_name = _get_tier_display_name(tier)
+            
+            # Get metadata
+            file_meta = metadata_store.get(file_key) or {}
+            access_count = file_meta.get('access_count', 0)
+            # Decayed access frequency, the hotness signal the engine uses
+            access_score = current_score(file_meta, half_life_days=metadata_store.half_life_days)
+            last_accessed = file_meta.get('last_accessed_timestamp', 'Never')
+            
+            if last_accessed != 'Never':
+                try:
+                    last_access_dt = datetime.fromisoformat(last_accessed)
+                    last_accessed = last_access_dt.strftime('%Y-%m-%d %H:%M')
+                except:
+                    pass
+            
+            # Update statistics
+            tier_key = _get_tier_name(tier)
+            tier_distribution[tier_key] += 1
+            total_accesses += access_count
+            
+            # Color-coded tier display
+            tier_colored = _colorize_tier(tier_name)
+            
+            # Display row
+            file_display = file_key[:37] + "..." if len(file_key) > 40 else file_key
+            click.echo(f"{file_display:<40} {tier_colored:<24} {access_count:<10} {access_score:<8.1f} "
+                       f"{last_accessed:<20}")
+    except ListingError as e:
+        click.echo(f"\n✗ Error listing files, the list above is incomplete: {e}\n")
+        return
     
     # Display summary statistics
     click.echo("\n" + "="*70)
     click.echo("📈 STORAGE STATISTICS")
     click.echo("="*70)
-    click.echo(f"Total Files: {len(all_files)}")
+    click.echo(f"Total Files: {total_files}")
     click.echo(f"Total Accesses: {total_accesses}")
     click.echo(f"\nTier Distribution:")
     click.echo(f"  🔥 HOT (STANDARD):        {tier_distribution['hot']} files")
@@ -143,43 +157,94 @@ def show_dashboard():
 
 @cli.command()
 @mock_aws
-def run_engine():
+@click.option('--incremental', is_flag=True,
+              help='Only re-evaluate files that crossed an age threshold or changed since the last run')
+@click.option('--workers', default=TIER_CHANGE_MAX_WORKERS, show_default=True,
+              help='Tier changes running at the same time')
+@click.option('--dry-run', is_flag=True, help='Only print the plan; make no tier changes')
+@click.option('--sketch', 'sketch_paths', multiple=True,
+              help='Access sketch to take hotness from; repeat to merge several')
+def run_engine(incremental, workers, dry_run, sketch_paths):
     """Execute the intelligent tiering engine to optimize storage."""
     s3_manager = S3Manager()
+    try:
+        access_sketch = merge_sketches(sketch_paths)
+    except (OSError, ValueError, KeyError) as e:
+        click.echo(f"✗ Error loading access sketch: {e}\n")
+        return
+    if access_sketch is not None:
+        click.echo(f"✓ Loaded access sketch from {len(sketch_paths)} file(s), "
+                   f"error bound ±{access_sketch.error_bound():.1f} at {access_sketch.landmark:%Y-%m-%d}")
+    engine = TieringEngine(s3_manager, access_sketch=access_sketch)
+    try:
+        if incremental:
+            engine.run_incremental_tiering(workers)
+        else:
+            engine.run_tiering_logic(workers, dry_run=dry_run)
+    except ListingError as e:
+        click.echo(f"✗ Error listing files, no tier changes made: {e}\n")
+
+
+@cli.command()
+@mock_aws
+@click.option('--output', default='tiering_plan.json', show_default=True,
+              help='File to save the plan to')
+@click.option('--limit', default=10, help='Number of transitions to list')
+def plan(output, limit):
+    """Plan a tiering run and save it for review, without changing anything."""
+    s3_manager = S3Manager()
     engine = TieringEngine(s3_manager)
-    engine.run_tiering_logic()
+    try:
+        tiering_plan = engine.build_plan()
+    except ListingError as e:
+        click.echo(f"✗ Error listing files, no plan saved: {e}\n")
+        return
+    engine.print_plan(tiering_plan, limit)
+    tiering_plan.save(output)
+    click.echo(f"✓ Saved plan with {len(tiering_plan)} transitions to '{output}'")
+    click.echo(f"  Apply it with: python main.py apply-plan --plan {output}\n")
+
+
+@cli.command()
+@mock_aws
+@click.option('--plan', 'plan_path', default='tiering_plan.json', show_default=True,
+              help='Plan file written by the plan command')
+@click.option('--workers', default=TIER_CHANGE_MAX_WORKERS, show_default=True,
+              help='Tier changes running at the same time')
+def apply_plan(plan_path, workers):
+    """Apply a saved tiering plan; re-running resumes an interrupted apply."""
+    s3_manager = S3Manager()
+    engine = TieringEngine(s3_manager)
+    engine.apply_plan(plan_path, workers)
 
 
 @cli.command()
 @mock_aws
 @click.option('--filename', required=True, help='Name of the file to simulate access')
 @click.option('--count', default=1, help='Number of accesses to simulate')
-def simulate_access(filename, count):
+@click.option('--sketch', 'sketch_path', default=None,
+              help='Also record the accesses in this access sketch (created if missing)')
+def simulate_access(filename, count, sketch_path):
     """Simulate file access to update metadata."""
     click.echo(f"\n🔍 Simulating {count} access(es) to: {filename}")
     
-    # Load metadata
-    try:
-        with open('metadata.json', 'r') as f:
-            metadata = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        click.echo("✗ Metadata file not found or corrupted\n")
-        return
-    
-    if filename not in metadata:
+    # Atomic in-place update of the one entry
+    entry = open_metadata_store().record_access(filename, count, create=False)
+    if entry is None:
         click.echo(f"✗ File '{filename}' not found in metadata\n")
         return
     
-    # Update access count
-    metadata[filename]['access_count'] = metadata[filename].get('access_count', 0) + count
-    metadata[filename]['last_accessed_timestamp'] = datetime.now().isoformat()
-    
-    # Save metadata
-    with open('metadata.json', 'w') as f:
-        json.dump(metadata, f, indent=2, default=str)
-    
     click.echo(f"✓ Updated access metadata for '{filename}'")
-    click.echo(f"  New access count: {metadata[filename]['access_count']}\n")
+    click.echo(f"  New access count: {entry['access_count']}")
+    click.echo(f"  Access score: {entry['access_score']:.1f}")
+    
+    if sketch_path:
+        access_sketch = AccessSketch.load(sketch_path) if os.path.exists(sketch_path) else AccessSketch()
+        access_sketch.record(filename, count)
+        access_sketch.save(sketch_path)
+        click.echo(f"✓ Recorded in access sketch '{sketch_path}' "
+                   f"(estimate {access_sketch.estimate(filename):.1f})")
+    click.echo()
 
 
 @cli.command()
@@ -202,32 +267,42 @@ def age_file(filename, days):
     """Manually age a file by updating its last access timestamp."""
     click.echo(f"\n⏰ Aging file '{filename}' by {days} days...")
     
-    # Load metadata
-    try:
-        with open('metadata.json', 'r') as f:
-            metadata = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        click.echo("✗ Metadata file not found or corrupted\n")
-        return
-    
-    if filename not in metadata:
+    metadata_store = open_metadata_store()
+    entry = metadata_store.get(filename)
+    if entry is None:
         click.echo(f"✗ File '{filename}' not found in metadata\n")
         return
     
     # Update timestamp
-    old_timestamp = datetime.fromisoformat(metadata[filename]['last_accessed_timestamp'])
+    old_timestamp = datetime.fromisoformat(entry['last_accessed_timestamp'])
     new_timestamp = old_timestamp - timedelta(days=days)
-    metadata[filename]['last_accessed_timestamp'] = new_timestamp.isoformat()
-    
-    # Save metadata
-    with open('metadata.json', 'w') as f:
-        json.dump(metadata, f, indent=2, default=str)
+    metadata_store.set_last_accessed(filename, new_timestamp)
     
     click.echo(f"✓ File aged successfully")
     click.echo(f"  Old date: {old_timestamp.strftime('%Y-%m-%d')}")
     click.echo(f"  New date: {new_timestamp.strftime('%Y-%m-%d')}\n")
 
 
+@cli.command()
+@click.option('--path', default=LEGACY_METADATA_PATH, help='JSON file to write')
+def export_metadata(path):
+    """Export the metadata store to a metadata.json-format file."""
+    exported = open_metadata_store().export_json(path)
+    click.echo(f"\n✓ Exported {exported} metadata entries to '{path}'\n")
+
+
+@cli.command()
+@click.option('--path', default=LEGACY_METADATA_PATH, help='JSON file to read')
+def import_metadata(path):
+    """Import (upsert) entries from a metadata.json-format file into the store."""
+    try:
+        imported = open_metadata_store(legacy_path=None).import_json(path)
+    except (FileNotFoundError, ValueError) as e:
+        click.echo(f"\n✗ Error importing '{path}': {e}\n")
+        return
+    click.echo(f"\n✓ Imported {imported} metadata entries from '{path}'\n")
+
+
 def _get_tier_display_name(s3_tier: str) -> str:
     """Get human-readable tier name."""
     tier_map = {
@@ -285,7 +360,8 @@ def migrate_to_cloud(target, tier):
 @click.option('--source', required=True, help='Source cloud (aws/gcp/azure)')
 @click.option('--dest', required=True, help='Destination cloud (aws/gcp/azure)')
 @click.option('--filename', required=True, help='File to migrate')
-def migrate_file(source, dest, filename):
+@click.option('--paranoid', is_flag=True, help='Verify by re-reading the whole copy instead of checksums')
+def migrate_file(source, dest, filename, paranoid):
     """Migrate a specific file between clouds with verification."""
     click.echo(f"\n📦 Migrating file: {filename}")
     click.echo(f"   Route: {source.upper()} → {dest.upper()}\n")
@@ -295,7 +371,7 @@ def migrate_file(source, dest, filename):
     dest_manager = S3Manager(cloud_name=dest, bucket_name=f"astra-{dest}-bucket")
     
     # Create migration manager
-    migrator = MigrationManager(source_manager, dest_manager)
+    migrator = MigrationManager(source_manager, dest_manager, paranoid_verify=paranoid)
     
     # Execute migration
     success, message = migrator.migrate_object(filename, verify_integrity=True, delete_source=True)
@@ -321,14 +397,15 @@ def show_multi_cloud_dashboard():
     for cloud in clouds:
         try:
             manager = S3Manager(cloud_name=cloud, bucket_name=f"astra-{cloud}-bucket")
-            files = manager.list_all_files()
+            files = list(manager.iter_objects())
             
             if files:
                 click.echo(f"🌩️  {cloud.upper()} ({manager.region})")
                 click.echo("-" * 70)
                 
-                for file_key in files:
-                    tier = manager.get_file_tier(file_key)
+                for record in files:
+                    file_key = record.key
+                    tier = manager.complete_record(record).storage_class
                     tier_name = _get_tier_display_name(tier or 'STANDARD')
                     tier_colored = _colorize_tier(tier_name)
                     click.echo(f"   {file_key:<50} {tier_colored}")
@@ -0,0 +1,691 @@
+"""
+Access Metadata Store
+Persists per-object access metadata (access count, decayed access score,
+creation and last-access times) behind a small pluggable interface.
+
+The SQLite backend (default) updates single rows in place inside
+transactions, so recording an access costs one indexed write instead of
+rewriting every entry, and concurrent writers (CLI, Kafka consumer, engine)
+are serialized by the database instead of overwriting each other. The JSON
+backend keeps the original metadata.json format for small setups and for
+import/export.
+"""
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from access_scores import ACCESS_SCORE_HALF_LIFE_DAYS, add_accesses
+
+DEFAULT_METADATA_PATH = "metadata.db"
+LEGACY_METADATA_PATH = "metadata.json"
+
+# Columns stored natively; any other fields of an entry are kept as JSON
+CORE_FIELDS = ('access_count', 'access_score', 'created_timestamp', 'last_accessed_timestamp')
+
+# Seconds a writer waits for another process's transaction before failing
+SQLITE_BUSY_TIMEOUT = 30.0
+
+
+def _new_entry(timestamp: str) -> Dict:
+    return {
+        'access_count': 0,
+        'access_score': 0.0,
+        'created_timestamp': timestamp,
+        'last_accessed_timestamp': timestamp
+    }
+
+
+class MetadataStore(ABC):
+    """
+    Interface for access metadata storage.
+
+    Entries are dicts in the metadata.json format:
+    {'access_count': int, 'access_score': float, 'created_timestamp': str,
+     'last_accessed_timestamp': str}
+    with timestamps as ISO-8601 strings. access_score is the exponentially
+    decayed access frequency as of the last access (see access_scores); it
+    is missing or None for entries written before scores existed.
+    """
+
+    # Half-life used to decay access_score when accesses are recorded
+    half_life_days = ACCESS_SCORE_HALF_LIFE_DAYS
+
+    @abstractmethod
+    def get(self, file_key: str) -> Optional[Dict]:
+        """Get the entry for a key, or None if it has no metadata."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_many(self, file_keys: Iterable[str]) -> Dict[str, Dict]:
+        """Get the entries for several keys; keys without metadata are omitted."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def load_all(self) -> Dict[str, Dict]:
+        """Get every entry, keyed by file key."""
+        raise NotImplementedError
+
+    def iter_all(self) -> Iterator[Tuple[str, Dict]]:
+        """Iterate over every (key, entry) pair without holding all entries at once."""
+        return iter(self.load_all().items())
+
+    @abstractmethod
+    def keys_accessed_before(self, cutoff: datetime) -> List[str]:
+        """Get keys whose last access is older than cutoff, oldest first."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def change_watermark(self) -> int:
+        """
+        Get the current change sequence number.
+
+        Every write gives the rows it touches a new, higher sequence number,
+        so keys_changed_since(watermark) later returns exactly the keys
+        written after this call. Read it before reading the entries it covers.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def keys_changed_since(self, watermark: Optional[int]) -> List[str]:
+        """
+        Get keys whose entry was written after a change watermark.
+
+        Backends that do not track changes return every key.
+
+        Args:
+            watermark: Value from change_watermark() (None for every key)
+
+        Returns:
+            Keys written after the watermark
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def upsert_many(self, entries: Dict[str, Dict]):
+        """Insert or replace several entries in one transaction."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def insert_missing(self, entries: Dict[str, Dict]) -> int:
+        """
+        Insert entries for keys that have no metadata yet, in one transaction.
+
+        Existing entries are left untouched, so their access history survives.
+
+        Returns:
+            Number of entries inserted
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def replace_all(self, entries: Dict[str, Dict]):
+        """Replace the whole store with the given entries in one transaction."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def record_access(self, file_key: str, count: int = 1, timestamp: Optional[datetime] = None,
+                      create: bool = True) -> Optional[Dict]:
+        """
+        Atomically add accesses to a key and move its last-access time.
+
+        The key's access_score is decayed to the access time before the new
+        accesses are added.
+
+        Args:
+            file_key: File identifier
+            count: Number of accesses to add
+            timestamp: Access time (default: now)
+            create: Create the entry if the key has no metadata yet
+
+        Returns:
+            The updated entry, or None if the key was unknown and create is False
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def record_access_many(self, accesses: Dict[str, Tuple[int, datetime]]):
+        """
+        Apply many accumulated accesses in one transaction, creating missing keys.
+
+        Each key's count is added to its stored count and decayed score; its
+        last-access time becomes the later of the stored and the given time.
+
+        Args:
+            accesses: {file_key: (access count to add, latest access time)}
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def set_last_accessed(self, file_key: str, timestamp: datetime) -> bool:
+        """
+        Overwrite a key's last-access time.
+
+        Returns:
+            True if the key exists, False otherwise
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, file_key: str):
+        """Remove a key's metadata, if any."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def close(self):
+        """Release any resources held by the store."""
+        pass
+
+    def __enter__(self) -> 'MetadataStore':
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+    def upsert(self, file_key: str, entry: Dict):
+        """Insert or replace a single entry."""
+        self.upsert_many({file_key: entry})
+
+    def __contains__(self, file_key: str) -> bool:
+        return self.get(file_key) is not None
+
+    def import_json(self, path: str) -> int:
+        """
+        Upsert every entry from a metadata.json-format file.
+
+        Args:
+            path: Path to the JSON file
+
+        Returns:
+            Number of entries imported
+        """
+        with open(path, 'r') as f:
+            entries = json.load(f)
+        self.upsert_many(entries)
+        return len(entries)
+
+    def export_json(self, path: str) -> int:
+        """
+        Write every entry to a metadata.json-format file.
+
+        Args:
+            path: Destination path
+
+        Returns:
+            Number of entries exported
+        """
+        entries = self.load_all()
+        _write_json_atomically(path, entries)
+        return len(entries)
+
+
+def _write_json_atomically(path: str, entries: Dict[str, Dict]):
+    """Write entries to path via a temporary file so readers never see a partial file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.metadata-', suffix='.json')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(entries, f, indent=2, default=str)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+class JsonMetadataStore(MetadataStore):
+    """
+    Metadata store backed by a single metadata.json file.
+
+    Every write rewrites the whole file, so this backend is only suitable
+    for small deployments and for exchanging metadata with older tools.
+    """
+
+    def __init__(self, path: str = LEGACY_METADATA_PATH,
+                 half_life_days: float = ACCESS_SCORE_HALF_LIFE_DAYS):
+        """
+        Open (or start) a JSON metadata file.
+
+        Args:
+            path: Path to the metadata JSON file
+            half_life_days: Half-life used to decay access scores
+        """
+        self.path = path
+        self.half_life_days = half_life_days
+        self._lock = threading.Lock()
+        try:
+            with open(path, 'r') as f:
+                self._entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._entries = {}
+
+    def _save(self):
+        _write_json_atomically(self.path, self._entries)
+
+    def get(self, file_key: str) -> Optional[Dict]:
+        entry = self._entries.get(file_key)
+        return dict(entry) if entry is not None else None
+
+    def get_many(self, file_keys: Iterable[str]) -> Dict[str, Dict]:
+        return {key: dict(self._entries[key]) for key in file_keys if key in self._entries}
+
+    def load_all(self) -> Dict[str, Dict]:
+        return {key: dict(entry) for key, entry in self._entries.items()}
+
+    def keys_accessed_before(self, cutoff: datetime) -> List[str]:
+        threshold = cutoff.isoformat()
+        stale = [(entry['last_accessed_timestamp'], key) for key, entry in self._entries.items()
+                 if entry.get('last_accessed_timestamp') and entry['last_accessed_timestamp'] < threshold]
+        return [key for _, key in sorted(stale)]
+
+    def change_watermark(self) -> int:
+        return 0
+
+    def keys_changed_since(self, watermark: Optional[int]) -> List[str]:
+        # The JSON format does not track changes, so every key counts as changed
+        return list(self._entries)
+
+    def upsert_many(self, entries: Dict[str, Dict]):
+        with self._lock:
+            for key, entry in entries.items():
+                self._entries[key] = dict(entry)
+            self._save()
+
+    def insert_missing(self, entries: Dict[str, Dict]) -> int:
+        with self._lock:
+            missing = {key: dict(entry) for key, entry in entries.items() if key not in self._entries}
+            if missing:
+                self._entries.update(missing)
+                self._save()
+            return len(missing)
+
+    def replace_all(self, entries: Dict[str, Dict]):
+        with self._lock:
+            self._entries = {key: dict(entry) for key, entry in entries.items()}
+            self._save()
+
+    def record_access(self, file_key: str, count: int = 1, timestamp: Optional[datetime] = None,
+                      create: bool = True) -> Optional[Dict]:
+        accessed_at = (timestamp or datetime.now()).isoformat()
+        with self._lock:
+            entry = self._entries.get(file_key)
+            if entry is None:
+                if not create:
+                    return None
+                entry = self._entries[file_key] = _new_entry(accessed_at)
+            self._add_accesses(entry, count, accessed_at)
+            entry['last_accessed_timestamp'] = accessed_at
+            self._save()
+            return dict(entry)
+
+    def record_access_many(self, accesses: Dict[str, Tuple[int, datetime]]):
+        with self._lock:
+            for file_key, (count, timestamp) in accesses.items():
+                accessed_at = timestamp.isoformat()
+                entry = self._entries.get(file_key)
+                if entry is None:
+                    entry = self._entries[file_key] = _new_entry(accessed_at)
+                self._add_accesses(entry, count, accessed_at)
+                if (entry.get('last_accessed_timestamp') or '') < accessed_at:
+                    entry['last_accessed_timestamp'] = accessed_at
+            self._save()
+
+    def _add_accesses(self, entry: Dict, count: int, accessed_at: str):
+        # Entries without a score start from their lifetime count, as the engine reads them
+        score = entry.get('access_score')
+        entry['access_score'] = add_accesses(
+            score if score is not None else entry.get('access_count', 0),
+            entry.get('last_accessed_timestamp'), count, accessed_at, self.half_life_days
+        )
+        entry['access_count'] = entry.get('access_count', 0) + count
+
+    def set_last_accessed(self, file_key: str, timestamp: datetime) -> bool:
+        with self._lock:
+            if file_key not in self._entries:
+                return False
+            self._entries[file_key]['last_accessed_timestamp'] = timestamp.isoformat()
+            self._save()
+            return True
+
+    def delete(self, file_key: str):
+        with self._lock:
+            if self._entries.pop(file_key, None) is not None:
+                self._save()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SqliteMetadataStore(MetadataStore):
+    """
+    Metadata store backed by a SQLite database in WAL mode.
+
+    WAL lets readers (dashboards, the engine) run alongside a writer (the
+    Kafka consumer) without blocking, and the busy timeout makes concurrent
+    writers from other processes wait their turn instead of failing.
+
+    Triggers stamp every inserted or updated row with the next change_seq.
+    SQLite allows one writer at a time, so sequence numbers follow commit
+    order and a watermark never skips a concurrent write.
+    """
+
+    # Rows read per query by iter_all()
+    ITER_PAGE_SIZE = 10_000
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS object_metadata (
+            key TEXT PRIMARY KEY,
+            access_count INTEGER NOT NULL DEFAULT 0,
+            access_score REAL,
+            created_timestamp TEXT,
+            last_accessed_timestamp TEXT,
+            extra TEXT,
+            updated_at TEXT NOT NULL,
+            change_seq INTEGER NOT NULL DEFAULT 0
+        );
+    """
+
+    INDEXES = """
+        CREATE INDEX IF NOT EXISTS idx_object_metadata_last_accessed
+            ON object_metadata (last_accessed_timestamp);
+        CREATE INDEX IF NOT EXISTS idx_object_metadata_change_seq
+            ON object_metadata (change_seq);
+        CREATE TRIGGER IF NOT EXISTS trg_object_metadata_insert_seq
+        AFTER INSERT ON object_metadata
+        BEGIN
+            UPDATE object_metadata
+            SET change_seq = (SELECT COALESCE(MAX(change_seq), 0) + 1 FROM object_metadata)
+            WHERE key = NEW.key;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_object_metadata_update_seq
+        AFTER UPDATE OF access_count, access_score, created_timestamp, last_accessed_timestamp, extra
+        ON object_metadata
+        BEGIN
+            UPDATE object_metadata
+            SET change_seq = (SELECT COALESCE(MAX(change_seq), 0) + 1 FROM object_metadata)
+            WHERE key = NEW.key;
+        END;
+    """
+
+    UPSERT = """
+        INSERT INTO object_metadata
+            (key, access_count, access_score, created_timestamp, last_accessed_timestamp, extra, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(key) DO UPDATE SET
+            access_count = excluded.access_count,
+            access_score = excluded.access_score,
+            created_timestamp = excluded.created_timestamp,
+            last_accessed_timestamp = excluded.last_accessed_timestamp,
+            extra = excluded.extra,
+            updated_at = excluded.updated_at
+    """
+
+    INSERT_MISSING = """
+        INSERT INTO object_metadata
+            (key, access_count, access_score, created_timestamp, last_accessed_timestamp, extra, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(key) DO NOTHING
+    """
+
+    # Access increments applied inside SQLite, so concurrent writers never lose
+    # counts; decayed_add() decays the stored score to the access time and
+    # adds the new accesses (scores missing in old rows start from the count)
+    ACCESS_UPDATE = """
+        access_count = access_count + excluded.access_count,
+        access_score = decayed_add(COALESCE(access_score, access_count), last_accessed_timestamp,
+                                   excluded.access_count, excluded.last_accessed_timestamp, ?),
+    """
+
+    def __init__(self, path: str = DEFAULT_METADATA_PATH,
+                 half_life_days: float = ACCESS_SCORE_HALF_LIFE_DAYS):
+        """
+        Open (or create) a SQLite metadata database.
+
+        Args:
+            path: Path to the database file
+            half_life_days: Half-life used to decay access scores
+        """
+        self.path = path
+        self.half_life_days = half_life_days
+        self._lock = threading.Lock()
+        # One connection shared by this process's threads, serialized by the lock
+        self._conn = sqlite3.connect(path, timeout=SQLITE_BUSY_TIMEOUT, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.create_function('decayed_add', 5, add_accesses, deterministic=True)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._lock, self._conn:
+            self._conn.executescript(self.SCHEMA)
+            columns = {row['name'] for row in self._conn.execute("PRAGMA table_info(object_metadata)")}
+            if 'change_seq' not in columns:
+                # Databases created before change tracking
+                self._conn.execute(
+                    "ALTER TABLE object_metadata ADD COLUMN change_seq INTEGER NOT NULL DEFAULT 0"
+                )
+            if 'access_score' not in columns:
+                # Databases created before access scores; NULL reads as the lifetime count
+                self._conn.execute("ALTER TABLE object_metadata ADD COLUMN access_score REAL")
+            self._conn.executescript(self.INDEXES)
+
+    @staticmethod
+    def _row_to_entry(row: sqlite3.Row) -> Dict:
+        entry = {
+            'access_count': row['access_count'],
+            'access_score': row['access_score'],
+            'created_timestamp': row['created_timestamp'],
+            'last_accessed_timestamp': row['last_accessed_timestamp']
+        }
+        if row['extra']:
+            entry.update(json.loads(row['extra']))
+        return entry
+
+    @staticmethod
+    def _entry_to_row(file_key: str, entry: Dict, updated_at: str) -> tuple:
+        extra = {field: value for field, value in entry.items() if field not in CORE_FIELDS}
+        return (
+            file_key,
+            entry.get('access_count', 0),
+            entry.get('access_score'),
+            entry.get('created_timestamp'),
+            entry.get('last_accessed_timestamp'),
+            json.dumps(extra, default=str) if extra else None,
+            updated_at
+        )
+
+    def get(self, file_key: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM object_metadata WHERE key = ?", (file_key,)
+            ).fetchone()
+        return self._row_to_entry(row) if row is not None else None
+
+    def get_many(self, file_keys: Iterable[str]) -> Dict[str, Dict]:
+        keys = list(file_keys)
+        entries = {}
+        # Stay well below SQLite's limit on bound parameters per statement
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT * FROM object_metadata WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+            for row in rows:
+                entries[row['key']] = self._row_to_entry(row)
+        return entries
+
+    def load_all(self) -> Dict[str, Dict]:
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM object_metadata ORDER BY key").fetchall()
+        return {row['key']: self._row_to_entry(row) for row in rows}
+
+    def iter_all(self) -> Iterator[Tuple[str, Dict]]:
+        # Read in pages so neither side holds the whole table; the lock is
+        # only taken per page, so writers are not blocked for the full scan
+        last_key = ''
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT * FROM object_metadata WHERE key > ? ORDER BY key LIMIT ?",
+                    (last_key, self.ITER_PAGE_SIZE)
+                ).fetchall()
+            for row in rows:
+                yield row['key'], self._row_to_entry(row)
+            if len(rows) < self.ITER_PAGE_SIZE:
+                return
+            last_key = rows[-1]['key']
+
+    def keys_accessed_before(self, cutoff: datetime) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key FROM object_metadata WHERE last_accessed_timestamp < ? "
+                "ORDER BY last_accessed_timestamp",
+                (cutoff.isoformat(),)
+            ).fetchall()
+        return [row['key'] for row in rows]
+
+    def change_watermark(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COALESCE(MAX(change_seq), 0) FROM object_metadata"
+            ).fetchone()[0]
+
+    def keys_changed_since(self, watermark: Optional[int]) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key FROM object_metadata WHERE change_seq > ? ORDER BY change_seq",
+                (watermark if watermark is not None else -1,)
+            ).fetchall()
+        return [row['key'] for row in rows]
+
+    def upsert_many(self, entries: Dict[str, Dict]):
+        updated_at = datetime.now().isoformat()
+        rows = [self._entry_to_row(key, entry, updated_at) for key, entry in entries.items()]
+        with self._lock, self._conn:
+            self._conn.executemany(self.UPSERT, rows)
+
+    def insert_missing(self, entries: Dict[str, Dict]) -> int:
+        updated_at = datetime.now().isoformat()
+        rows = [self._entry_to_row(key, entry, updated_at) for key, entry in entries.items()]
+        with self._lock, self._conn:
+            # rowcount leaves out the rows touched by the change-tracking trigger
+            return self._conn.executemany(self.INSERT_MISSING, rows).rowcount
+
+    def replace_all(self, entries: Dict[str, Dict]):
+        updated_at = datetime.now().isoformat()
+        rows = [self._entry_to_row(key, entry, updated_at) for key, entry in entries.items()]
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM object_metadata")
+            self._conn.executemany(self.UPSERT, rows)
+
+    def record_access(self, file_key: str, count: int = 1, timestamp: Optional[datetime] = None,
+                      create: bool = True) -> Optional[Dict]:
+        accessed_at = (timestamp or datetime.now()).isoformat()
+        updated_at = datetime.now().isoformat()
+        with self._lock, self._conn:
+            if create:
+                self._conn.execute(
+                    f"""
+                    INSERT INTO object_metadata
+                        (key, access_count, access_score, created_timestamp, last_accessed_timestamp,
+                         updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(key) DO UPDATE SET
+                        {self.ACCESS_UPDATE}
+                        last_accessed_timestamp = excluded.last_accessed_timestamp,
+                        updated_at = excluded.updated_at
+                    """,
+                    (file_key, count, float(count), accessed_at, accessed_at, updated_at,
+                     self.half_life_days)
+                )
+            else:
+                cursor = self._conn.execute(
+                    "UPDATE object_metadata SET access_count = access_count + ?, "
+                    "access_score = decayed_add(COALESCE(access_score, access_count), "
+                    "last_accessed_timestamp, ?, ?, ?), "
+                    "last_accessed_timestamp = ?, updated_at = ? WHERE key = ?",
+                    (count, count, accessed_at, self.half_life_days, accessed_at, updated_at, file_key)
+                )
+                if cursor.rowcount == 0:
+                    return None
+            row = self._conn.execute(
+                "SELECT * FROM object_metadata WHERE key = ?", (file_key,)
+            ).fetchone()
+        return self._row_to_entry(row)
+
+    def record_access_many(self, accesses: Dict[str, Tuple[int, datetime]]):
+        updated_at = datetime.now().isoformat()
+        rows = [(file_key, count, float(count), timestamp.isoformat(), timestamp.isoformat(), updated_at,
+                 self.half_life_days)
+                for file_key, (count, timestamp) in accesses.items()]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"""
+                INSERT INTO object_metadata
+                    (key, access_count, access_score, created_timestamp, last_accessed_timestamp,
+                     updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    {self.ACCESS_UPDATE}
+                    last_accessed_timestamp = MAX(COALESCE(last_accessed_timestamp, ''),
+                                                  excluded.last_accessed_timestamp),
+                    updated_at = excluded.updated_at
+                """,
+                rows
+            )
+
+    def set_last_accessed(self, file_key: str, timestamp: datetime) -> bool:
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE object_metadata SET last_accessed_timestamp = ?, updated_at = ? WHERE key = ?",
+                (timestamp.isoformat(), datetime.now().isoformat(), file_key)
+            )
+        return cursor.rowcount > 0
+
+    def delete(self, file_key: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM object_metadata WHERE key = ?", (file_key,))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM object_metadata").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def open_metadata_store(path: str = DEFAULT_METADATA_PATH,
+                        legacy_path: Optional[str] = LEGACY_METADATA_PATH,
+                        half_life_days: float = ACCESS_SCORE_HALF_LIFE_DAYS) -> MetadataStore:
+    """
+    Open the metadata store for a path, choosing the backend by extension.
+
+    A '.json' path opens the legacy JSON backend; anything else opens SQLite.
+    A new, empty SQLite store is seeded once from legacy_path if that file
+    exists, so existing metadata.json data carries over automatically.
+
+    Args:
+        path: Store path ('metadata.db' by default)
+        legacy_path: metadata.json to import into a new SQLite store (None to skip)
+        half_life_days: Half-life used to decay access scores as accesses are recorded
+
+    Returns:
+        Open MetadataStore
+    """
+    if path.endswith('.json'):
+        return JsonMetadataStore(path, half_life_days)
+
+    store = SqliteMetadataStore(path, half_life_days)
+    if legacy_path and os.path.exists(legacy_path) and len(store) == 0:
+        try:
+            imported = store.import_json(legacy_path)
+            print(f"✓ Imported {imported} metadata entries from '{legacy_path}' into '{path}'")
+        except (json.JSONDecodeError, AttributeError) as e:
+            print(f"✗ Error importing metadata from '{legacy_path}': {e}")
+    return store
@@ -0,0 +1,255 @@
+"""
+Migration Journal
+Durable record of cross-cloud migration progress, so an interrupted batch
+or a large object does not start over.
+
+Two kinds of progress are kept per route (source bucket → destination
+bucket): objects whose migration finished and was verified, and the open
+multipart upload of each object still in flight, with every part that
+finished. A restarted migration skips finished objects whose source is
+unchanged and resumes open uploads from their finished parts. Both are
+keyed by the source ETag, so progress made against an older version of an
+object is never reused.
+"""
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+from transfer import UploadCheckpoint
+
+DEFAULT_MIGRATION_JOURNAL_PATH = "migration_journal.db"
+
+
+class JournalCheckpoint(UploadCheckpoint):
+    """Upload checkpoint that writes every change through to the journal."""
+
+    persistent = True
+
+    def __init__(self, journal: 'MigrationJournal', route: str, file_key: str, source_etag: str,
+                 **progress):
+        """
+        Initialize a checkpoint for one object.
+
+        Args:
+            journal: Journal to write to
+            route: Route the object is migrating on
+            file_key: Object key
+            source_etag: ETag of the source version being migrated
+            **progress: Stored progress (see UploadCheckpoint)
+        """
+        super().__init__(**progress)
+        self.journal = journal
+        self.route = route
+        self.file_key = file_key
+        self.source_etag = source_etag
+
+    def started(self, upload_id: str, part_size: int):
+        super().started(upload_id, part_size)
+        self.journal._record_upload(self, upload_id, part_size)
+
+    def part_done(self, part: Dict, md5: Optional[str] = None):
+        super().part_done(part, md5)
+        self.journal._record_part(self.upload_id, part, md5)
+
+
+class MigrationJournal:
+    """
+    SQLite-backed journal of finished migrations and open multipart uploads.
+
+    Safe to share between the threads of a concurrent batch.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS migrated_objects (
+            route TEXT NOT NULL,
+            key TEXT NOT NULL,
+            source_etag TEXT,
+            destination_etag TEXT,
+            completed_at TEXT NOT NULL,
+            PRIMARY KEY (route, key)
+        );
+        CREATE TABLE IF NOT EXISTS multipart_uploads (
+            route TEXT NOT NULL,
+            key TEXT NOT NULL,
+            upload_id TEXT NOT NULL UNIQUE,
+            source_etag TEXT,
+            part_size INTEGER NOT NULL,
+            started_at TEXT NOT NULL,
+            PRIMARY KEY (route, key)
+        );
+        CREATE TABLE IF NOT EXISTS upload_parts (
+            upload_id TEXT NOT NULL,
+            part_number INTEGER NOT NULL,
+            part TEXT NOT NULL,
+            md5 TEXT,
+            PRIMARY KEY (upload_id, part_number)
+        );
+    """
+
+    def __init__(self, path: str = DEFAULT_MIGRATION_JOURNAL_PATH):
+        """
+        Open (or create) a journal database.
+
+        Args:
+            path: Path to the database file
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._lock, self._conn:
+            self._conn.executescript(self.SCHEMA)
+
+    @staticmethod
+    def route_for(source_manager, destination_manager) -> str:
+        """
+        Get the route id of a source and destination bucket.
+
+        Args:
+            source_manager: S3Manager of the source bucket
+            destination_manager: S3Manager of the destination bucket
+
+        Returns:
+            Route id, e.g. 'aws/my-bucket>gcp/archive'
+        """
+        return (f"{source_manager.get_cloud_name()}/{source_manager.bucket_name}>"
+                f"{destination_manager.get_cloud_name()}/{destination_manager.bucket_name}")
+
+    def completed_etag(self, route: str, file_key: str) -> Optional[str]:
+        """
+        Get the source ETag a finished migration of a key was made from.
+
+        Args:
+            route: Route id
+            file_key: Object key
+
+        Returns:
+            Source ETag ('' if unknown), or None if the key has not finished
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT source_etag FROM migrated_objects WHERE route = ? AND key = ?",
+                (route, file_key)
+            ).fetchone()
+        return (row[0] or '') if row else None
+
+    def completed_keys(self, route: str, file_keys: Iterable[str]) -> Dict[str, str]:
+        """
+        Get which of several keys have finished migrating.
+
+        Args:
+            route: Route id
+            file_keys: Object keys
+
+        Returns:
+            {key: source ETag} for the finished keys
+        """
+        keys = list(file_keys)
+        completed = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT key, source_etag FROM migrated_objects WHERE route = ? AND key IN ({placeholders})",
+                    [route, *chunk]
+                ).fetchall()
+            completed.update((key, etag or '') for key, etag in rows)
+        return completed
+
+    def mark_completed(self, route: str, file_key: str, source_etag: Optional[str],
+                       destination_etag: Optional[str]):
+        """
+        Record a verified migration and drop its upload progress.
+
+        Args:
+            route: Route id
+            file_key: Object key
+            source_etag: ETag of the migrated source version
+            destination_etag: ETag of the destination copy
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO migrated_objects (route, key, source_etag, destination_etag, completed_at) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT(route, key) DO UPDATE SET "
+                "source_etag = excluded.source_etag, destination_etag = excluded.destination_etag, "
+                "completed_at = excluded.completed_at",
+                (route, file_key, source_etag, destination_etag, datetime.now().isoformat())
+            )
+            self._delete_upload(route, file_key)
+
+    def get_checkpoint(self, route: str, file_key: str) -> Optional[JournalCheckpoint]:
+        """
+        Get the open upload of a key, with its finished parts.
+
+        Args:
+            route: Route id
+            file_key: Object key
+
+        Returns:
+            Checkpoint to resume from (check its source_etag first), or None
+        """
+        with self._lock:
+            upload = self._conn.execute(
+                "SELECT upload_id, source_etag, part_size FROM multipart_uploads WHERE route = ? AND key = ?",
+                (route, file_key)
+            ).fetchone()
+            if upload is None:
+                return None
+            rows = self._conn.execute(
+                "SELECT part_number, part, md5 FROM upload_parts WHERE upload_id = ?", (upload[0],)
+            ).fetchall()
+        return JournalCheckpoint(
+            self, route, file_key, upload[1],
+            upload_id=upload[0],
+            part_size=upload[2],
+            parts={number: json.loads(part) for number, part, _ in rows},
+            part_md5s={number: md5 for number, _, md5 in rows if md5}
+        )
+
+    def new_checkpoint(self, route: str, file_key: str, source_etag: str) -> JournalCheckpoint:
+        """
+        Get an empty checkpoint that is journaled once its upload starts.
+
+        Args:
+            route: Route id
+            file_key: Object key
+            source_etag: ETag of the source version being migrated
+        """
+        return JournalCheckpoint(self, route, file_key, source_etag)
+
+    def forget_upload(self, route: str, file_key: str):
+        """Drop the journaled upload of a key (after aborting it, or if it is gone)."""
+        with self._lock, self._conn:
+            self._delete_upload(route, file_key)
+
+    def _delete_upload(self, route: str, file_key: str):
+        self._conn.execute(
+            "DELETE FROM upload_parts WHERE upload_id IN "
+            "(SELECT upload_id FROM multipart_uploads WHERE route = ? AND key = ?)",
+            (route, file_key)
+        )
+        self._conn.execute("DELETE FROM multipart_uploads WHERE route = ? AND key = ?", (route, file_key))
+
+    def _record_upload(self, checkpoint: JournalCheckpoint, upload_id: str, part_size: int):
+        with self._lock, self._conn:
+            self._delete_upload(checkpoint.route, checkpoint.file_key)
+            self._conn.execute(
+                "INSERT INTO multipart_uploads (route, key, upload_id, source_etag, part_size, started_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (checkpoint.route, checkpoint.file_key, upload_id, checkpoint.source_etag, part_size,
+                 datetime.now().isoformat())
+            )
+
+    def _record_part(self, upload_id: str, part: Dict, md5: Optional[str]):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO upload_parts (upload_id, part_number, part, md5) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(upload_id, part_number) DO UPDATE SET part = excluded.part, md5 = excluded.md5",
+                (upload_id, part['PartNumber'], json.dumps(part), md5)
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
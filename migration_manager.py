@@ -2,36 +2,149 @@
 Multi-Cloud Migration Manager
 Handles secure, verified migrations between different cloud providers with integrity checks.
 """
+import contextlib
 import hashlib
-import time
-from typing import Optional, Tuple
+import os
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+from botocore.exceptions import BotoCoreError, ClientError
 from cloud_utils import S3Manager
+from migration_journal import MigrationJournal
+from transfer import (
+    STREAM_CHECKSUM_ALGORITHM, STREAM_PART_SIZE, BufferedObject, StagePipeline,
+    TransferResult, UploadCheckpoint
+)
+
+# Default number of workers of each network stage (fetch, upload, verify) of a batch
+MIGRATION_MAX_WORKERS = 8
+
+# Hashing is CPU-bound (hashlib releases the GIL on large buffers)
+MIGRATION_HASH_WORKERS = min(4, os.cpu_count() or 1)
+
+# Objects each batch stage may have waiting in front of it
+MIGRATION_QUEUE_SIZE = 4
+
+# Migrations allowed in flight per (source cloud, destination cloud) route,
+# across every MigrationManager and batch in the process
+ROUTE_CONCURRENCY_LIMITS: Dict[Tuple[str, str], int] = {}
+DEFAULT_ROUTE_CONCURRENCY = 16
+
+
+@dataclass
+class MigrationJob:
+    """State of one object as it moves through the migration stages."""
+    file_key: str
+    verify_integrity: bool
+    # 'now', 'keep' or 'defer' (see MigrationManager._migrate())
+    source_action: str
+    source_meta: Optional[Dict] = None
+    size_mb: float = 0.0
+    # Small objects, read whole by the fetch stage
+    buffered: Optional[BufferedObject] = None
+    result: Optional[TransferResult] = None
+    # (success, message) once the object is done; set early when it fails or is skipped
+    outcome: Optional[Tuple[bool, str]] = None
+    # Finished by an earlier run (journal), so nothing was copied this time
+    skipped: bool = False
+    # Counted in migrations_attempted
+    attempted: bool = False
+    route_slot: Optional[threading.BoundedSemaphore] = None
 
 
 class MigrationManager:
     """
     Manages data migration between cloud providers with verification and safety checks.
     Ensures data integrity and minimal disruption during cross-cloud migrations.
+    
+    A migration runs in stages: fetch (inspect the source, read small
+    objects), hash, upload and verify. Batches run the stages as a pipeline,
+    so one object's upload overlaps the next objects' reads.
+    
+    A manager can be shared by many threads: statistics are updated under a
+    lock, and every migration holds a slot of its route's process-wide
+    concurrency limit.
     """
     
-    def __init__(self, source_cloud_manager: S3Manager, destination_cloud_manager: S3Manager):
+    _route_lock = threading.Lock()
+    _route_slots: Dict[Tuple[str, str], threading.BoundedSemaphore] = {}
+    
+    def __init__(self, source_cloud_manager: S3Manager, destination_cloud_manager: S3Manager,
+                 server_side_copy: Optional[bool] = None, paranoid_verify: bool = False,
+                 journal: Optional[MigrationJournal] = None):
         """
         Initialize migration manager with source and destination cloud managers.
         
         Args:
             source_cloud_manager: S3Manager instance for source cloud
             destination_cloud_manager: S3Manager instance for destination cloud
+            server_side_copy: Force (True) or disable (False) server-side copies;
+                by default they are used whenever the destination can read the source
+            paranoid_verify: Re-read and hash the copied object in full on every
+                verification, instead of trusting checksums computed in transit
+                and ETags reported by the provider
+            journal: Records finished objects and multipart upload progress, so
+                a rerun skips finished files and resumes partial uploads
         """
         self.source_manager = source_cloud_manager
         self.destination_manager = destination_cloud_manager
         self.source_cloud = source_cloud_manager.get_cloud_name().upper()
         self.destination_cloud = destination_cloud_manager.get_cloud_name().upper()
         
-        # Migration statistics
+        if server_side_copy is None:
+            server_side_copy = destination_cloud_manager.can_copy_from(source_cloud_manager)
+        self.use_server_side_copy = server_side_copy
+        self.paranoid_verify = paranoid_verify
+        self.journal = journal
+        self.route = MigrationJournal.route_for(source_cloud_manager, destination_cloud_manager)
+        
+        # Migration statistics, shared by concurrent migrations
+        self._stats_lock = threading.Lock()
         self.migrations_attempted = 0
         self.migrations_succeeded = 0
         self.migrations_failed = 0
+        self.migrations_skipped = 0
         self.total_data_migrated_mb = 0.0
+        
+        # Pipeline of the latest batch, for per-stage load (live while it runs)
+        self.pipeline: Optional[StagePipeline] = None
+    
+    @classmethod
+    def get_route_slots(cls, source_cloud: str, destination_cloud: str) -> threading.BoundedSemaphore:
+        """
+        Get the semaphore that caps concurrent migrations on a route.
+        
+        Args:
+            source_cloud: Name of the source cloud provider
+            destination_cloud: Name of the destination cloud provider
+        
+        Returns:
+            Semaphore shared by every MigrationManager for that route
+        """
+        route = (source_cloud.lower(), destination_cloud.lower())
+        slots = cls._route_slots.get(route)
+        if slots is None:
+            with cls._route_lock:
+                slots = cls._route_slots.get(route)
+                if slots is None:
+                    limit = ROUTE_CONCURRENCY_LIMITS.get(route, DEFAULT_ROUTE_CONCURRENCY)
+                    slots = cls._route_slots[route] = threading.BoundedSemaphore(limit)
+        return slots
+    
+    @classmethod
+    def set_route_concurrency(cls, source_cloud: str, destination_cloud: str, limit: int):
+        """
+        Change the concurrent migration limit for a route (applies to new migrations).
+        
+        Args:
+            source_cloud: Name of the source cloud provider
+            destination_cloud: Name of the destination cloud provider
+            limit: Maximum migrations in flight
+        """
+        route = (source_cloud.lower(), destination_cloud.lower())
+        with cls._route_lock:
+            ROUTE_CONCURRENCY_LIMITS[route] = limit
+            cls._route_slots[route] = threading.BoundedSemaphore(limit)
     
     def _calculate_checksum(self, content: bytes) -> str:
         """
@@ -45,11 +158,15 @@ class MigrationManager:
         """
         return hashlib.md5(content).hexdigest()
     
-    def migrate_object(self, file_key: str, verify_integrity: bool = True, 
+    def migrate_object(self, file_key: str, verify_integrity: bool = True,
                        delete_source: bool = True) -> Tuple[bool, str]:
         """
         Migrate a single object from source to destination cloud with integrity verification.
         
+        Uses a server-side copy when both clouds are reachable through the same
+        S3 API, so the data never passes through this host; otherwise the object
+        is streamed through this host into a multipart upload, unchanged.
+        
         Args:
             file_key: The key/path of the file to migrate
             verify_integrity: Whether to perform checksum verification (default: True)
@@ -58,147 +175,570 @@ class MigrationManager:
         Returns:
             Tuple of (success: bool, message: str)
         """
-        self.migrations_attempted += 1
+        return self._migrate(file_key, verify_integrity, 'now' if delete_source else 'keep')
+    
+    def _migrate(self, file_key: str, verify_integrity: bool, source_action: str) -> Tuple[bool, str]:
+        """
+        Migrate a single object, running the stages one after another.
+        
+        Args:
+            file_key: The key/path of the file to migrate
+            verify_integrity: Whether to perform checksum verification
+            source_action: 'now' to delete the source after verification, 'keep'
+                to keep it, or 'defer' when the caller deletes sources in bulk
+        
+        Returns:
+            Tuple of (success: bool, message: str)
+        """
+        job = MigrationJob(file_key, verify_integrity, source_action)
+        for _, stage in self._stages():
+            if job.outcome is not None:
+                break
+            job = self._run_stage(stage, job)
+        return self._finish(job)
+    
+    def _stages(self) -> List[Tuple[str, Callable[[MigrationJob], MigrationJob]]]:
+        """The migration stages, in order, by name."""
+        return [
+            ('fetch', self._fetch),
+            ('hash', self._hash),
+            ('upload', self._upload),
+            ('verify', self._verify)
+        ]
+    
+    def _run_stage(self, stage: Callable[[MigrationJob], MigrationJob], job: MigrationJob) -> MigrationJob:
+        """Run one stage on a job, failing the job on an unexpected error."""
+        try:
+            return stage(job)
+        except Exception as e:
+            error_msg = f"Unexpected error during migration: {str(e)}"
+            print(f"\n✗ [MIGRATION FAILED] {error_msg}\n")
+            job.outcome = (False, error_msg)
+            return job
+    
+    def _fetch(self, job: MigrationJob) -> MigrationJob:
+        """
+        Stage 1: take a route slot, inspect the source and read small objects whole.
+        
+        The slot is held until _finish(), so it caps the objects in flight on
+        the route across every stage.
+        """
+        job.route_slot = self.get_route_slots(self.source_cloud, self.destination_cloud)
+        job.route_slot.acquire()
         
+        file_key = job.file_key
         print(f"\n{'='*70}")
         print(f"[MIGRATION] Starting migration of '{file_key}'")
         print(f"            FROM: {self.source_cloud} ({self.source_manager.region})")
         print(f"            TO:   {self.destination_cloud} ({self.destination_manager.region})")
         print(f"{'='*70}")
         
-        try:
-            # Step 1: Download from source
-            print(f"[STEP 1/5] Downloading '{file_key}' from {self.source_cloud}...")
-            source_content = self.source_manager.download_file_content(file_key)
-            
-            if source_content is None:
-                error_msg = f"File '{file_key}' not found in source cloud"
-                print(f"✗ [ERROR] {error_msg}")
-                self.migrations_failed += 1
-                return False, error_msg
-            
-            content_size_mb = len(source_content) / (1024 * 1024)
-            print(f"✓ Downloaded {content_size_mb:.2f} MB")
-            
-            # Step 2: Calculate source checksum
-            print(f"\n[STEP 2/5] Calculating source integrity checksum...")
-            source_checksum = self._calculate_checksum(source_content)
-            print(f"✓ Source MD5: {source_checksum}")
-            
-            # Step 3: Get source metadata (tier)
-            source_tier = self.source_manager.get_file_tier(file_key)
-            print(f"✓ Source tier: {source_tier}")
-            
-            # Step 4: Upload to destination
-            print(f"\n[STEP 3/5] Uploading '{file_key}' to {self.destination_cloud}...")
-            upload_success = self.destination_manager.upload_file(
-                file_key, 
-                source_content.decode('utf-8', errors='ignore'),
-                tier=source_tier or 'STANDARD'
-            )
-            
-            if not upload_success:
-                error_msg = f"Upload to {self.destination_cloud} failed"
+        # Step 1: Inspect source
+        print(f"[STEP 1/5] Inspecting '{file_key}' on {self.source_cloud}...")
+        source_meta = self.source_manager.get_file_metadata(file_key)
+        
+        if self._already_migrated(file_key, source_meta):
+            print(f"⏩ Already migrated and verified (journal); source unchanged, skipping the copy")
+            job.skipped = True
+            job.outcome = (True, "Already migrated")
+            return job
+        self._count_attempt(job)
+        
+        if source_meta is None:
+            error_msg = f"File '{file_key}' not found in source cloud"
+            print(f"✗ [ERROR] {error_msg}")
+            job.outcome = (False, error_msg)
+            return job
+        
+        job.source_meta = source_meta
+        job.size_mb = source_meta['size'] / (1024 * 1024)
+        print(f"✓ Size: {job.size_mb:.2f} MB | Tier: {source_meta['storage_class']}")
+        if self.use_server_side_copy:
+            print(f"✓ Source ETag: {source_meta['etag']}")
+            return job
+        
+        # Objects under one part go up in a single PUT: read them here, so the
+        # upload stage can write earlier objects meanwhile. Larger objects are
+        # read part by part while they upload.
+        if source_meta['size'] < STREAM_PART_SIZE:
+            print(f"\n[STEP 2/5] Reading '{file_key}' from {self.source_cloud}...")
+            job.buffered = self.source_manager.buffer_object(file_key, etag=source_meta['etag'])
+            if job.buffered is None:
+                error_msg = f"Read from {self.source_cloud} failed"
                 print(f"✗ [ERROR] {error_msg}")
-                self.migrations_failed += 1
-                return False, error_msg
-            
-            print(f"✓ Upload completed successfully")
+                job.outcome = (False, error_msg)
+        return job
+    
+    def _hash(self, job: MigrationJob) -> MigrationJob:
+        """
+        Stage 2: hash objects read whole by _fetch().
+        
+        Streamed objects are hashed part by part on their way through the
+        upload stage, and server-side copies never pass through this host.
+        """
+        if job.buffered is not None:
+            job.buffered.hash(STREAM_CHECKSUM_ALGORITHM)
+            print(f"✓ Source MD5: {job.buffered.md5}")
+        return job
+    
+    def _upload(self, job: MigrationJob) -> MigrationJob:
+        """Stage 3: write the object to the destination."""
+        if self.use_server_side_copy:
+            return self._copy_server_side(job)
+        return self._copy_through_client(job)
+    
+    def _verify(self, job: MigrationJob) -> MigrationJob:
+        """Stage 4: verify the copy (if enabled) and journal the finished migration."""
+        if self.use_server_side_copy:
+            verified = self._verify_server_side(job) if job.verify_integrity else True
+            message = "Copied server-side"
+        else:
+            verified = self._verify_streamed(job) if job.verify_integrity else True
+            message = "Streamed through client"
+        
+        if not verified:
+            return job
+        self._journal_completed(job.file_key, job.source_meta['etag'], job.result.etag)
+        job.outcome = (True, message)
+        return job
+    
+    def _finish(self, job: MigrationJob) -> Tuple[bool, str]:
+        """
+        Step 5: act on the source of a verified object, record statistics and release the route slot.
+        
+        Args:
+            job: A job that went through the stages
+        
+        Returns:
+            Tuple of (success: bool, message: str); skipped jobs succeed with
+            "Already migrated"
+        """
+        file_key = job.file_key
+        try:
+            success, message = job.outcome or (False, "Migration did not finish")
+            if not success:
+                self._record_failure(job)
+                return False, message
             
-            # Step 5: Verify integrity (if enabled)
-            if verify_integrity:
-                print(f"\n[STEP 4/5] Verifying data integrity on {self.destination_cloud}...")
-                time.sleep(0.1)  # Simulate verification delay
-                
-                destination_content = self.destination_manager.download_file_content(file_key)
-                
-                if destination_content is None:
-                    error_msg = "Verification failed: Could not download from destination"
-                    print(f"✗ [ERROR] {error_msg}")
-                    self.migrations_failed += 1
-                    return False, error_msg
-                
-                destination_checksum = self._calculate_checksum(destination_content)
-                print(f"✓ Destination MD5: {destination_checksum}")
-                
-                # Compare checksums
-                if source_checksum != destination_checksum:
-                    error_msg = f"CHECKSUM MISMATCH! Source: {source_checksum}, Dest: {destination_checksum}"
-                    print(f"\n{'!'*70}")
-                    print(f"✗ [MIGRATION FAILED] {error_msg}")
-                    print(f"   Data integrity compromised. Aborting migration.")
-                    print(f"   Original file remains on {self.source_cloud}.")
-                    print(f"{'!'*70}\n")
-                    self.migrations_failed += 1
-                    return False, error_msg
-                
-                print(f"✓ Checksums match! Data integrity verified.")
+            # Step 5: Delete from source (if requested and verification passed)
+            self._act_on_source(job)
             
-            # Step 6: Delete from source (if requested and verification passed)
-            if delete_source:
-                print(f"\n[STEP 5/5] Removing '{file_key}' from {self.source_cloud}...")
-                delete_success = self.source_manager.delete_file(file_key)
-                
-                if delete_success:
-                    print(f"✓ Source file deleted successfully")
-                else:
-                    print(f"⚠️  Warning: Could not delete source file (migration still successful)")
-            else:
-                print(f"\n[STEP 5/5] Keeping copy on {self.source_cloud} (delete_source=False)")
+            if job.skipped:
+                print(f"\n{'='*70}")
+                print(f"⏩ [MIGRATION SKIPPED] '{file_key}' was already migrated and verified by an earlier run")
+                print(f"{'='*70}\n")
+                with self._stats_lock:
+                    self.migrations_skipped += 1
+                return True, message
             
             # Success!
             print(f"\n{'='*70}")
             print(f"✓ [MIGRATION SUCCESS] '{file_key}' successfully migrated")
             print(f"  FROM: {self.source_cloud} → TO: {self.destination_cloud}")
-            print(f"  Size: {content_size_mb:.2f} MB | Integrity: Verified ✓")
+            print(f"  Size: {job.size_mb:.2f} MB | Integrity: Verified ✓")
             print(f"{'='*70}\n")
             
-            self.migrations_succeeded += 1
-            self.total_data_migrated_mb += content_size_mb
+            with self._stats_lock:
+                self.migrations_succeeded += 1
+                self.total_data_migrated_mb += job.size_mb
             
             return True, "Migration completed successfully"
-            
+        
         except Exception as e:
             error_msg = f"Unexpected error during migration: {str(e)}"
             print(f"\n✗ [MIGRATION FAILED] {error_msg}\n")
-            self.migrations_failed += 1
+            self._record_failure(job)
             return False, error_msg
+        finally:
+            self._release_route_slot(job)
+    
+    def _act_on_source(self, job: MigrationJob):
+        """Delete, keep or leave for the bulk delete the source of a finished job."""
+        file_key = job.file_key
+        if job.source_action == 'defer':
+            print(f"\n[STEP 5/5] Source deletion deferred to the batch bulk delete")
+        elif job.source_action == 'now':
+            print(f"\n[STEP 5/5] Removing '{file_key}' from {self.source_cloud}...")
+            delete_success = self.source_manager.delete_file(file_key)
+            
+            if delete_success:
+                print(f"✓ Source file deleted successfully")
+            else:
+                print(f"⚠️  Warning: Could not delete source file (migration still successful)")
+        else:
+            print(f"\n[STEP 5/5] Keeping copy on {self.source_cloud} (delete_source=False)")
+    
+    @staticmethod
+    def _release_route_slot(job: MigrationJob):
+        """Give back the route slot a job took in _fetch(), if it still holds one."""
+        if job.route_slot is not None:
+            job.route_slot.release()
+            job.route_slot = None
+    
+    def _count_attempt(self, job: MigrationJob):
+        """Count a job in migrations_attempted, once."""
+        if not job.attempted:
+            job.attempted = True
+            with self._stats_lock:
+                self.migrations_attempted += 1
+    
+    def _record_failure(self, job: MigrationJob):
+        self._count_attempt(job)
+        with self._stats_lock:
+            self.migrations_failed += 1
+    
+    def _already_migrated(self, file_key: str, source_meta: Optional[Dict]) -> bool:
+        """Check whether the journal has a finished migration of the source's current version."""
+        if self.journal is None:
+            return False
+        source_etag = self.journal.completed_etag(self.route, file_key)
+        if source_etag is None:
+            return False
+        # Gone from the source means the earlier run also deleted it
+        return source_meta is None or source_meta['etag'] == source_etag
+    
+    def _transfer_with_checkpoint(self, file_key: str, source_etag: str,
+                                  transfer: Callable[[Optional[UploadCheckpoint]], Optional[TransferResult]]
+                                  ) -> Optional[TransferResult]:
+        """
+        Run a transfer with the journal's checkpoint for the object, resuming its open upload.
+        
+        Args:
+            file_key: The key/path of the file
+            source_etag: ETag of the source version being copied
+            transfer: Copies the object, given the checkpoint (None without a journal)
+        
+        Returns:
+            The transfer's result, or None on failure
+        """
+        if self.journal is None:
+            return transfer(None)
+        
+        checkpoint = self.journal.get_checkpoint(self.route, file_key)
+        if checkpoint is not None and checkpoint.source_etag != source_etag:
+            # Parts of an older version of the object are no use
+            self._discard_upload(file_key, checkpoint)
+            checkpoint = None
+        
+        if checkpoint is not None:
+            print(f"⏩ Resuming upload: {len(checkpoint.parts)} part(s) already on {self.destination_cloud}")
+            result = transfer(checkpoint)
+            if result is None:
+                # E.g. the upload expired on the provider; start over once
+                print(f"⚠️  Could not resume the upload; starting over")
+                self._discard_upload(file_key, checkpoint)
+                checkpoint = self.journal.new_checkpoint(self.route, file_key, source_etag)
+                result = transfer(checkpoint)
+                if result is None and checkpoint.is_resumable:
+                    # Resuming already failed once for this object, so do not leave
+                    # the fresh upload behind for the next run to try again
+                    self._discard_upload(file_key, checkpoint)
+        else:
+            result = transfer(self.journal.new_checkpoint(self.route, file_key, source_etag))
+        
+        if result is not None:
+            # The upload is complete; only verification is left
+            self.journal.forget_upload(self.route, file_key)
+        return result
+    
+    def _discard_upload(self, file_key: str, checkpoint: UploadCheckpoint):
+        """Abort a journaled multipart upload on the destination and drop it from the journal."""
+        self.destination_manager.abort_upload(file_key, checkpoint.upload_id)
+        self.journal.forget_upload(self.route, file_key)
+    
+    def _journal_completed(self, file_key: str, source_etag: str, destination_etag: Optional[str]):
+        if self.journal is not None:
+            self.journal.mark_completed(self.route, file_key, source_etag, destination_etag)
+    
+    def _copy_through_client(self, job: MigrationJob) -> MigrationJob:
+        """
+        Upload an object through this host: a buffered one with a single PUT,
+        a larger one by streaming it from the source into a multipart upload.
+        
+        Streamed data is never held whole: memory is bounded by the part size
+        times the upload workers, and the bytes are uploaded exactly as read.
+        
+        Args:
+            job: Job from the hash stage
+        
+        Returns:
+            The job, with the transfer result or a failed outcome
+        """
+        file_key = job.file_key
+        source_meta = job.source_meta
+        if job.buffered is not None:
+            print(f"\n[STEP 3/5] Uploading '{file_key}' to {self.destination_cloud}...")
+            job.result = self.destination_manager.upload_buffered(job.buffered, tier=source_meta['storage_class'])
+            # The verify stage only needs the hashes
+            job.buffered = None
+        else:
+            # Steps 2-3: Stream to destination, hashing the source bytes on the way through
+            print(f"\n[STEP 2-3/5] Streaming '{file_key}' to {self.destination_cloud}...")
+            job.result = self._transfer_with_checkpoint(
+                file_key, source_meta['etag'],
+                lambda checkpoint: self.destination_manager.stream_from(
+                    self.source_manager, file_key,
+                    tier=source_meta['storage_class'],
+                    checkpoint=checkpoint
+                )
+            )
+        
+        result = job.result
+        if result is None:
+            error_msg = f"Upload to {self.destination_cloud} failed"
+            print(f"✗ [ERROR] {error_msg}")
+            job.outcome = (False, error_msg)
+            return job
+        
+        print(f"✓ Streamed in {result.parts} part(s), {result.seconds:.2f} s "
+              f"({result.throughput_mb_s:.1f} MB/s)")
+        if result.md5:
+            print(f"✓ Source MD5: {result.md5}")
+        if result.checksum:
+            print(f"✓ Provider-verified checksum: {result.checksum}")
+        return job
+    
+    def _verify_streamed(self, job: MigrationJob) -> bool:
+        """
+        Verify an object copied through this host.
+        
+        Verification needs no second download: the provider checks every
+        request body against a SHA256 checksum (STREAM_CHECKSUM_ALGORITHM)
+        sent with it, and the ETag it reports must match the one computed from the
+        bytes read. The destination is only re-read in paranoid mode, or if
+        its ETag is not MD5-based (e.g. SSE-KMS encryption).
+        
+        Args:
+            job: Job from the upload stage
+        
+        Returns:
+            True if verified; otherwise the job's outcome is set to the failure
+        """
+        file_key = job.file_key
+        result = job.result
+        print(f"\n[STEP 4/5] Verifying data integrity on {self.destination_cloud}...")
+        if not self.paranoid_verify and result.expected_etag and result.etag == result.expected_etag:
+            print(f"✓ Destination ETag {result.etag} matches the streamed bytes. Data integrity verified.")
+            return True
+        
+        if not self.paranoid_verify:
+            print(f"⚠️  Destination ETag {result.etag} is not comparable; re-reading the copy")
+        # A resumed upload did not see the whole source stream, so hash the source too
+        source_checksum = result.md5 or self._calculate_stream_checksum(self.source_manager, file_key)
+        destination_checksum = self._calculate_stream_checksum(self.destination_manager, file_key)
+        if self._checksums_unreadable(job, source_checksum, destination_checksum):
+            return False
+        print(f"✓ Destination MD5: {destination_checksum}")
+        
+        # Compare checksums
+        if source_checksum != destination_checksum:
+            job.outcome = (False, self._report_checksum_mismatch(source_checksum, destination_checksum))
+            return False
+        
+        print(f"✓ Checksums match! Data integrity verified.")
+        return True
+    
+    def _copy_server_side(self, job: MigrationJob) -> MigrationJob:
+        """
+        Copy an object with copy_object/upload_part_copy so its data never leaves the provider.
+        
+        Args:
+            job: Job from the hash stage
+        
+        Returns:
+            The job, with the transfer result or a failed outcome
+        """
+        file_key = job.file_key
+        source_meta = job.source_meta
+        
+        # Steps 2-3: Server-side copy, pinned to the inspected version of the object
+        print(f"\n[STEP 2-3/5] Copying '{file_key}' server-side to {self.destination_cloud}...")
+        job.result = self._transfer_with_checkpoint(
+            file_key, source_meta['etag'],
+            lambda checkpoint: self.destination_manager.copy_from(
+                self.source_manager, file_key,
+                tier=source_meta['storage_class'],
+                size=source_meta['size'],
+                etag=source_meta['etag'],
+                checkpoint=checkpoint
+            )
+        )
+        
+        if job.result is None:
+            error_msg = f"Server-side copy to {self.destination_cloud} failed"
+            print(f"✗ [ERROR] {error_msg}")
+            job.outcome = (False, error_msg)
+            return job
+        
+        print(f"✓ Copied in {job.result.parts} part(s), {job.result.seconds:.2f} s (no data through this host)")
+        return job
+    
+    def _verify_server_side(self, job: MigrationJob) -> bool:
+        """
+        Verify a server-side copy.
+        
+        Single-part copies are verified by comparing the MD5 ETags of both
+        sides. Multipart ETags depend on part boundaries, so for those the
+        copy is trusted to the provider, which pinned every part to the
+        source ETag; the check then confirms the destination is the object
+        created, at the source's size. Paranoid mode hashes both sides in full.
+        
+        Args:
+            job: Job from the upload stage
+        
+        Returns:
+            True if verified; otherwise the job's outcome is set to the failure
+        """
+        file_key = job.file_key
+        source_meta = job.source_meta
+        result = job.result
+        print(f"\n[STEP 4/5] Verifying data integrity on {self.destination_cloud}...")
+        if self.paranoid_verify:
+            source_checksum = self._calculate_stream_checksum(self.source_manager, file_key)
+            destination_checksum = self._calculate_stream_checksum(self.destination_manager, file_key)
+            if self._checksums_unreadable(job, source_checksum, destination_checksum):
+                return False
+        elif self._is_plain_md5(source_meta['etag']) and self._is_plain_md5(result.etag):
+            # Single-part ETags are the MD5 of the content
+            source_checksum, destination_checksum = source_meta['etag'], result.etag
+        else:
+            destination_meta = self.destination_manager.get_file_metadata(file_key) or {}
+            source_checksum = f"{result.etag} ({source_meta['size']} bytes)"
+            destination_checksum = f"{destination_meta.get('etag')} ({destination_meta.get('size')} bytes)"
+        print(f"✓ Destination checksum: {destination_checksum}")
+        
+        if source_checksum != destination_checksum:
+            job.outcome = (False, self._report_checksum_mismatch(source_checksum, destination_checksum))
+            return False
+        
+        print(f"✓ Checksums match! Data integrity verified.")
+        return True
+    
+    def _report_checksum_mismatch(self, source_checksum: str, destination_checksum: str) -> str:
+        """Print a checksum mismatch banner and return the error message."""
+        error_msg = f"CHECKSUM MISMATCH! Source: {source_checksum}, Dest: {destination_checksum}"
+        print(f"\n{'!'*70}")
+        print(f"✗ [MIGRATION FAILED] {error_msg}")
+        print(f"   Data integrity compromised. Aborting migration.")
+        print(f"   Original file remains on {self.source_cloud}.")
+        print(f"{'!'*70}\n")
+        return error_msg
+    
+    @staticmethod
+    def _is_plain_md5(etag: Optional[str]) -> bool:
+        """Check whether an ETag is a plain MD5 digest (not a multipart ETag)."""
+        return bool(etag) and len(etag) == 32 and '-' not in etag
+    
+    def _calculate_stream_checksum(self, manager: S3Manager, file_key: str) -> Optional[str]:
+        """
+        Calculate the MD5 of an object while streaming it, without holding it in memory.
+        
+        Args:
+            manager: S3Manager holding the object
+            file_key: The key/path of the file
+        
+        Returns:
+            MD5 hex digest string, or None if the object could not be read in full
+        """
+        digest = hashlib.md5()
+        try:
+            for chunk in manager.iter_file_content(file_key):
+                digest.update(chunk)
+        except (ClientError, BotoCoreError, IOError) as e:
+            print(f"✗ Error reading '{file_key}' on {manager.get_cloud_name()} to verify it: {e}")
+            return None
+        return digest.hexdigest()
+    
+    def _checksums_unreadable(self, job: MigrationJob, *checksums: Optional[str]) -> bool:
+        """Fail the job if a side could not be read back for verification."""
+        if None not in checksums:
+            return False
+        error_msg = "Could not read the object back to verify the copy"
+        print(f"✗ [ERROR] {error_msg}")
+        job.outcome = (False, error_msg)
+        return True
     
     def migrate_batch(self, file_keys: list, verify_integrity: bool = True, 
-                      delete_source: bool = True) -> dict:
+                      delete_source: bool = True, max_workers: int = MIGRATION_MAX_WORKERS,
+                      queue_size: int = MIGRATION_QUEUE_SIZE) -> dict:
         """
-        Migrate multiple objects in batch.
+        Migrate multiple objects in batch, as a pipeline of stages.
+        
+        Each stage (fetch, hash, upload, verify) has its own workers and a
+        bounded queue in front of it, so reads of the next objects overlap
+        with uploads of earlier ones while memory stays bounded. Objects in
+        flight across all stages are also capped by the route's limit.
         
         Args:
             file_keys: List of file keys to migrate
             verify_integrity: Whether to perform checksum verification
             delete_source: Whether to delete from source after migration
+            max_workers: Workers of each network stage (fetch, upload, verify)
+            queue_size: Objects each stage may have waiting in front of it
         
         Returns:
-            Dictionary with migration statistics
+            Dictionary with migration statistics; 'files' holds one result per
+            key, in the order of file_keys, and 'stages' the load of each stage
         """
         print(f"\n{'#'*70}")
-        print(f"# BATCH MIGRATION: {len(file_keys)} files")
+        print(f"# BATCH MIGRATION: {len(file_keys)} files ({max_workers} workers per network stage)")
         print(f"# {self.source_cloud} → {self.destination_cloud}")
         print(f"{'#'*70}\n")
         
+        if self.journal is not None:
+            finished = self.journal.completed_keys(self.route, file_keys)
+            if finished:
+                print(f"⏩ {len(finished)} file(s) already migrated per the journal; "
+                      f"skipping those whose source is unchanged\n")
+        
+        # Sources are deleted in bulk once every migration has been verified
+        source_action = 'defer' if delete_source else 'keep'
+        max_workers = max(max_workers, 1)
+        stage_workers = {'fetch': max_workers, 'hash': MIGRATION_HASH_WORKERS,
+                         'upload': max_workers, 'verify': max_workers}
+        self.pipeline = StagePipeline(
+            [(name, lambda job, stage=stage: self._run_stage(stage, job), stage_workers[name])
+             for name, stage in self._stages()],
+            queue_size=queue_size,
+            is_finished=lambda job: job.outcome is not None,
+            # Jobs stranded by an early stop must not keep their route's slots
+            discard=self._release_route_slot
+        )
+        jobs = (MigrationJob(file_key, verify_integrity, source_action) for file_key in dict.fromkeys(file_keys))
+        outcomes: Dict[str, Tuple[bool, str, bool]] = {}
+        # Closing stops the pipeline even if this loop is left by an exception
+        with contextlib.closing(self.pipeline.run(jobs)) as finished_jobs:
+            for job in finished_jobs:
+                outcomes[job.file_key] = (*self._finish(job), job.skipped)
+        
+        files: List[Dict] = [{'file': file_key, 'success': outcomes[file_key][0],
+                              'message': outcomes[file_key][1], 'skipped': outcomes[file_key][2]}
+                             for file_key in file_keys]
         results = {
             'total': len(file_keys),
-            'succeeded': 0,
-            'failed': 0,
-            'errors': []
+            'succeeded': sum(result['success'] and not result['skipped'] for result in files),
+            'skipped': sum(result['skipped'] for result in files),
+            'failed': sum(not result['success'] for result in files),
+            'files': files,
+            'errors': [{'file': result['file'], 'error': result['message']}
+                       for result in files if not result['success']],
+            'delete_errors': [],
+            'stages': self.pipeline.get_statistics(),
+            'seconds': self.pipeline.elapsed
         }
+        # Skipped files were migrated by an earlier run, so their sources go too
+        migrated_keys = list(dict.fromkeys(result['file'] for result in files if result['success']))
         
-        for file_key in file_keys:
-            success, message = self.migrate_object(file_key, verify_integrity, delete_source)
-            
-            if success:
-                results['succeeded'] += 1
+        if delete_source and migrated_keys:
+            print(f"🗑️  Deleting {len(migrated_keys)} verified source file(s) from {self.source_cloud}...")
+            delete_errors = self.source_manager.delete_files(migrated_keys)
+            results['delete_errors'] = [{'file': key, 'error': error}
+                                        for key, error in delete_errors.items()]
+            if delete_errors:
+                print(f"⚠️  Warning: {len(delete_errors)} source file(s) could not be deleted "
+                      f"(migrations still successful)")
             else:
-                results['failed'] += 1
-                results['errors'].append({'file': file_key, 'error': message})
-            
-            time.sleep(0.2)  # Brief pause between migrations
+                print(f"✓ Source files deleted successfully")
         
         # Print batch summary
         print(f"\n{'#'*70}")
@@ -206,12 +746,36 @@ class MigrationManager:
         print(f"{'#'*70}")
         print(f"  Total files: {results['total']}")
         print(f"  ✓ Succeeded: {results['succeeded']}")
+        if results['skipped']:
+            print(f"  ⏩ Skipped:   {results['skipped']} (already migrated)")
         print(f"  ✗ Failed:    {results['failed']}")
+        if delete_source:
+            print(f"  🗑️  Sources deleted: {len(migrated_keys) - len(results['delete_errors'])}")
         print(f"  Data migrated: {self.total_data_migrated_mb:.2f} MB")
+        self.print_stage_statistics(results['stages'], results['seconds'])
         print(f"{'#'*70}\n")
         
         return results
     
+    @staticmethod
+    def print_stage_statistics(stages: Dict[str, Dict], seconds: float):
+        """
+        Print the load of each batch stage and the likely bottleneck.
+        
+        Args:
+            stages: Per-stage statistics, as in migrate_batch()'s 'stages'
+            seconds: Duration of the batch
+        """
+        if not stages:
+            return
+        print(f"  📊 Pipeline stages ({seconds:.2f} s):")
+        for name, stage in stages.items():
+            print(f"     {name:<7} {stage['workers']:>3} worker(s)  {stage['items']:>6} item(s)  "
+                  f"{stage['utilization'] * 100:5.1f}% busy  "
+                  f"queue avg {stage['mean_queue_depth']:.1f} / max {stage['max_queue_depth']}")
+        bottleneck = max(stages, key=lambda name: stages[name]['utilization'])
+        print(f"     Bottleneck: {bottleneck}")
+    
     def get_statistics(self) -> dict:
         """
         Get migration statistics.
@@ -224,11 +788,13 @@ class MigrationManager:
         return {
             'total_attempted': self.migrations_attempted,
             'total_succeeded': self.migrations_succeeded,
+            'total_skipped': self.migrations_skipped,
             'total_failed': self.migrations_failed,
             'success_rate': success_rate,
             'data_migrated_mb': self.total_data_migrated_mb,
             'source_cloud': self.source_cloud,
-            'destination_cloud': self.destination_cloud
+            'destination_cloud': self.destination_cloud,
+            'stages': self.pipeline.get_statistics() if self.pipeline is not None else {}
         }
     
     def print_statistics(self):
@@ -241,6 +807,8 @@ class MigrationManager:
         print(f"Route: {stats['source_cloud']} → {stats['destination_cloud']}")
         print(f"Total Migrations Attempted: {stats['total_attempted']}")
         print(f"✓ Successful: {stats['total_succeeded']}")
+        if stats['total_skipped']:
+            print(f"⏩ Skipped (already migrated): {stats['total_skipped']}")
         print(f"✗ Failed: {stats['total_failed']}")
         print(f"Success Rate: {stats['success_rate']:.1f}%")
         print(f"Total Data Migrated: {stats['data_migrated_mb']:.2f} MB")
@@ -9,6 +9,7 @@ from typing import Dict
 from kafka import KafkaProducer, KafkaConsumer
 from kafka.errors import KafkaError, NoBrokersAvailable
 from cloud_utils import S3Manager
+from metadata_store import DEFAULT_METADATA_PATH, MetadataStore, open_metadata_store
 
 
 KAFKA_TOPIC = 'data-events'
@@ -76,14 +77,14 @@ def produce_new_file_event(filename: str, size_gb: float = 1.0, max_retries: int
     return False
 
 
-def start_event_consumer(s3_manager: S3Manager, metadata_path: str = "metadata.json"):
+def start_event_consumer(s3_manager: S3Manager, metadata_path: str = DEFAULT_METADATA_PATH):
     """
     Start consuming events from Kafka and process them.
     This function runs indefinitely until interrupted.
     
     Args:
         s3_manager: S3Manager instance for cloud operations
-        metadata_path: Path to metadata JSON file
+        metadata_path: Path to the metadata store
     """
     print("\n" + "="*70)
     print("🎧 KAFKA EVENT CONSUMER STARTING")
@@ -92,6 +93,8 @@ def start_event_consumer(s3_manager: S3Manager, metadata_path: str = "metadata.j
     print(f"🔌 Kafka brokers: {KAFKA_BOOTSTRAP_SERVERS}")
     print(f"⏸️  Press Ctrl+C to stop\n")
     
+    metadata_store = open_metadata_store(metadata_path)
+    
     try:
         # Create consumer
         consumer = KafkaConsumer(
@@ -126,7 +129,7 @@ def start_event_consumer(s3_manager: S3Manager, metadata_path: str = "metadata.j
                         print(f"   ✓ Ingested '{filename}' to HOT storage (S3 STANDARD)")
                         
                         # Update metadata
-                        _update_metadata(filename, metadata_path)
+                        _update_metadata(filename, metadata_store)
                         print(f"   ✓ Updated metadata for '{filename}'")
                     else:
                         print(f"   ✗ Failed to ingest '{filename}'")
@@ -152,31 +155,26 @@ def start_event_consumer(s3_manager: S3Manager, metadata_path: str = "metadata.j
             consumer.close()
         except:
             pass
+        metadata_store.close()
 
 
-def _update_metadata(filename: str, metadata_path: str):
+def _update_metadata(filename: str, metadata_store: MetadataStore):
     """
-    Update metadata file with new file information.
+    Record a newly ingested file in the metadata store.
+    
+    A re-upload of a known file keeps its entry, so its access history
+    (and decayed score) still decides its tier.
     
     Args:
         filename: Name of the file
-        metadata_path: Path to metadata JSON file
+        metadata_store: Store to write the new entry to
     """
-    try:
-        with open(metadata_path, 'r') as f:
-            metadata = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        metadata = {}
-    
-    # Add new file entry
-    metadata[filename] = {
+    now = datetime.now().isoformat()
+    metadata_store.insert_missing({filename: {
         'access_count': 0,
-        'created_timestamp': datetime.now().isoformat(),
-        'last_accessed_timestamp': datetime.now().isoformat()
-    }
-    
-    with open(metadata_path, 'w') as f:
-        json.dump(metadata, f, indent=2, default=str)
+        'created_timestamp': now,
+        'last_accessed_timestamp': now
+    }})
 
 
 def check_kafka_connection() -> bool:
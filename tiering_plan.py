@@ -0,0 +1,258 @@
+"""
+Tiering Plans
+Serializable record of the tier changes a run intends to make.
+
+Planning only reads the bucket listing and the metadata store, so a plan can
+be built as a dry run, saved, reviewed, and applied later. Applying a plan
+appends every finished key to a progress journal next to the plan file, so
+an interrupted run resumes where it stopped instead of starting over.
+"""
+import json
+import os
+import tempfile
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+PLAN_FORMAT_VERSION = 1
+
+GB = 1024 ** 3
+
+# Monthly storage price per GB by storage class (AWS us-east-1 list prices),
+# used to estimate what each transition saves
+STORAGE_CLASS_COST_PER_GB = {
+    'STANDARD': 0.023,
+    'STANDARD_IA': 0.0125,
+    'GLACIER': 0.004,
+    'DEEP_ARCHIVE': 0.00099
+}
+
+# Field order of a serialized transition
+PLAN_COLUMNS = ('key', 'source_tier', 'target_tier', 'size', 'estimated_monthly_savings')
+
+
+def estimate_monthly_savings(size: Optional[int], source_tier: str, target_tier: str) -> float:
+    """
+    Estimate the monthly storage cost saved by moving an object.
+
+    Args:
+        size: Object size in bytes (None counts as 0)
+        source_tier: Current storage class
+        target_tier: Target storage class
+
+    Returns:
+        Savings in dollars per month (negative when moving to a pricier class)
+    """
+    source_cost = STORAGE_CLASS_COST_PER_GB.get(source_tier, 0.0)
+    target_cost = STORAGE_CLASS_COST_PER_GB.get(target_tier, 0.0)
+    return (size or 0) / GB * (source_cost - target_cost)
+
+
+@dataclass
+class PlannedTransition:
+    """A single tier change in a plan."""
+    key: str
+    source_tier: str
+    target_tier: str
+    size: Optional[int] = None
+    estimated_monthly_savings: float = 0.0
+
+
+@dataclass
+class TieringPlan:
+    """
+    The tier changes decided by one planning pass over a bucket.
+
+    Only objects that need to move are listed; files_analyzed records how
+    many objects the plan was computed from.
+    """
+    cloud: str
+    bucket: str
+    transitions: List[PlannedTransition] = field(default_factory=list)
+    files_analyzed: int = 0
+    created_at: datetime = field(default_factory=datetime.now)
+    plan_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+
+    def __len__(self) -> int:
+        return len(self.transitions)
+
+    def __iter__(self) -> Iterator[PlannedTransition]:
+        return iter(self.transitions)
+
+    @property
+    def total_bytes(self) -> int:
+        """Total size of the objects the plan moves."""
+        return sum(transition.size or 0 for transition in self.transitions)
+
+    @property
+    def estimated_monthly_savings(self) -> float:
+        """Estimated monthly storage savings once the whole plan is applied."""
+        return sum(transition.estimated_monthly_savings for transition in self.transitions)
+
+    def savings_of(self, keys: Set[str]) -> float:
+        """
+        Estimated monthly storage savings of the transitions of some keys.
+
+        Args:
+            keys: Keys of the transitions to count, e.g. the completed ones
+
+        Returns:
+            Savings in dollars per month
+        """
+        return sum(transition.estimated_monthly_savings for transition in self.transitions
+                   if transition.key in keys)
+
+    def routes(self) -> Dict[Tuple[str, str], int]:
+        """
+        Count transitions by route.
+
+        Returns:
+            {(source storage class, target storage class): number of files}
+        """
+        routes: Dict[Tuple[str, str], int] = {}
+        for transition in self.transitions:
+            route = (transition.source_tier, transition.target_tier)
+            routes[route] = routes.get(route, 0) + 1
+        return routes
+
+    def to_dict(self) -> Dict:
+        """Convert to a JSON-serializable dict, one compact row per transition."""
+        return {
+            'version': PLAN_FORMAT_VERSION,
+            'plan_id': self.plan_id,
+            'created_at': self.created_at.isoformat(),
+            'cloud': self.cloud,
+            'bucket': self.bucket,
+            'files_analyzed': self.files_analyzed,
+            'columns': list(PLAN_COLUMNS),
+            'transitions': [
+                [t.key, t.source_tier, t.target_tier, t.size, round(t.estimated_monthly_savings, 6)]
+                for t in self.transitions
+            ]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'TieringPlan':
+        """
+        Rebuild a plan from to_dict() output.
+
+        Raises:
+            ValueError: If the plan was written by an unsupported format version
+        """
+        if data.get('version') != PLAN_FORMAT_VERSION:
+            raise ValueError(f"Unsupported tiering plan version: {data.get('version')}")
+        columns = data.get('columns', list(PLAN_COLUMNS))
+        transitions = [PlannedTransition(**dict(zip(columns, row))) for row in data['transitions']]
+        return cls(
+            cloud=data['cloud'],
+            bucket=data['bucket'],
+            transitions=transitions,
+            files_analyzed=data.get('files_analyzed', 0),
+            created_at=datetime.fromisoformat(data['created_at']),
+            plan_id=data['plan_id']
+        )
+
+    def save(self, path: str):
+        """
+        Write the plan to a JSON file, atomically.
+
+        Args:
+            path: Destination path
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.plan-', suffix='.json')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self.to_dict(), f, separators=(',', ':'))
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> 'TieringPlan':
+        """
+        Read a plan written by save().
+
+        Args:
+            path: Path to the plan file
+
+        Returns:
+            The loaded plan
+        """
+        with open(path, 'r') as f:
+            return cls.from_dict(json.load(f))
+
+
+class PlanProgress:
+    """
+    Append-only journal of the transitions of a plan that have finished.
+
+    The first line holds the plan id, so a journal left over from a different
+    plan saved at the same path is discarded rather than trusted. Each later
+    line is a tab-separated status and key, written as soon as the result is
+    known.
+    """
+
+    def __init__(self, plan: TieringPlan, path: str):
+        """
+        Open the journal for a plan, keeping earlier progress of the same plan.
+
+        Args:
+            plan: The plan being applied
+            path: Path to the journal file
+        """
+        self.path = path
+        self.completed: Set[str] = set()
+        self.failed: Dict[str, str] = {}
+
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                lines = f.read().splitlines()
+            if lines and lines[0] == plan.plan_id:
+                for line in lines[1:]:
+                    status, _, rest = line.partition('\t')
+                    key, _, error = rest.partition('\t')
+                    if status == 'ok':
+                        self.completed.add(key)
+                        self.failed.pop(key, None)
+                    elif status == 'failed':
+                        self.failed[key] = error
+            else:
+                os.remove(path)
+
+        self._file = open(path, 'a')
+        if self._file.tell() == 0:
+            self._file.write(plan.plan_id + '\n')
+            self._file.flush()
+
+    def record(self, file_key: str, error: Optional[str] = None):
+        """
+        Record the result of one transition.
+
+        Args:
+            file_key: Key that was transitioned
+            error: None on success, otherwise the error message
+        """
+        if error is None:
+            self.completed.add(file_key)
+            self.failed.pop(file_key, None)
+            self._file.write(f"ok\t{file_key}\n")
+        else:
+            self.failed[file_key] = error
+            # Keep each record on one line
+            self._file.write(f"failed\t{file_key}\t{' '.join(error.split())}\n")
+        self._file.flush()
+
+    def remaining(self, plan: TieringPlan) -> List[PlannedTransition]:
+        """Get the transitions of the plan that have not completed yet."""
+        return [transition for transition in plan if transition.key not in self.completed]
+
+    def close(self):
+        self._file.close()
+
+
+def progress_path_for(plan_path: str) -> str:
+    """Get the default progress journal path for a plan file."""
+    return plan_path + '.progress'
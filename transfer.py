@@ -0,0 +1,1114 @@
+"""
+Parallel transfer helpers for large objects.
+Implements multipart uploads, ranged downloads and server-side multipart
+copies on top of a boto3 S3 client, with bounded memory and throughput reporting.
+"""
+import base64
+import hashlib
+import io
+import os
+import queue
+import threading
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+
+MB = 1024 * 1024
+
+# Objects at or above this size are sent as multipart uploads
+MULTIPART_THRESHOLD = 64 * MB
+
+# Default part size; memory use is bounded by part size times workers
+MULTIPART_CHUNKSIZE = 16 * MB
+
+# S3 limits: every part but the last must be at least 5 MB, at most 10,000 parts
+MIN_PART_SIZE = 5 * MB
+MAX_PARTS = 10000
+
+# Default number of parts transferred at the same time
+MAX_TRANSFER_WORKERS = 8
+
+# Size of the reads used to copy a response body into its destination
+READ_CHUNK_SIZE = 1 * MB
+
+# Streaming copies between providers: every object of at least one part is
+# sent as a multipart upload, so at most part size times workers is buffered
+STREAM_PART_SIZE = 8 * MB
+STREAM_MAX_WORKERS = 4
+
+# Server-side copies: single copy_object below the threshold (S3 rejects
+# copy_object above 5 GB), parallel upload_part_copy at or above it
+MULTIPART_COPY_THRESHOLD = 64 * MB
+COPY_PART_SIZE = 64 * MB
+COPY_OBJECT_MAX_SIZE = 5 * 1024 * MB
+
+# Checksum fields S3 may report for an object or part, by algorithm
+CHECKSUM_FIELDS = {
+    'CRC32': 'ChecksumCRC32',
+    'CRC32C': 'ChecksumCRC32C',
+    'SHA1': 'ChecksumSHA1',
+    'SHA256': 'ChecksumSHA256'
+}
+
+# Checksums computed here for upload requests, by algorithm. Sending the
+# value as a header lets the provider reject a corrupted body; CRC32C is left
+# out because it needs a non-standard-library implementation, so uploads
+# through this host reject it (server-side copies can still keep it).
+CHECKSUM_FUNCTIONS = {
+    'CRC32': lambda data: zlib.crc32(data).to_bytes(4, 'big'),
+    'SHA1': lambda data: hashlib.sha1(data).digest(),
+    'SHA256': lambda data: hashlib.sha256(data).digest()
+}
+
+# Checksum the provider verifies on every streamed upload request
+STREAM_CHECKSUM_ALGORITHM = 'SHA256'
+
+# Anything upload_object() accepts: raw bytes, a file path, or a binary stream
+UploadSource = Union[bytes, bytearray, memoryview, str, os.PathLike, BinaryIO]
+
+
+@dataclass
+class TransferResult:
+    """Outcome of a single object transfer."""
+    key: str
+    bytes_transferred: int
+    seconds: float
+    parts: int = 1
+    etag: Optional[str] = None
+    # Provider checksum of the stored object (ChecksumAlgorithm uploads only)
+    checksum: Optional[str] = None
+    # Streamed copies only: MD5 of the bytes read, and the ETag they should produce
+    md5: Optional[str] = None
+    expected_etag: Optional[str] = None
+
+    @property
+    def throughput_mb_s(self) -> float:
+        """Transfer throughput in MB/s."""
+        if self.seconds <= 0:
+            return 0.0
+        return self.bytes_transferred / MB / self.seconds
+
+
+@dataclass
+class BufferedObject:
+    """A source object small enough to be read whole, with what its copy needs."""
+    key: str
+    data: bytes
+    etag: Optional[str]
+    # Object attributes to copy (ContentType, Metadata, ...) and its storage class
+    attributes: Dict
+    storage_class: str = 'STANDARD'
+    md5: Optional[str] = None
+    checksum: Optional[str] = None
+    checksum_algorithm: Optional[str] = None
+
+    def hash(self, checksum_algorithm: Optional[str] = STREAM_CHECKSUM_ALGORITHM):
+        """
+        Compute the MD5 (the ETag a single PUT gets) and the provider checksum of the data.
+
+        Args:
+            checksum_algorithm: Checksum the provider verifies on upload (None for none)
+
+        Raises:
+            ValueError: If the checksum algorithm is not supported
+        """
+        check_checksum_algorithm(checksum_algorithm)
+        self.md5 = hashlib.md5(self.data).hexdigest()
+        self.checksum_algorithm = checksum_algorithm
+        self.checksum = compute_checksum(self.data, checksum_algorithm) if checksum_algorithm else None
+
+
+class StreamDigest:
+    """
+    Hashes data as it streams past, both whole and per upload part.
+
+    S3 ETags are the MD5 of the content for single PUTs and the MD5 of the
+    concatenated part MD5s plus a part count for multipart uploads, so with
+    the part size used for the upload the expected ETag is known without
+    reading the object again.
+
+    A digest resumed after earlier parts starts from their MD5s; it still
+    knows the ETag but no longer the MD5 of the whole object.
+    """
+
+    def __init__(self, part_size: int, earlier_part_digests: Optional[List[bytes]] = None):
+        self.part_size = part_size
+        self._whole = hashlib.md5() if not earlier_part_digests else None
+        self._part = hashlib.md5()
+        self._part_fill = 0
+        self._part_digests: List[bytes] = list(earlier_part_digests or [])
+
+    def update(self, data: bytes):
+        view = memoryview(data)
+        if self._whole is not None:
+            self._whole.update(view)
+        while view:
+            take = min(len(view), self.part_size - self._part_fill)
+            self._part.update(view[:take])
+            self._part_fill += take
+            view = view[take:]
+            if self._part_fill == self.part_size:
+                self._part_digests.append(self._part.digest())
+                self._part = hashlib.md5()
+                self._part_fill = 0
+
+    def hexdigest(self) -> Optional[str]:
+        """MD5 of everything hashed so far (None for a resumed digest)."""
+        return self._whole.hexdigest() if self._whole is not None else None
+
+    def etag(self, multipart: bool) -> Optional[str]:
+        """
+        Get the ETag S3 gives the hashed bytes.
+
+        Args:
+            multipart: Whether they were sent as a multipart upload
+
+        Returns:
+            ETag without quotes (None if unknown)
+        """
+        if not multipart:
+            return self.hexdigest()
+        digests = self._part_digests + ([self._part.digest()] if self._part_fill else [])
+        return f"{hashlib.md5(b''.join(digests)).hexdigest()}-{len(digests)}"
+
+
+class UploadCheckpoint:
+    """
+    Progress of one multipart upload, so an interrupted upload can carry on
+    with the parts it has not finished instead of starting over.
+
+    This base class keeps the progress in memory only; subclasses persist
+    it by overriding started() and part_done(), which may be called from
+    upload worker threads, and setting persistent.
+    """
+
+    # Whether the progress outlives this object, so that a later run can
+    # resume a failed upload; failed uploads of other checkpoints are aborted
+    persistent = False
+
+    def __init__(self, upload_id: Optional[str] = None, part_size: Optional[int] = None,
+                 parts: Optional[Dict[int, Dict]] = None, part_md5s: Optional[Dict[int, str]] = None):
+        """
+        Initialize a checkpoint.
+
+        Args:
+            upload_id: Upload to resume, or None to start a new one
+            part_size: Part size the upload was started with
+            parts: Finished parts by part number, as complete_multipart_upload expects them
+            part_md5s: Hex MD5 of each finished part's content, if known
+        """
+        self.upload_id = upload_id
+        self.part_size = part_size
+        self.parts = dict(parts or {})
+        self.part_md5s = dict(part_md5s or {})
+
+    @property
+    def is_resumable(self) -> bool:
+        return self.upload_id is not None
+
+    @property
+    def keeps_failed_upload(self) -> bool:
+        """Whether a failed upload is left open for a later run to resume."""
+        return self.persistent and self.is_resumable
+
+    def started(self, upload_id: str, part_size: int):
+        """Record that a new multipart upload was created."""
+        self.upload_id = upload_id
+        self.part_size = part_size
+        self.parts = {}
+        self.part_md5s = {}
+
+    def part_done(self, part: Dict, md5: Optional[str] = None):
+        """
+        Record a finished part.
+
+        Args:
+            part: Part entry for complete_multipart_upload (PartNumber, ETag, checksum)
+            md5: Hex MD5 of the part's content, if computed
+        """
+        self.parts[part['PartNumber']] = part
+        if md5:
+            self.part_md5s[part['PartNumber']] = md5
+
+    def finished_prefix(self) -> int:
+        """Number of parts finished without a gap from part 1."""
+        count = 0
+        while count + 1 in self.parts:
+            count += 1
+        return count
+
+
+def check_checksum_algorithm(algorithm: Optional[str]):
+    """
+    Check that this host can compute a checksum for upload requests.
+
+    Called before an upload starts, so an unsupported algorithm fails
+    up front rather than on the first part.
+
+    Args:
+        algorithm: Checksum algorithm, or None for none
+
+    Raises:
+        ValueError: If the algorithm is not a key of CHECKSUM_FUNCTIONS
+    """
+    if algorithm is not None and algorithm not in CHECKSUM_FUNCTIONS:
+        raise ValueError(f"Unsupported checksum algorithm for uploads: {algorithm} "
+                         f"(supported: {', '.join(CHECKSUM_FUNCTIONS)})")
+
+
+def compute_checksum(data: bytes, algorithm: str) -> str:
+    """
+    Compute an S3 checksum header value for a request body.
+
+    Args:
+        data: Request body
+        algorithm: Key of CHECKSUM_FUNCTIONS
+
+    Returns:
+        Base64-encoded checksum, as the Checksum* request fields expect
+
+    Raises:
+        ValueError: If the algorithm is not supported
+    """
+    check_checksum_algorithm(algorithm)
+    return base64.b64encode(CHECKSUM_FUNCTIONS[algorithm](data)).decode('ascii')
+
+
+def open_source(source: UploadSource) -> Tuple[BinaryIO, Optional[int], bool]:
+    """
+    Normalize an upload source into a readable binary stream.
+
+    Args:
+        source: bytes-like object, path to a local file, or binary file-like object
+
+    Returns:
+        Tuple of (stream, size in bytes or None if unknown, whether the caller must close it)
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source), len(source), True
+
+    if isinstance(source, (str, os.PathLike)):
+        stream = open(source, 'rb')
+        return stream, os.fstat(stream.fileno()).st_size, True
+
+    size = None
+    try:
+        if source.seekable():
+            position = source.tell()
+            size = source.seek(0, io.SEEK_END) - position
+            source.seek(position)
+    except (AttributeError, OSError):
+        size = None
+    return source, size, False
+
+
+def read_exact(stream: BinaryIO, size: int) -> bytes:
+    """
+    Read up to size bytes, retrying short reads until size bytes or EOF.
+
+    Args:
+        stream: Binary stream to read from
+        size: Number of bytes wanted
+
+    Returns:
+        The bytes read (shorter than size only at end of stream)
+    """
+    data = stream.read(size)
+    if data is None or len(data) >= size or not data:
+        return data or b''
+
+    chunks = [data]
+    remaining = size - len(data)
+    while remaining > 0:
+        chunk = stream.read(remaining)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b''.join(chunks)
+
+
+def choose_part_size(size: Optional[int], part_size: int = MULTIPART_CHUNKSIZE) -> int:
+    """
+    Pick a part size that respects S3's minimum part size and part count limit.
+
+    Args:
+        size: Total object size in bytes, if known
+        part_size: Preferred part size
+
+    Returns:
+        Part size in bytes
+    """
+    part_size = max(part_size, MIN_PART_SIZE)
+    if size is not None:
+        while -(-size // part_size) > MAX_PARTS:
+            part_size *= 2
+    return part_size
+
+
+def multipart_upload(s3_client, bucket: str, key: str, stream: BinaryIO,
+                     part_size: int = MULTIPART_CHUNKSIZE,
+                     max_workers: int = MAX_TRANSFER_WORKERS,
+                     extra_args: Optional[Dict] = None,
+                     checkpoint: Optional[UploadCheckpoint] = None) -> Tuple[int, Optional[str], Optional[str]]:
+    """
+    Upload a stream as a multipart upload, sending parts in parallel.
+
+    Parts are read on the calling thread only when a worker slot is free, so
+    at most max_workers parts are held in memory at any time. The upload is
+    aborted if any part fails, unless a persistent checkpoint records its
+    progress: then it is left open so a later call with the same checkpoint
+    can resume it.
+
+    Args:
+        s3_client: boto3 S3 client
+        bucket: Destination bucket
+        key: Destination key
+        stream: Binary stream positioned at the start of the data
+        part_size: Size of each part in bytes
+        max_workers: Maximum number of parts uploaded at the same time
+        extra_args: Extra create_multipart_upload arguments (e.g. StorageClass,
+            ChecksumAlgorithm to have every part verified by the provider)
+        checkpoint: Progress record to resume from and update; when it holds an
+            upload, the stream must start right after its finished_prefix()
+            parts, which are not sent again
+
+    Returns:
+        Tuple of (number of parts, ETag of the completed object, provider
+        checksum of the completed object or None)
+
+    Raises:
+        ValueError: If extra_args asks for an unsupported ChecksumAlgorithm
+    """
+    extra_args = extra_args or {}
+    check_checksum_algorithm(extra_args.get('ChecksumAlgorithm'))
+    resumed_parts = 0
+    if checkpoint is not None and checkpoint.is_resumable:
+        upload_id = checkpoint.upload_id
+        part_size = checkpoint.part_size
+        resumed_parts = checkpoint.finished_prefix()
+    else:
+        upload_id = s3_client.create_multipart_upload(Bucket=bucket, Key=key, **extra_args)['UploadId']
+        if checkpoint is not None:
+            checkpoint.started(upload_id, part_size)
+    checksum_algorithm = extra_args.get('ChecksumAlgorithm')
+    checksum_field = CHECKSUM_FIELDS.get(checksum_algorithm)
+
+    slots = threading.BoundedSemaphore(max_workers)
+    futures = []
+
+    def _upload_part(part_number: int, data: bytes) -> Dict:
+        request = {
+            'Bucket': bucket,
+            'Key': key,
+            'UploadId': upload_id,
+            'PartNumber': part_number,
+            'Body': data
+        }
+        try:
+            if checksum_algorithm:
+                # Hashed on the worker, in parallel with the other parts; passing the
+                # value also keeps botocore from switching to a chunked trailer body
+                request['ChecksumAlgorithm'] = checksum_algorithm
+                request[checksum_field] = compute_checksum(data, checksum_algorithm)
+            response = s3_client.upload_part(**request)
+            part = {'PartNumber': part_number, 'ETag': response['ETag']}
+            # Uploads created with a ChecksumAlgorithm need each part's checksum to complete
+            if checksum_field:
+                part[checksum_field] = request[checksum_field]
+            if checkpoint is not None:
+                checkpoint.part_done(part, hashlib.md5(data).hexdigest())
+            return part
+        finally:
+            slots.release()
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers,
+                                thread_name_prefix='upload-part') as pool:
+            part_number = resumed_parts
+            while True:
+                slots.acquire()
+                data = read_exact(stream, part_size)
+                if not data and part_number > 0:
+                    slots.release()
+                    break
+
+                part_number += 1
+                futures.append(pool.submit(_upload_part, part_number, data))
+
+                # Stop early instead of reading the rest of a failed upload
+                if any(f.done() and f.exception() for f in futures):
+                    break
+                if len(data) < part_size:
+                    break
+
+        parts: List[Dict] = [checkpoint.parts[number] for number in range(1, resumed_parts + 1)]
+        parts += [f.result() for f in futures]
+        response = s3_client.complete_multipart_upload(
+            Bucket=bucket,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={'Parts': parts}
+        )
+    except BaseException:
+        if checkpoint is None or not checkpoint.keeps_failed_upload:
+            s3_client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+        raise
+
+    return len(parts), response.get('ETag', '').strip('"'), response.get(checksum_field)
+
+
+def upload_stream(s3_client, bucket: str, key: str, stream: BinaryIO,
+                  size: Optional[int] = None,
+                  multipart_threshold: int = MULTIPART_THRESHOLD,
+                  part_size: int = MULTIPART_CHUNKSIZE,
+                  max_workers: int = MAX_TRANSFER_WORKERS,
+                  extra_args: Optional[Dict] = None,
+                  checkpoint: Optional[UploadCheckpoint] = None) -> TransferResult:
+    """
+    Upload a stream with a single PUT, or as a parallel multipart upload
+    once it reaches the multipart threshold.
+
+    Args:
+        s3_client: boto3 S3 client
+        bucket: Destination bucket
+        key: Destination key
+        stream: Binary stream to upload
+        size: Size of the stream in bytes, if known
+        multipart_threshold: Size at which multipart upload is used
+        part_size: Preferred size of each part in bytes
+        max_workers: Maximum number of parts uploaded at the same time
+        extra_args: Extra put_object/create_multipart_upload arguments
+        checkpoint: Records a multipart upload's progress (see multipart_upload())
+
+    Returns:
+        TransferResult with size, duration and throughput
+
+    Raises:
+        ValueError: If extra_args asks for an unsupported ChecksumAlgorithm
+    """
+    extra_args = extra_args or {}
+    check_checksum_algorithm(extra_args.get('ChecksumAlgorithm'))
+    multipart_threshold = max(multipart_threshold, MIN_PART_SIZE)
+    part_size = choose_part_size(size, part_size)
+    start = time.perf_counter()
+
+    # Unknown sizes: read up to the threshold to find out which path to take
+    head = b''
+    if size is None:
+        head = read_exact(stream, multipart_threshold)
+        if len(head) < multipart_threshold:
+            size = len(head)
+
+    if size is not None and size < multipart_threshold:
+        data = head if head or size == 0 else read_exact(stream, size)
+        request = dict(extra_args)
+        if request.get('ChecksumAlgorithm'):
+            request[CHECKSUM_FIELDS[request.pop('ChecksumAlgorithm')]] = compute_checksum(
+                data, extra_args['ChecksumAlgorithm'])
+        response = s3_client.put_object(Bucket=bucket, Key=key, Body=data, **request)
+        return TransferResult(
+            key=key,
+            bytes_transferred=len(data),
+            seconds=time.perf_counter() - start,
+            etag=response.get('ETag', '').strip('"'),
+            checksum=response.get(CHECKSUM_FIELDS.get(extra_args.get('ChecksumAlgorithm')))
+        )
+
+    reader = _CountingReader(stream, prefix=head)
+    parts, etag, checksum = multipart_upload(
+        s3_client, bucket, key, reader,
+        part_size=part_size,
+        max_workers=max_workers,
+        extra_args=extra_args,
+        checkpoint=checkpoint
+    )
+    return TransferResult(
+        key=key,
+        bytes_transferred=reader.bytes_read,
+        seconds=time.perf_counter() - start,
+        parts=parts,
+        etag=etag,
+        checksum=checksum
+    )
+
+
+def multipart_copy(s3_client, source_bucket: str, source_key: str, bucket: str, key: str,
+                   size: int, part_size: int = COPY_PART_SIZE,
+                   max_workers: int = MAX_TRANSFER_WORKERS,
+                   source_etag: Optional[str] = None,
+                   extra_args: Optional[Dict] = None,
+                   checkpoint: Optional[UploadCheckpoint] = None) -> Tuple[int, Optional[str]]:
+    """
+    Copy an object server-side with parallel upload_part_copy requests.
+
+    No object data passes through this process; each part is copied by S3
+    from a byte range of the source. The upload is aborted if any part fails,
+    unless a persistent checkpoint records its progress for a later resume.
+
+    Args:
+        s3_client: boto3 S3 client that can read the source and write the destination
+        source_bucket: Source bucket
+        source_key: Source key
+        bucket: Destination bucket
+        key: Destination key
+        size: Source object size in bytes
+        part_size: Size of each copied part in bytes
+        max_workers: Maximum number of parts copied at the same time
+        source_etag: If given, every part copy requires the source to still have it
+        extra_args: Extra create_multipart_upload arguments (e.g. StorageClass, Metadata)
+        checkpoint: Progress record to resume from and update; parts it lists
+            as finished are not copied again
+
+    Returns:
+        Tuple of (number of parts, ETag of the completed object)
+    """
+    copy_source = {'Bucket': source_bucket, 'Key': source_key}
+    if checkpoint is not None and checkpoint.is_resumable:
+        upload_id = checkpoint.upload_id
+        part_size = checkpoint.part_size
+    else:
+        part_size = choose_part_size(size, part_size)
+        upload_id = s3_client.create_multipart_upload(Bucket=bucket, Key=key, **(extra_args or {}))['UploadId']
+        if checkpoint is not None:
+            checkpoint.started(upload_id, part_size)
+    finished = dict(checkpoint.parts) if checkpoint is not None else {}
+
+    def _copy_part(part_number: int, start: int, end: int) -> Dict:
+        request = {
+            'Bucket': bucket,
+            'Key': key,
+            'UploadId': upload_id,
+            'PartNumber': part_number,
+            'CopySource': copy_source,
+            'CopySourceRange': f"bytes={start}-{end - 1}"
+        }
+        if source_etag:
+            request['CopySourceIfMatch'] = source_etag
+        result = s3_client.upload_part_copy(**request)['CopyPartResult']
+        part = {'PartNumber': part_number, 'ETag': result['ETag']}
+        # Uploads created with a ChecksumAlgorithm need each part's checksum to complete
+        part.update({field: result[field] for field in CHECKSUM_FIELDS.values() if field in result})
+        if checkpoint is not None:
+            checkpoint.part_done(part)
+        return part
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers,
+                                thread_name_prefix='copy-part') as pool:
+            ranges = split_ranges(size, part_size)
+            futures = [pool.submit(_copy_part, number, start, end)
+                       for number, (start, end) in enumerate(ranges, start=1) if number not in finished]
+            copied = {part['PartNumber']: part for part in (f.result() for f in futures)}
+            parts = [finished.get(number) or copied[number] for number in range(1, len(ranges) + 1)]
+
+        response = s3_client.complete_multipart_upload(
+            Bucket=bucket,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={'Parts': parts}
+        )
+    except BaseException:
+        if checkpoint is None or not checkpoint.keeps_failed_upload:
+            s3_client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+        raise
+
+    return len(parts), response.get('ETag', '').strip('"')
+
+
+def stream_copy(source_client, source_bucket: str, source_key: str,
+                s3_client, bucket: str, key: str,
+                size: Optional[int] = None, source_etag: Optional[str] = None,
+                part_size: int = STREAM_PART_SIZE,
+                max_workers: int = STREAM_MAX_WORKERS,
+                extra_args: Optional[Dict] = None,
+                checkpoint: Optional[UploadCheckpoint] = None) -> TransferResult:
+    """
+    Copy an object between clients that cannot copy server-side, by piping
+    the source GET body into an upload to the destination.
+
+    The body is read one part at a time as upload slots free up, so memory
+    stays within about part_size * max_workers for any object size, and the
+    bytes are passed through unchanged. They are hashed on the way through,
+    so the result carries their MD5 and the ETag the destination should
+    report, for verification without a second download.
+
+    Args:
+        source_client: boto3 S3 client that can read the source
+        source_bucket: Source bucket
+        source_key: Source key
+        s3_client: boto3 S3 client that can write the destination
+        bucket: Destination bucket
+        key: Destination key
+        size: Source size in bytes, if known
+        source_etag: If given, the GET fails unless the source still has it
+        part_size: Size of each uploaded part in bytes
+        max_workers: Maximum number of parts uploaded at the same time
+        extra_args: Extra put_object/create_multipart_upload arguments
+        checkpoint: Multipart progress record; a resumed upload reads the source
+            only from the end of its finished_prefix() parts
+
+    Returns:
+        TransferResult for the upload; bytes_transferred counts the bytes read
+        from the source
+
+    Raises:
+        IOError: If the source ended before size bytes
+        ValueError: If extra_args asks for an unsupported ChecksumAlgorithm
+    """
+    check_checksum_algorithm((extra_args or {}).get('ChecksumAlgorithm'))
+    start = time.perf_counter()
+    resumed_parts = 0
+    if checkpoint is not None and checkpoint.is_resumable:
+        part_size = checkpoint.part_size
+        resumed_parts = checkpoint.finished_prefix()
+    else:
+        # Resolve the part size here so the digest splits parts where the upload does
+        part_size = choose_part_size(size, part_size)
+    offset = resumed_parts * part_size
+
+    earlier_digests = None
+    if resumed_parts:
+        known = [checkpoint.part_md5s.get(number) for number in range(1, resumed_parts + 1)]
+        # Without every earlier part's MD5 the expected ETag is unknown; hash nothing
+        earlier_digests = [bytes.fromhex(md5) for md5 in known] if all(known) else None
+    digest = StreamDigest(part_size, earlier_digests) if not resumed_parts or earlier_digests else None
+
+    if size is not None and offset >= size:
+        body = io.BytesIO(b'')
+    else:
+        request = {'Bucket': source_bucket, 'Key': source_key}
+        if source_etag:
+            request['IfMatch'] = source_etag
+        if offset:
+            request['Range'] = f"bytes={offset}-"
+        body = source_client.get_object(**request)['Body']
+    reader = _CountingReader(body, digest=digest)
+    try:
+        if resumed_parts:
+            parts, etag, checksum = multipart_upload(
+                s3_client, bucket, key, reader,
+                max_workers=max_workers,
+                extra_args=extra_args,
+                checkpoint=checkpoint
+            )
+            result = TransferResult(key=key, bytes_transferred=0, seconds=time.perf_counter() - start,
+                                    parts=parts, etag=etag, checksum=checksum)
+        else:
+            result = upload_stream(
+                s3_client, bucket, key, reader,
+                size=size,
+                multipart_threshold=part_size,
+                part_size=part_size,
+                max_workers=max_workers,
+                extra_args=extra_args,
+                checkpoint=checkpoint
+            )
+    finally:
+        body.close()
+
+    if size is not None and offset + reader.bytes_read != size:
+        raise IOError(f"Short read for {source_key}: got {offset + reader.bytes_read} of {size} bytes")
+    result.bytes_transferred = reader.bytes_read
+    if digest is None:
+        return result
+    result.md5 = digest.hexdigest()
+    result.expected_etag = digest.etag(multipart='-' in (result.etag or ''))
+    return result
+
+
+def split_ranges(size: int, part_size: int) -> List[Tuple[int, int]]:
+    """
+    Split an object into consecutive byte ranges.
+
+    Args:
+        size: Object size in bytes
+        part_size: Size of each range in bytes
+
+    Returns:
+        List of (start, end) pairs, end exclusive
+    """
+    return [(start, min(start + part_size, size)) for start in range(0, size, part_size)]
+
+
+def download_range_into(s3_client, bucket: str, key: str, view: memoryview,
+                        start: int, end: int, etag: Optional[str] = None):
+    """
+    Fetch one byte range with a ranged GET and write it straight into a buffer.
+
+    The response is read in chunks and each chunk is copied once, directly
+    to its final position; the range is never assembled in a separate bytes.
+
+    Args:
+        s3_client: boto3 S3 client
+        bucket: Source bucket
+        key: Source key
+        view: Writable memoryview over the whole destination buffer
+        start: First byte of the range
+        end: End of the range (exclusive)
+        etag: If given, fail instead of mixing data from a changed object
+    """
+    request = {'Bucket': bucket, 'Key': key, 'Range': f"bytes={start}-{end - 1}"}
+    if etag:
+        request['IfMatch'] = etag
+    body = s3_client.get_object(**request)['Body']
+
+    position = start
+    try:
+        for chunk in body.iter_chunks(READ_CHUNK_SIZE):
+            view[position:position + len(chunk)] = chunk
+            position += len(chunk)
+    finally:
+        body.close()
+
+    if position != end:
+        raise IOError(f"Short read for {key} bytes {start}-{end - 1}: got {position - start} bytes")
+
+
+def ranged_download(s3_client, bucket: str, key: str, buffer, size: int,
+                    part_size: int = MULTIPART_CHUNKSIZE,
+                    max_workers: int = MAX_TRANSFER_WORKERS,
+                    etag: Optional[str] = None) -> int:
+    """
+    Download an object into a preallocated buffer with concurrent ranged GETs.
+
+    Args:
+        s3_client: boto3 S3 client
+        bucket: Source bucket
+        key: Source key
+        buffer: Writable buffer of at least size bytes (bytearray, mmap, ...)
+        size: Object size in bytes
+        part_size: Size of each ranged GET in bytes
+        max_workers: Maximum number of ranges fetched at the same time
+        etag: ETag the object must still have while the ranges are fetched
+
+    Returns:
+        Number of ranged GETs issued
+    """
+    ranges = split_ranges(size, max(part_size, 1))
+    view = memoryview(buffer)
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers,
+                                thread_name_prefix='download-range') as pool:
+            futures = [pool.submit(download_range_into, s3_client, bucket, key, view, start, end, etag)
+                       for start, end in ranges]
+            for future in futures:
+                future.result()
+    finally:
+        view.release()
+    return len(ranges)
+
+
+def iter_download(s3_client, bucket: str, key: str,
+                  chunk_size: int = READ_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Stream an object with a single GET, one chunk at a time.
+
+    Args:
+        s3_client: boto3 S3 client
+        bucket: Source bucket
+        key: Source key
+        chunk_size: Size of each chunk in bytes
+
+    Yields:
+        Consecutive chunks of the object
+    """
+    body = s3_client.get_object(Bucket=bucket, Key=key)['Body']
+    try:
+        yield from body.iter_chunks(chunk_size)
+    finally:
+        body.close()
+
+
+def run_bounded(fn: Callable[[Any], Any], items: Iterable[Any],
+                max_workers: int) -> Iterator[Tuple[Any, Any]]:
+    """
+    Apply fn to every item on a thread pool, keeping at most max_workers
+    calls in flight so large iterables are consumed lazily.
+
+    Args:
+        fn: Function to call with each item (exceptions propagate)
+        items: Items to process
+        max_workers: Maximum number of calls running at the same time
+
+    Yields:
+        (item, result) pairs, in completion order
+    """
+    items = iter(items)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        in_flight = {}
+        while True:
+            while len(in_flight) < max_workers:
+                item = next(items, _EXHAUSTED)
+                if item is _EXHAUSTED:
+                    break
+                in_flight[pool.submit(fn, item)] = item
+
+            if not in_flight:
+                return
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield in_flight.pop(future), future.result()
+
+
+_EXHAUSTED = object()
+
+
+@dataclass
+class StageStats:
+    """Load of one pipeline stage, for finding the bottleneck."""
+    name: str
+    workers: int
+    items: int = 0
+    busy_seconds: float = 0.0
+    # Depth of the stage's input queue, sampled whenever an item is queued
+    max_depth: int = 0
+    depth_total: int = 0
+    depth_samples: int = 0
+    inbox: Optional[queue.Queue] = field(default=None, repr=False)
+
+    @property
+    def depth(self) -> int:
+        """Items waiting for the stage right now."""
+        return self.inbox.qsize() if self.inbox is not None else 0
+
+    @property
+    def mean_depth(self) -> float:
+        return self.depth_total / self.depth_samples if self.depth_samples else 0.0
+
+    def utilization(self, elapsed: float) -> float:
+        """Fraction of the stage's worker time spent working over elapsed seconds."""
+        if elapsed <= 0 or self.workers <= 0:
+            return 0.0
+        return min(self.busy_seconds / (self.workers * elapsed), 1.0)
+
+    def to_dict(self, elapsed: float) -> Dict:
+        return {
+            'workers': self.workers,
+            'items': self.items,
+            'busy_seconds': self.busy_seconds,
+            'utilization': self.utilization(elapsed),
+            'queue_depth': self.depth,
+            'mean_queue_depth': self.mean_depth,
+            'max_queue_depth': self.max_depth
+        }
+
+
+class StagePipeline:
+    """
+    Runs items through a sequence of stages, each on its own worker threads,
+    with a bounded queue in front of every stage.
+
+    Every stage works on a different item at the same time, so e.g. reads
+    for the next items overlap with writes for earlier ones, and the bounded
+    queues keep a fast stage from running far ahead of a slow one. The stage
+    with the highest utilization and a full queue in front of it is the
+    bottleneck.
+    """
+
+    def __init__(self, stages: List[Tuple[str, Callable[[Any], Any], int]], queue_size: int = 4,
+                 is_finished: Optional[Callable[[Any], bool]] = None,
+                 discard: Optional[Callable[[Any], None]] = None):
+        """
+        Initialize a pipeline.
+
+        Args:
+            stages: (name, function, workers) per stage, in order; each function
+                takes an item and returns it (or its replacement) for the next stage
+            queue_size: Items each stage may have waiting in front of it
+            is_finished: Items for which it returns True skip the remaining stages
+            discard: Called on every item that never reaches the consumer (the
+                pipeline stopped early, or a stage raised on it), so it can
+                release what the item holds
+        """
+        self.stages = stages
+        self.queue_size = max(queue_size, 1)
+        self.is_finished = is_finished or (lambda item: False)
+        self.discard = discard or (lambda item: None)
+        self.stats = [StageStats(name, max(workers, 1)) for name, _, workers in stages]
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    def get_statistics(self) -> Dict[str, Dict]:
+        """Per-stage load so far, by stage name (live while running)."""
+        elapsed = self.elapsed
+        return {stats.name: stats.to_dict(elapsed) for stats in self.stats}
+
+    def run(self, items: Iterable[Any]) -> Iterator[Any]:
+        """
+        Run items through the pipeline.
+
+        Items are taken from the iterable only as the first queue has room.
+        An exception in a stage function stops the pipeline and is re-raised
+        here once the workers have stopped. Whenever the pipeline stops
+        early, every item still in it is passed to discard.
+
+        Args:
+            items: Items to process
+
+        Yields:
+            Processed items, in completion order
+        """
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+        inboxes = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        outbox = queue.Queue()
+        for stats, inbox in zip(self.stats, inboxes):
+            stats.inbox = inbox
+        cancelled = threading.Event()
+        errors: List[BaseException] = []
+        remaining = [stats.workers for stats in self.stats]
+        remaining_lock = threading.Lock()
+
+        def _put(index: int, item) -> bool:
+            if index == len(self.stages):
+                outbox.put(item)
+                return True
+            while not cancelled.is_set():
+                try:
+                    inboxes[index].put(item, timeout=0.1)
+                except queue.Full:
+                    continue
+                if item is not _EXHAUSTED:
+                    stats = self.stats[index]
+                    depth = inboxes[index].qsize()
+                    with remaining_lock:
+                        stats.max_depth = max(stats.max_depth, depth)
+                        stats.depth_total += depth
+                        stats.depth_samples += 1
+                return True
+            return False
+
+        def _put_or_discard(index: int, item):
+            if not _put(index, item):
+                self.discard(item)
+
+        def _feed():
+            try:
+                for item in items:
+                    if not _put(0, item):
+                        self.discard(item)
+                        return
+            except BaseException as e:
+                errors.append(e)
+                cancelled.set()
+            finally:
+                for _ in range(self.stats[0].workers):
+                    _put(0, _EXHAUSTED)
+
+        def _work(index: int):
+            _, fn, _ = self.stages[index]
+            stats = self.stats[index]
+            try:
+                while not cancelled.is_set():
+                    try:
+                        item = inboxes[index].get(timeout=0.1)
+                    except queue.Empty:
+                        continue
+                    if item is _EXHAUSTED:
+                        break
+                    start = time.perf_counter()
+                    try:
+                        item = fn(item)
+                    except BaseException as e:
+                        errors.append(e)
+                        cancelled.set()
+                        self.discard(item)
+                        break
+                    finally:
+                        busy = time.perf_counter() - start
+                        with remaining_lock:
+                            stats.items += 1
+                            stats.busy_seconds += busy
+                    # Finished items skip the remaining stages
+                    _put_or_discard(len(self.stages) if self.is_finished(item) else index + 1, item)
+            finally:
+                with remaining_lock:
+                    remaining[index] -= 1
+                    last = remaining[index] == 0
+                if last:
+                    # The next stage's workers stop once the last worker here has
+                    if index + 1 < len(self.stages):
+                        for _ in range(self.stats[index + 1].workers):
+                            _put(index + 1, _EXHAUSTED)
+                    else:
+                        outbox.put(_EXHAUSTED)
+
+        threads = [threading.Thread(target=_feed, name='pipeline-feed', daemon=True)]
+        for index, stats in enumerate(self.stats):
+            threads += [threading.Thread(target=_work, args=(index,), name=f"pipeline-{stats.name}", daemon=True)
+                        for _ in range(stats.workers)]
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                try:
+                    item = outbox.get(timeout=0.1)
+                except queue.Empty:
+                    if cancelled.is_set() and not any(thread.is_alive() for thread in threads):
+                        break
+                    continue
+                if item is _EXHAUSTED:
+                    break
+                yield item
+        finally:
+            # Also stops the workers when the consumer stops reading early
+            cancelled.set()
+            # Whatever is left was never yielded. Discard it while the workers
+            # stop, not after: a worker may be blocked until a queued item
+            # releases what it waits for (e.g. a route slot).
+            while True:
+                for pending in inboxes + [outbox]:
+                    while True:
+                        try:
+                            item = pending.get_nowait()
+                        except queue.Empty:
+                            break
+                        if item is not _EXHAUSTED:
+                            self.discard(item)
+                alive = [thread for thread in threads if thread.is_alive()]
+                if not alive:
+                    break
+                alive[0].join(timeout=0.1)
+            self.finished_at = time.perf_counter()
+        if errors:
+            raise errors[0]
+
+
+class _CountingReader:
+    """
+    Wraps a stream, replaying data already read from it first, and counts
+    (and optionally hashes) the bytes read through it.
+    """
+
+    def __init__(self, stream: BinaryIO, prefix: bytes = b'', digest=None):
+        self.stream = stream
+        self.prefix = memoryview(prefix)
+        self.digest = digest
+        self.bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        if self.prefix:
+            if size < 0:
+                data = bytes(self.prefix) + self.stream.read()
+            else:
+                data = bytes(self.prefix[:size])
+            self.prefix = self.prefix[len(data):]
+        else:
+            data = self.stream.read(size)
+        if data:
+            self.bytes_read += len(data)
+            if self.digest is not None:
+                self.digest.update(data)
+        return data
@@ -0,0 +1,221 @@
+"""
+Tier Transition Schedule
+Persisted priority queue of the next time each object's tier decision can
+change on its own.
+
+A file only needs re-evaluating when it crosses an age threshold or when its
+metadata changes. The schedule keeps, per object, the time of its next
+threshold crossing and the storage class it was last left in; the index on
+due_at makes "pop everything due by now" a range scan that touches only the
+due rows, the same way a min-heap pops its smallest entries.
+"""
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_SCHEDULE_PATH = "tiering_schedule.db"
+
+# (key, next transition time or None for never, storage class or None if unknown)
+ScheduleEntry = Tuple[str, Optional[datetime], Optional[str]]
+
+
+class TransitionSchedule:
+    """
+    SQLite-backed schedule of upcoming tier transitions.
+
+    Also stores the metadata store's change watermark as of the last run,
+    so the next run knows which metadata changes it has not seen yet, and
+    when the last full run listed the bucket.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS transition_schedule (
+            key TEXT PRIMARY KEY,
+            due_at TEXT,
+            storage_class TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_transition_schedule_due_at
+            ON transition_schedule (due_at);
+        CREATE TABLE IF NOT EXISTS schedule_state (
+            name TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """
+
+    UPSERT = """
+        INSERT INTO transition_schedule (key, due_at, storage_class) VALUES (?, ?, ?)
+        ON CONFLICT(key) DO UPDATE SET
+            due_at = excluded.due_at,
+            storage_class = excluded.storage_class
+    """
+
+    def __init__(self, path: str = DEFAULT_SCHEDULE_PATH):
+        """
+        Open (or create) a schedule database.
+
+        Args:
+            path: Path to the database file
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._lock, self._conn:
+            self._conn.executescript(self.SCHEMA)
+
+    @staticmethod
+    def _rows(entries: Iterable[ScheduleEntry]) -> List[tuple]:
+        return [(key, due_at.isoformat() if due_at is not None else None, storage_class)
+                for key, due_at, storage_class in entries]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM transition_schedule").fetchone()[0]
+
+    @property
+    def is_initialized(self) -> bool:
+        """Whether a full run has seeded the schedule."""
+        return self.get_watermark() is not None
+
+    def due(self, now: datetime) -> List[str]:
+        """
+        Get every key whose next transition is due, earliest first.
+
+        Args:
+            now: Reference time
+
+        Returns:
+            Due keys
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key FROM transition_schedule WHERE due_at <= ? ORDER BY due_at",
+                (now.isoformat(),)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def next_due(self) -> Optional[datetime]:
+        """Get the earliest scheduled transition time, or None if nothing is scheduled."""
+        with self._lock:
+            row = self._conn.execute("SELECT MIN(due_at) FROM transition_schedule").fetchone()
+        return datetime.fromisoformat(row[0]) if row[0] else None
+
+    def get_storage_classes(self, keys: Iterable[str]) -> Dict[str, Optional[str]]:
+        """
+        Get the last known storage class of scheduled keys.
+
+        Args:
+            keys: Object keys
+
+        Returns:
+            {key: storage class}; keys not in the schedule are omitted
+        """
+        keys = list(keys)
+        storage_classes = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT key, storage_class FROM transition_schedule WHERE key IN ({placeholders})",
+                    chunk
+                ).fetchall()
+            storage_classes.update(rows)
+        return storage_classes
+
+    def schedule_many(self, entries: Iterable[ScheduleEntry]):
+        """
+        Insert or update schedule entries in one transaction.
+
+        Args:
+            entries: (key, next transition time or None, storage class) tuples
+        """
+        rows = self._rows(entries)
+        with self._lock, self._conn:
+            self._conn.executemany(self.UPSERT, rows)
+
+    def set_storage_classes(self, storage_classes: Dict[str, str]):
+        """
+        Update the storage class of keys already in the schedule, keeping their due times.
+
+        Args:
+            storage_classes: {key: storage class}; keys not in the schedule are ignored
+        """
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE transition_schedule SET storage_class = ? WHERE key = ?",
+                [(storage_class, key) for key, storage_class in storage_classes.items()]
+            )
+
+    def replace_all(self, entries: Iterable[ScheduleEntry], watermark: int,
+                    full_run_at: Optional[datetime] = None) -> int:
+        """
+        Replace the whole schedule, e.g. after a full tiering run.
+
+        Args:
+            entries: (key, next transition time or None, storage class) tuples
+            watermark: Metadata change watermark the entries were computed from
+            full_run_at: When the listing the entries come from was taken
+                (default: now)
+
+        Returns:
+            Number of keys dropped because they are not in entries
+        """
+        rows = self._rows(entries)
+        full_run_at = full_run_at or datetime.now()
+        with self._lock, self._conn:
+            self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS replacement_keys (key TEXT PRIMARY KEY)")
+            self._conn.execute("DELETE FROM replacement_keys")
+            self._conn.executemany("INSERT OR IGNORE INTO replacement_keys (key) VALUES (?)",
+                                   [(row[0],) for row in rows])
+            removed = self._conn.execute(
+                "DELETE FROM transition_schedule WHERE key NOT IN (SELECT key FROM replacement_keys)"
+            ).rowcount
+            self._conn.execute("DELETE FROM replacement_keys")
+            self._conn.executemany(self.UPSERT, rows)
+            self._set_watermark(watermark)
+            self._set_state('full_run_at', full_run_at.isoformat())
+        return removed
+
+    def remove_many(self, keys: Iterable[str]):
+        """Drop keys from the schedule (e.g. objects that no longer exist)."""
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM transition_schedule WHERE key = ?",
+                                   [(key,) for key in keys])
+
+    def get_watermark(self) -> Optional[int]:
+        """Get the metadata change watermark of the last run, or None if never run."""
+        value = self._get_state('watermark')
+        return int(value) if value is not None else None
+
+    def get_full_run_at(self) -> Optional[datetime]:
+        """Get when the last full run listed the bucket, or None if unknown."""
+        value = self._get_state('full_run_at')
+        return datetime.fromisoformat(value) if value is not None else None
+
+    def set_watermark(self, watermark: int):
+        """Record that metadata changes up to watermark have been applied."""
+        with self._lock, self._conn:
+            self._set_watermark(watermark)
+
+    def _set_watermark(self, watermark: int):
+        self._set_state('watermark', str(watermark))
+
+    def _get_state(self, name: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM schedule_state WHERE name = ?", (name,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, name: str, value: str):
+        self._conn.execute(
+            "INSERT INTO schedule_state (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = excluded.value",
+            (name, value)
+        )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -49,9 +49,15 @@ def initialize_managers():
         'azure': S3Manager(cloud_name='azure', bucket_name='astra-demo-azure')
     }
     
-    # Buckets are created automatically in __init__
+    # Buckets are created automatically in __init__. Clients and bucket checks
+    # are shared through ClientRegistry, so re-initializing is nearly free and
+    # every request reuses the same warm connection pools.
     
-    # Initialize engine with AWS as primary
+    # Initialize engine with AWS as primary. The previous engine owns the
+    # metadata store, its access-buffer flusher and the schedule, so close it
+    # first: two buffers must never flush into the same store.
+    if engine is not None:
+        engine.close()
     engine = TieringEngine(managers['aws'])
 
 @app.route('/')